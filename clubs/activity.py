@@ -0,0 +1,55 @@
+"""The membership event log, written together with every role change, and the club activity feed read from it."""
+from contextlib import ExitStack, contextmanager
+from django.db import transaction
+from .models import User, MembershipEvent
+from .sharding import shard_for_club, sharding_enabled
+
+
+@contextmanager
+def membership_change(club):
+    """Run a role change and the logging of its event in one transaction.
+
+    The event is written to the default database; when the club lives on a
+    shard, its memberships are written there, so a transaction is held on
+    the shard as well.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(transaction.atomic())
+        shard = shard_for_club(club) if sharding_enabled() else None
+        if shard:
+            stack.enter_context(transaction.atomic(using=shard))
+        yield
+
+
+def log_membership_event(club, user, kind, actor=None):
+    """Append an event of kind for user's membership of club, changed by actor."""
+    if actor is not None and actor.pk == user.pk:
+        actor = None
+    return MembershipEvent.objects.create(
+        club_id=club.id,
+        user_id=user.id,
+        actor_id=actor.pk if actor else None,
+        kind=kind,
+    )
+
+
+def activity_page(club_id, before=None, size=50):
+    """Return a page of the club's events, newest first, and the cursor of the next page.
+
+    The cursor is the id of the oldest event shown, so every page is one
+    range scan of the (club, id) index however long the log grows. The next
+    cursor is None on the last page.
+    """
+    events = MembershipEvent.objects.filter(club_id=club_id)
+    if before is not None:
+        events = events.filter(id__lt=before)
+    events = list(events.order_by('-id')[:size + 1])
+    next_cursor = events[size - 1].id if len(events) > size else None
+    events = events[:size]
+    users = User.objects.in_bulk(
+        {event.user_id for event in events} | {event.actor_id for event in events if event.actor_id}
+    )
+    for event in events:
+        event.subject = users.get(event.user_id)
+        event.changed_by = users.get(event.actor_id)
+    return events, next_cursor
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Club, Membership
+from .models import User, Club, Membership, MembershipArchive, Job
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -17,6 +17,14 @@ class MembershipAdmin(admin.ModelAdmin):
         'user', 'club', 'level'
     ]
 
+@admin.register(MembershipArchive)
+class MembershipArchiveAdmin(admin.ModelAdmin):
+    """Configuration of the admin interface for removed memberships."""
+
+    list_display = [
+        'user', 'club', 'previous_level', 'updated_at'
+    ]
+
 @admin.register(Club)
 class ClubAdmin(admin.ModelAdmin):
     """Configuration of the admin interface for clubs."""
@@ -25,3 +33,12 @@ class ClubAdmin(admin.ModelAdmin):
         'name', 'owner', 'location', 'description'
     ]
 
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Configuration of the admin interface for background jobs."""
+
+    list_display = [
+        'task', 'status', 'attempts', 'run_at', 'locked_by'
+    ]
+    list_filter = ['status']
@@ -0,0 +1,544 @@
+"""JSON API for machine clients.
+
+Resources are serialized by hand from fixed tables of fields. Clients pick
+the fields they need with ?fields=a,b,relation.c; only the columns behind
+those fields are loaded, and a relation is only joined when one of its
+fields is asked for. Lists are paged with ?after=<id>&limit=<n>, and every
+GET response carries an ETag so unchanged data costs a 304. Errors, including
+an anonymous caller (401), a caller outside the club (403) or a write without
+the session's CSRF token (403), are JSON too.
+"""
+import hashlib
+import json
+from operator import attrgetter
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from .activity import log_membership_event, membership_change
+from .archive import schedule_archive_purge
+from .changes import current_change_seq
+from .events import publish_membership_change
+from .forms import CreateClubForm, UserForm
+from .loaders import BatchLoaders
+from .models import User, Club, Membership, MembershipArchive, MembershipEvent, MembershipTombstone
+from .permissions import ACCEPT, DEMOTE, PROMOTE, REINSTATE, REJECT, REMOVE, can, role_of
+from .sharding import sharding_enabled
+
+# Fields of each resource, as name: (column to load, getter)
+USER_FIELDS = {
+    'id': ('id', attrgetter('id')),
+    'first_name': ('first_name', attrgetter('first_name')),
+    'last_name': ('last_name', attrgetter('last_name')),
+    'bio': ('bio', attrgetter('bio')),
+    'is_active': ('is_active', attrgetter('is_active')),
+    'updated_at': ('updated_at', attrgetter('updated_at')),
+    'seq': ('change_seq', attrgetter('change_seq')),
+}
+# Only shown to the user, the club owner and officers, as on show_user
+USER_PRIVATE_FIELDS = {
+    'username': ('username', attrgetter('username')),
+    'chess_level': ('chess_level', attrgetter('chess_level')),
+    'personal_statement': ('personal_statement', attrgetter('personal_statement')),
+}
+CLUB_FIELDS = {
+    'id': ('id', attrgetter('id')),
+    'name': ('name', attrgetter('name')),
+    'location': ('location', attrgetter('location')),
+    'description': ('description', attrgetter('description')),
+    'owner_id': ('owner', attrgetter('owner_id')),
+    'updated_at': ('updated_at', attrgetter('updated_at')),
+    'seq': ('change_seq', attrgetter('change_seq')),
+}
+MEMBERSHIP_FIELDS = {
+    'user_id': ('user', attrgetter('user_id')),
+    'level': ('level', attrgetter('level')),
+    'updated_at': ('updated_at', attrgetter('updated_at')),
+    'seq': ('change_seq', attrgetter('change_seq')),
+}
+
+# Names of the levels in a batch's roles and stats
+LEVEL_NAMES = {'0': 'removed', '1': 'applicant', '2': 'member', '3': 'officer'}
+
+# Level changes a membership PATCH can make: (action taken, event kind)
+LEVEL_CHANGES = {
+    ('1', '2'): (ACCEPT, MembershipEvent.ACCEPTED),
+    ('1', '0'): (REJECT, MembershipEvent.REMOVED),
+    ('2', '3'): (PROMOTE, MembershipEvent.PROMOTED),
+    ('3', '2'): (DEMOTE, MembershipEvent.DEMOTED),
+    ('2', '0'): (REMOVE, MembershipEvent.REMOVED),
+    ('3', '0'): (REMOVE, MembershipEvent.REMOVED),
+    ('0', '1'): (REINSTATE, MembershipEvent.REINSTATED),
+}
+
+
+class ApiError(Exception):
+    """Ends an API request with a JSON error response of the given status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Serializer:
+    """Turns objects into dicts of the chosen fields, with one getter call per field."""
+
+    def __init__(self, fields, private_fields=None):
+        self.fields = list(fields.items())
+        self.private_fields = list((private_fields or {}).items())
+
+    def columns(self):
+        return [column for _, (column, _) in self.fields + self.private_fields]
+
+    def serialize(self, obj, private=False):
+        data = {name: get(obj) for name, (_, get) in self.fields}
+        if private:
+            for name, (_, get) in self.private_fields:
+                data[name] = get(obj)
+        return data
+
+
+def select_fields(request, fields, private_fields=None, relations=None):
+    """Return the serializers for the fields asked for by ?fields=, keyed by relation ('' for the resource).
+
+    Without ?fields= every field of the resource itself is returned.
+    """
+    available = {'': (fields, private_fields or {}), **(relations or {})}
+    requested = request.GET.get('fields')
+    if not requested:
+        return {'': Serializer(fields, private_fields)}
+    chosen = {}
+    for name in requested.split(','):
+        relation, _, field = name.strip().rpartition('.')
+        public, private = available.get(relation, ({}, {}))
+        if field not in public and field not in private:
+            raise ApiError(400, f"Unknown field: {name}")
+        chosen_public, chosen_private = chosen.setdefault(relation, ({}, {}))
+        if field in public:
+            chosen_public[field] = public[field]
+        else:
+            chosen_private[field] = private[field]
+    return {relation: Serializer(public, private) for relation, (public, private) in chosen.items()}
+
+
+def load_fields(queryset, serializer, relation=None, relation_serializer=None, extra_columns=()):
+    """Limit queryset to the columns the serializers need, joining the relation when it can be.
+
+    Sharded memberships and clubs cannot be joined to users, so their
+    relation is fetched by attach_related instead.
+    """
+    columns = ['id', *serializer.columns(), *extra_columns]
+    if relation_serializer and not sharding_enabled():
+        queryset = queryset.select_related(relation)
+        columns += [relation, f'{relation}__id']
+        columns += [f'{relation}__{column}' for column in relation_serializer.columns()]
+    elif relation_serializer:
+        columns.append(relation)
+    return queryset.only(*columns)
+
+
+def attach_related(objects, relation, relation_serializer):
+    """Fetch the relation of a page of objects with one IN query when it was not joined."""
+    if not sharding_enabled() or not objects:
+        return
+    related = User.objects.only('id', *relation_serializer.columns()).in_bulk(
+        {getattr(obj, f'{relation}_id') for obj in objects}
+    )
+    for obj in objects:
+        setattr(obj, relation, related.get(getattr(obj, f'{relation}_id')))
+
+
+def page(request, queryset):
+    """Return the page of queryset after the ?after= id, in id order, and the cursor of the next page."""
+    try:
+        limit = min(int(request.GET.get('limit', settings.API_PAGE_SIZE)), settings.API_MAX_PAGE_SIZE)
+        after = int(request.GET['after']) if 'after' in request.GET else None
+    except ValueError:
+        raise ApiError(400, "after and limit must be whole numbers")
+    if limit < 1:
+        raise ApiError(400, "limit must be positive")
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    objects = list(queryset.order_by('pk')[:limit + 1])
+    next_cursor = objects[limit - 1].pk if len(objects) > limit else None
+    return objects[:limit], next_cursor
+
+
+def etag_matches(request, etag):
+    """Whether etag is one of the ETags listed in the request's If-None-Match header."""
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    # If-None-Match compares weakly, ignoring a W/ prefix
+    return '*' in etags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in etags)
+
+
+def json_response(request, data, status=200):
+    """Return data as JSON with an ETag, or 304 when the client already has it."""
+    body = json.dumps(data, cls=DjangoJSONEncoder)
+    etag = f'"{hashlib.md5(body.encode()).hexdigest()}"'
+    if request.method in ('GET', 'HEAD') and etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def request_data(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError(400, "The body must be JSON")
+    if not isinstance(data, dict):
+        raise ApiError(400, "The body must be a JSON object")
+    return data
+
+
+def form_errors(form):
+    return ApiError(400, "; ".join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()))
+
+
+# Runs CsrfViewMiddleware's check inside api_view, whose views are exempt from the middleware itself
+_csrf_check = CsrfViewMiddleware(lambda request: None)
+
+
+def api_view(methods):
+    """Restrict a view to logged-in users and methods, and turn its ApiErrors into JSON error responses.
+
+    Writes need the session's CSRF token in the X-CSRFToken header, as for
+    the site's own forms, but a missing or wrong token is answered in JSON.
+    """
+    def decorator(view_function):
+        @csrf_exempt
+        def wrapper_func(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response(request, {'error': "Method not allowed"}, status=405)
+            try:
+                if not request.user.is_authenticated:
+                    raise ApiError(401, "Log in first")
+                if _csrf_check.process_view(request, None, (), {}) is not None:
+                    raise ApiError(403, "Send the csrftoken cookie's value in the X-CSRFToken header")
+                return view_function(request, *args, **kwargs)
+            except ApiError as error:
+                return json_response(request, {'error': str(error)}, status=error.status)
+        return wrapper_func
+    return decorator
+
+
+def api_member_or_above_required(view_function):
+    """The API's member_or_above_required: 404 for an unknown club, 403 for anyone but its members."""
+    def wrapper_func(request, club_id, *args, **kwargs):
+        club = Club.objects.filter(pk=club_id).first()
+        if club is None:
+            raise ApiError(404, "No such club")
+        if not club.is_owner(request.user):
+            membership = Membership.objects.filter(club=club, user_id=request.user.id).order_by('pk').first()
+            if membership is None or membership.is_applicant() or membership.is_removed_user():
+                raise ApiError(403, "Only the club's members can see this")
+        return view_function(request, club_id, *args, **kwargs)
+    return wrapper_func
+
+
+def sees_further_profile(viewer, viewer_membership, club, user_id, membership):
+    """Whether viewer may see the private fields of a club user, as on show_user.
+
+    membership is the user's membership of club, or None for its owner.
+    """
+    if user_id == viewer.id or club.owner_id == viewer.id:
+        return True
+    return bool(
+        membership and viewer_membership and viewer_membership.is_officer() and not membership.is_officer()
+    )
+
+
+@api_view(['GET'])
+def club_list(request):
+    serializers = select_fields(request, CLUB_FIELDS, relations={'owner': (USER_FIELDS, {})})
+    club_serializer = serializers.get('', Serializer({}))
+    owner_serializer = serializers.get('owner')
+    queryset = load_fields(Club.objects.all(), club_serializer, 'owner', owner_serializer)
+    clubs, next_cursor = page(request, queryset)
+    if owner_serializer:
+        attach_related(clubs, 'owner', owner_serializer)
+    results = []
+    for club in clubs:
+        item = club_serializer.serialize(club)
+        if owner_serializer:
+            item['owner'] = owner_serializer.serialize(club.owner) if club.owner else None
+        results.append(item)
+    return json_response(request, {'results': results, 'next': next_cursor})
+
+
+@api_view(['GET', 'PATCH'])
+def club_detail(request, club_id):
+    club = Club.objects.filter(pk=club_id).first()
+    if club is None:
+        raise ApiError(404, "No such club")
+    if request.method == 'PATCH':
+        if not club.is_owner(request.user):
+            raise ApiError(403, "Only the owner can change the club")
+        data = {name: getattr(club, name) for name in CreateClubForm.Meta.fields}
+        data.update(request_data(request))
+        form = CreateClubForm(data, instance=club)
+        if not form.is_valid():
+            raise form_errors(form)
+        for name in CreateClubForm.Meta.fields:
+            setattr(club, name, form.cleaned_data[name])
+        club.save()
+    serializer = select_fields(request, CLUB_FIELDS).get('', Serializer({}))
+    return json_response(request, serializer.serialize(club))
+
+
+@api_view(['GET'])
+@api_member_or_above_required
+def membership_list(request, club_id):
+    club = Club.objects.get(pk=club_id)
+    viewer_membership = Membership.objects.filter(club=club, user_id=request.user.id).order_by('pk').first()
+    serializers = select_fields(
+        request, MEMBERSHIP_FIELDS, relations={'user': (USER_FIELDS, USER_PRIVATE_FIELDS)}
+    )
+    membership_serializer = serializers.get('', Serializer({}))
+    user_serializer = serializers.get('user')
+    queryset = Membership.objects.filter(club=club)
+    # Members never see the applicants
+    if not club.is_owner(request.user) and viewer_membership.is_member():
+        queryset = queryset.exclude(level='1')
+    # The level decides who may see the users' private fields
+    queryset = load_fields(queryset, membership_serializer, 'user', user_serializer, extra_columns=['level'])
+    memberships, next_cursor = page(request, queryset)
+    if user_serializer:
+        attach_related(memberships, 'user', user_serializer)
+    results = []
+    for membership in memberships:
+        item = membership_serializer.serialize(membership)
+        if user_serializer:
+            private = sees_further_profile(request.user, viewer_membership, club, membership.user_id, membership)
+            item['user'] = user_serializer.serialize(membership.user, private)
+        results.append(item)
+    return json_response(request, {'results': results, 'next': next_cursor})
+
+
+@api_view(['GET', 'PATCH'])
+@api_member_or_above_required
+def membership_detail(request, club_id, user_id):
+    club = Club.objects.get(pk=club_id)
+    viewer = request.user
+    viewer_membership = Membership.objects.filter(club=club, user_id=viewer.id).order_by('pk').first()
+    membership = Membership.objects.filter(club=club, user_id=user_id).order_by('pk').first()
+    if membership is None:
+        membership = MembershipArchive.objects.filter(club=club, user_id=user_id).first()
+    hidden = membership and membership.is_applicant() and not club.is_owner(viewer) and viewer_membership.is_member()
+    if membership is None or hidden:
+        raise ApiError(404, "No such membership")
+    if request.method == 'PATCH':
+        level = request_data(request).get('level')
+        change = LEVEL_CHANGES.get((membership.level, level))
+        if change is None:
+            raise ApiError(400, f"Cannot change level {membership.level} to {level}")
+        action, kind = change
+        if not can(action, role_of(club.is_owner(viewer), viewer_membership), membership.level):
+            raise ApiError(403, "You may not make this change")
+        user = User.objects.get(pk=user_id)
+        if user == viewer or not user.is_active:
+            raise ApiError(403, "You cannot change yourself or an inactive user")
+        with membership_change(club):
+            if isinstance(membership, MembershipArchive):
+                membership = membership.reinstate_user()
+            elif level == '0':
+                membership = membership.remove_user()
+                schedule_archive_purge()
+            else:
+                membership.level = level
+                membership.save()
+            log_membership_event(club, user, kind, actor=viewer)
+        publish_membership_change(club.id)
+    serializer = select_fields(request, MEMBERSHIP_FIELDS).get('', Serializer({}))
+    return json_response(request, serializer.serialize(membership))
+
+
+@api_view(['GET', 'PATCH'])
+def user_detail(request, user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        raise ApiError(404, "No such user")
+    is_self = user == request.user
+    if request.method == 'PATCH':
+        if not is_self:
+            raise ApiError(403, "You can only change your own profile")
+        data = {name: getattr(user, name) for name in UserForm.Meta.fields}
+        data.update(request_data(request))
+        form = UserForm(instance=user, data=data)
+        if not form.is_valid():
+            raise form_errors(form)
+        user = form.save()
+    serializer = select_fields(request, USER_FIELDS, USER_PRIVATE_FIELDS).get('', Serializer({}))
+    return json_response(request, serializer.serialize(user, private=is_self))
+
+
+@api_view(['GET'])
+@api_member_or_above_required
+def club_changes(request, club_id):
+    """Return what changed in a club since the cursor given as ?since=.
+
+    Without a cursor the whole club is returned. Every response carries the
+    cursor to send next time, and with one the work done depends on the
+    number of changes since the cursor rather than on the size of the club.
+    Memberships deleted since the cursor are listed by user id under 'removed'.
+    """
+    try:
+        since = int(request.GET['since'])
+    except (KeyError, ValueError):
+        since = None
+    # Read first: every row numbered up to the cursor is already committed
+    cursor = current_change_seq()
+    club = Club.objects.get(pk=club_id)
+    viewer_membership = Membership.objects.filter(club=club, user_id=request.user.id).order_by('pk').first()
+    # Members never see the applicants
+    hide_applicants = not club.is_owner(request.user) and viewer_membership.is_member()
+
+    memberships = Membership.objects.filter(club=club, change_seq__lte=cursor)
+    if since is not None:
+        memberships = memberships.filter(change_seq__gt=since)
+    memberships = list(memberships.order_by('change_seq'))
+    club_memberships = {membership.user_id: membership for membership in memberships}
+    users = User.objects.filter(pk__in=[club.owner_id, *club_memberships])
+    removed = []
+    if since is not None:
+        changed_user_ids = list(
+            User.objects.filter(change_seq__gt=since, change_seq__lte=cursor).values_list('pk', flat=True)
+        )
+        club_memberships.update(
+            (membership.user_id, membership)
+            for membership in Membership.objects.filter(club=club, user_id__in=changed_user_ids)
+        )
+        changed_user_ids = [
+            user_id for user_id in changed_user_ids if user_id in club_memberships or user_id == club.owner_id
+        ]
+        users = User.objects.filter(pk__in=[*changed_user_ids, *(membership.user_id for membership in memberships)])
+        tombstones = (
+            MembershipTombstone.objects.filter(club_id=club.id, change_seq__gt=since, change_seq__lte=cursor)
+                .order_by('change_seq').values_list('user_id', flat=True)
+        )
+        removed = list(dict.fromkeys(tombstones))
+    if hide_applicants:
+        memberships = [membership for membership in memberships if not membership.is_applicant()]
+        users = [
+            user for user in users
+            if user.id not in club_memberships or not club_memberships[user.id].is_applicant()
+        ]
+
+    user_serializer = Serializer(USER_FIELDS, USER_PRIVATE_FIELDS)
+    return json_response(request, {
+        'cursor': cursor,
+        'club': Serializer(CLUB_FIELDS).serialize(club) if since is None or club.change_seq > since else None,
+        'memberships': [Serializer(MEMBERSHIP_FIELDS).serialize(membership) for membership in memberships],
+        'users': [
+            user_serializer.serialize(user, sees_further_profile(
+                request.user, viewer_membership, club, user.id, club_memberships.get(user.id)
+            ))
+            for user in users
+        ],
+        'removed': removed,
+    })
+
+
+def batch_role(loaders, club_id):
+    """The viewer's role in the club, from the loaded clubs and roles."""
+    club = loaders['clubs'].get(club_id)
+    if club is None:
+        return None
+    if club.owner_id == loaders.viewer.id:
+        return 'owner'
+    membership = loaders['roles'].get(club_id)
+    return LEVEL_NAMES[membership.level] if membership else None
+
+
+def batch_roster(loaders, club_id, user_serializer):
+    """The club's roster as membership_list shows it to the viewer, or None if they may not see it."""
+    club = loaders['clubs'].get(club_id)
+    role = batch_role(loaders, club_id)
+    if role not in ('owner', 'officer', 'member'):
+        return None
+    viewer_membership = loaders['roles'].get(club_id)
+    roster = []
+    for membership in loaders['rosters'].get(club_id, []):
+        if role == 'member' and membership.is_applicant():
+            continue
+        item = Serializer(MEMBERSHIP_FIELDS).serialize(membership)
+        private = sees_further_profile(loaders.viewer, viewer_membership, club, membership.user_id, membership)
+        item['user'] = user_serializer.serialize(loaders['users'].get(membership.user_id), private)
+        roster.append(item)
+    return roster
+
+
+def batch_stats(loaders, club_id):
+    """The club's member and officer counts, with the applicants for its officers and owner."""
+    if loaders['clubs'].get(club_id) is None:
+        return None
+    counts = loaders['stats'].get(club_id, {})
+    stats = {'members': counts.get('2', 0), 'officers': counts.get('3', 0)}
+    if batch_role(loaders, club_id) in ('owner', 'officer'):
+        stats['applicants'] = counts.get('1', 0)
+    return stats
+
+
+def batch_club(loaders, club_id, user_serializer):
+    club = loaders['clubs'].get(club_id)
+    if club is None:
+        return None
+    item = Serializer(CLUB_FIELDS).serialize(club)
+    owner = loaders['users'].get(club.owner_id)
+    item['owner'] = user_serializer.serialize(owner) if owner else None
+    return item
+
+
+def batch_user(loaders, user_id, user_serializer):
+    user = loaders['users'].get(user_id)
+    if user is None:
+        return None
+    return user_serializer.serialize(user, private=user_id == loaders.viewer.id)
+
+
+@api_view(['GET'])
+def batch(request):
+    """Return several resources for many ids in one response, e.g. ?clubs=1,2&rosters=1,2&roles=1,2.
+
+    The resources are clubs, rosters, stats and roles, keyed by club id, and
+    users, keyed by user id. Every id asked for gets an entry, None when it
+    does not exist or may not be seen. However many ids and resources are
+    asked for, each type of object is loaded with one IN query.
+    """
+    resolvers = {
+        'clubs': batch_club,
+        'rosters': batch_roster,
+        'stats': lambda loaders, club_id, _: batch_stats(loaders, club_id),
+        'roles': lambda loaders, club_id, _: batch_role(loaders, club_id),
+        'users': batch_user,
+    }
+    unknown = set(request.GET) - set(resolvers)
+    if unknown:
+        raise ApiError(400, f"Unknown resource: {', '.join(sorted(unknown))}")
+    wanted = {}
+    try:
+        for resource in resolvers:
+            if resource in request.GET:
+                wanted[resource] = sorted({int(key) for key in request.GET[resource].split(',') if key.strip()})
+    except ValueError:
+        raise ApiError(400, "Ids must be whole numbers")
+    if sum(len(keys) for keys in wanted.values()) > settings.API_MAX_PAGE_SIZE:
+        raise ApiError(400, f"At most {settings.API_MAX_PAGE_SIZE} ids can be asked for at once")
+
+    user_serializer = Serializer(USER_FIELDS, USER_PRIVATE_FIELDS)
+    loaders = BatchLoaders(request.user, columns={
+        'users': user_serializer.columns(),
+        'clubs': Serializer(CLUB_FIELDS).columns(),
+        'memberships': Serializer(MEMBERSHIP_FIELDS).columns(),
+    })
+    for resource, keys in wanted.items():
+        loaders[resource].want(keys)
+    loaders.dispatch()
+    return json_response(request, {
+        resource: {key: resolvers[resource](loaders, key, user_serializer) for key in keys}
+        for resource, keys in wanted.items()
+    })
@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class ClubsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clubs'
+
+    def ready(self):
+        from django.conf import settings
+        from .auth import check_cache_is_shared, forget_user
+        from .changes import record_membership_deletion
+        from .db import apply_sqlite_pragmas
+        from .identity import forget_instance
+        connection_created.connect(apply_sqlite_pragmas)
+        post_delete.connect(record_membership_deletion, sender='clubs.Membership')
+        for model in ('clubs.Club', 'clubs.User'):
+            post_save.connect(forget_instance, sender=model)
+            post_delete.connect(forget_instance, sender=model)
+        post_save.connect(forget_user, sender='clubs.User')
+        post_delete.connect(forget_user, sender='clubs.User')
+        if settings.CACHED_AUTH:
+            check_cache_is_shared()
@@ -0,0 +1,47 @@
+"""Retention of removed memberships.
+
+Removing a user moves their membership to MembershipArchive (see
+Membership.remove_user), so the membership table only holds the rows rosters
+read. Archived rows are kept for MEMBERSHIP_ARCHIVE_RETENTION_DAYS so the
+owner can still reinstate them, then deleted by a purge job a batch at a
+time, so a large purge never holds a long lock. Each run of the job queues
+the next one.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .jobs import enqueue
+from .models import MembershipArchive, Job
+
+PURGE_TASK = 'clubs.archive.purge_archived_memberships'
+
+
+def schedule_archive_purge():
+    """Queue the next purge of expired archived memberships unless it is already queued."""
+    if not Job.objects.filter(task=PURGE_TASK, status=Job.QUEUED).exists():
+        enqueue(PURGE_TASK, delay=settings.MEMBERSHIP_ARCHIVE_PURGE_INTERVAL)
+
+
+def purge_expired_archive(removed_before=None, batch_size=None):
+    """Delete the memberships archived before removed_before and return how many were deleted.
+
+    removed_before defaults to the start of the retention period. Rows are
+    deleted batch_size at a time, each batch in its own transaction.
+    """
+    if removed_before is None:
+        removed_before = timezone.now() - timedelta(days=settings.MEMBERSHIP_ARCHIVE_RETENTION_DAYS)
+    batch_size = batch_size or settings.MEMBERSHIP_ARCHIVE_PURGE_BATCH_SIZE
+    expired = MembershipArchive.objects.filter(updated_at__lt=removed_before).order_by('pk')
+    deleted = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += MembershipArchive.objects.filter(pk__in=pks).delete()[0]
+
+
+def purge_archived_memberships():
+    """The purge job: delete the expired archived memberships and queue the next run."""
+    deleted = purge_expired_archive()
+    schedule_archive_purge()
+    return deleted
@@ -0,0 +1,68 @@
+"""The ASGI handler, extended to send responses streamed from async generators.
+
+Django 3.2 iterates a StreamingHttpResponse synchronously even under ASGI, so
+a stream waiting for events would block the event loop. StreamingASGIHandler
+sends an EventStreamResponse by iterating its async generator on the event
+loop instead, and closes the generator as soon as the client disconnects.
+"""
+import asyncio
+from contextvars import ContextVar
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http.response import HttpResponseBase
+
+# The receive channel of the request being handled by this task
+_receive = ContextVar('receive')
+
+
+class EventStreamResponse(HttpResponseBase):
+    """A text/event-stream response whose content is an async generator of str."""
+
+    streaming = True
+
+    def __init__(self, events, **kwargs):
+        super().__init__(content_type='text/event-stream', **kwargs)
+        self.streaming_content = events
+        self['Cache-Control'] = 'no-cache'
+        self['X-Accel-Buffering'] = 'no'
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGIHandler that also sends EventStreamResponses."""
+
+    async def __call__(self, scope, receive, send):
+        _receive.set(receive)
+        await super().__call__(scope, receive, send)
+
+    async def send_response(self, response, send):
+        if not isinstance(response, EventStreamResponse):
+            return await super().send_response(response, send)
+        headers = [(name.encode('ascii'), value.encode('latin1')) for name, value in response.items()]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip()) for cookie in response.cookies.values()
+        ]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+
+        async def send_events():
+            async for part in response.streaming_content:
+                await send({'type': 'http.response.body', 'body': part.encode(), 'more_body': True})
+            await send({'type': 'http.response.body'})
+
+        sending = asyncio.ensure_future(send_events())
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(_receive.get()))
+        try:
+            await asyncio.wait([sending, disconnect], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (sending, disconnect):
+                task.cancel()
+            await asyncio.gather(sending, disconnect, return_exceptions=True)
+            await response.streaming_content.aclose()
+            await sync_to_async(response.close, thread_sensitive=True)()
+        if not sending.cancelled():
+            # Raise anything that went wrong while streaming
+            sending.result()
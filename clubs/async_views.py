@@ -0,0 +1,219 @@
+"""Async versions of the read-heavy views, served when running under ASGI.
+
+Django 3.2 has no async ORM methods, so each group of independent queries
+(the roster, the statistics, the navigation menu, ...) is a sync function run
+on its own worker thread, and the groups of a page are awaited together.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+from django.shortcuts import redirect, render
+from .asgi import EventStreamResponse
+from .events import latest_event_id, roster_event_stream, streams
+from .helpers import login_prohibited, member_or_above_required, sync_guards
+from .models import User, Club, Membership, MembershipArchive
+
+render_async = sync_to_async(render)
+
+
+def _on_worker_thread(function):
+    def run():
+        try:
+            return function()
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def gather_queries(*functions):
+    """Run independent query functions concurrently and return their results in order.
+
+    Inside a transaction (as in tests) they run one after another on the
+    request's own connection, since other connections cannot see its rows.
+    """
+    if await sync_to_async(lambda: connection.in_atomic_block)():
+        return [await sync_to_async(function)() for function in functions]
+    return await asyncio.gather(*(_on_worker_thread(function)() for function in functions))
+
+
+def _club_with_owner(club_id):
+    club = Club.objects.get(pk=club_id)
+    club.owner
+    return club
+
+
+def _navigation(user):
+    """Return the clubs for the navigation menu as (your_clubs, other_clubs)."""
+    clubs = list(Club.objects.all())
+    your_clubs = Club.objects.for_user(user)
+    other_clubs = list(set(clubs) - set(your_clubs))
+    return your_clubs, other_clubs
+
+
+def _viewer_membership(club_id, user):
+    return Membership.objects.filter(club_id=club_id, user_id=user.id).order_by('pk').first()
+
+
+def _club_statistics(club_id):
+    """Return the club's users, its applicants and its other members."""
+    memberships = list(Membership.objects.filter(club_id=club_id).order_by('pk'))
+    users = User.objects.in_bulk({membership.user_id for membership in memberships})
+    applicant_ids = {membership.user_id for membership in memberships if membership.is_applicant()}
+    club_users = list(users.values())
+    applicants = [user for user in club_users if user.id in applicant_ids]
+    members = [user for user in club_users if user.id not in applicant_ids]
+    return club_users, applicants, members
+
+
+def _removed_members(club_id):
+    """Return the club's archived memberships of active users, with their users loaded."""
+    return list(
+        MembershipArchive.objects.filter(club_id=club_id, user__is_active=True).select_related('user').order_by('pk')
+    )
+
+
+@sync_guards(login_prohibited)
+async def home(request):
+    [clubs] = await gather_queries(lambda: list(Club.objects.all()))
+    return await render_async(request, "home.html", {'clubs': clubs})
+
+
+async def show_club(request, club_id):
+    user = request.user
+    authenticated = await sync_to_async(lambda: user.is_authenticated)()
+    try:
+        [current_club] = await gather_queries(lambda: _club_with_owner(club_id))
+    except Club.DoesNotExist:
+        [first_club] = await gather_queries(lambda: Club.objects.all()[0])
+        return redirect('user_list', first_club.id)
+
+    if authenticated:
+        statistics, user_membership, (your_clubs, other_clubs) = await gather_queries(
+            lambda: _club_statistics(club_id),
+            lambda: _viewer_membership(club_id, user),
+            lambda: _navigation(user),
+        )
+    else:
+        [statistics] = await gather_queries(lambda: _club_statistics(club_id))
+        user_membership = None
+    users, applicants, members = statistics
+    members.append(current_club.owner)
+    masters = [master for master in members if master.chess_level != '1' and master.chess_level != '2']
+
+    context = {
+        'members': members,
+        'applicants': applicants,
+        'masters': masters,
+        'users': users,
+        'current_club': current_club,
+        'user_membership': user_membership,
+        'current_user': user,
+    }
+    if authenticated:
+        is_owner = current_club.is_owner(user)
+        if user_membership:
+            can_apply = user_membership.is_removed_user()
+        else:
+            can_apply = not is_owner
+        context.update({
+            'is_owner': is_owner,
+            'your_clubs': your_clubs,
+            'other_clubs': other_clubs,
+            'user_can_apply': can_apply,
+        })
+    else:
+        context['user_can_apply'] = True
+    return await render_async(request, 'show_club.html', context)
+
+
+@sync_guards(login_required, member_or_above_required)
+async def show_user(request, user_id, club_id):
+    current_user = request.user
+    user, current_club, memberships, (your_clubs, other_clubs) = await gather_queries(
+        lambda: User.objects.filter(id=user_id).first(),
+        lambda: _club_with_owner(club_id),
+        lambda: list(Membership.objects.filter(club_id=club_id, user_id__in=[user_id, current_user.id]).order_by('pk')),
+        lambda: _navigation(current_user),
+    )
+    if user is None:
+        return redirect('user_list', club_id)
+    viewee_membership = next((membership for membership in memberships if membership.user_id == user.id), None)
+    if viewee_membership is None:
+        viewee_membership = await sync_to_async(
+            lambda: MembershipArchive.objects.filter(club_id=club_id, user_id=user.id).first()
+        )()
+    user_membership = next((membership for membership in memberships if membership.user_id == current_user.id), None)
+    # Prevent a member from viewing an applicant's profile by entering the url
+    if viewee_membership and user_membership:
+        if viewee_membership.is_applicant() and user_membership.is_member():
+            messages.error(request, "You are not allowed to view an applicant!")
+            return redirect('user_list', current_club.pk)
+
+    context = {
+        'user_membership': user_membership,
+        'is_owner': current_club.is_owner(current_user),
+        'viewee_membership': viewee_membership,
+        'your_clubs': your_clubs,
+        'other_clubs': other_clubs,
+        'current_club': current_club,
+        'current_user': current_user,
+        'user': user
+    }
+    return await render_async(request, 'show_user.html', context)
+
+
+@sync_guards(login_required, member_or_above_required)
+async def user_list(request, club_id):
+    current_user = request.user
+    current_club, roster, removed_members, (your_clubs, other_clubs) = await gather_queries(
+        lambda: _club_with_owner(club_id),
+        lambda: Membership.objects.roster(club_id),
+        lambda: _removed_members(club_id),
+        lambda: _navigation(current_user),
+    )
+    await sync_to_async(current_user.remember_club)(current_club)
+    is_owner = current_club.is_owner(current_user)
+    user_membership = None
+    if not is_owner:
+        user_membership = next(membership for membership in roster if membership.user_id == current_user.id)
+
+    active = [membership for membership in roster if membership.user.is_active]
+    applicants = []
+    # Prevent hackers from seeing the information in the website tools
+    if is_owner or not user_membership.is_member():
+        applicants = [membership for membership in active if membership.is_applicant()]
+    context = {
+        'user_membership': user_membership,
+        'users': [membership for membership in active if membership.is_member() or membership.is_officer()],
+        'members': [membership for membership in active if membership.is_member()],
+        'officers': [membership for membership in active if membership.is_officer()],
+        'applicants': applicants,
+        'current_user': current_user,
+        'your_clubs': your_clubs,
+        'other_clubs': other_clubs,
+        'current_club': current_club,
+        'is_owner': is_owner,
+        'removed_members': removed_members,
+    }
+    return await render_async(request, 'user_list.html', context)
+
+
+@sync_guards(login_required, member_or_above_required)
+async def roster_stream(request, club_id):
+    current_user = request.user
+    # The stream reads the viewer's role itself on every read of the log
+    current_club = await sync_to_async(Club.objects.get)(pk=club_id)
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    if last_event_id.isdigit():
+        last_event_id = int(last_event_id)
+    else:
+        # A new stream starts from now, so no change is missed before it starts streaming
+        last_event_id = await sync_to_async(latest_event_id)(club_id)
+    queue = streams.open(club_id)
+    if queue is None:
+        # This process already serves as many streams as it may; the roster page polls instead
+        return HttpResponse(status=204)
+    return EventStreamResponse(roster_event_stream(queue, current_club, current_user.id, last_event_id))
@@ -0,0 +1,89 @@
+"""Cached loading of the logged-in user.
+
+AuthenticationMiddleware loads request.user by primary key on every request
+of a logged-in user. With CACHED_AUTH on, CachedUserBackend keeps users in
+the cache under their id and a profile version. Saving or deleting a user,
+whether by editing the profile, changing the password or in the admin,
+replaces the version, so the next request loads the user from the database
+again; code updating users through a queryset calls forget_users(). The version is a fresh random token rather than a counter, so a
+version evicted from the cache can never match a user cached before.
+
+The cache must be shared by every process serving requests: a per-process
+cache would keep serving a user from before a change another process made.
+"""
+import uuid
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from .identity import remember
+
+# Cache backends each process keeps to itself
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def check_cache_is_shared():
+    """Raise ImproperlyConfigured if the default cache is not shared between processes."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PER_PROCESS_CACHES:
+        raise ImproperlyConfigured(
+            "CACHED_AUTH needs a cache shared between processes, such as memcached or Redis, "
+            f"not {backend}; set CACHE_BACKEND and CACHE_LOCATION"
+        )
+
+
+def _version_key(user_id):
+    return f'clubs:user-version:{user_id}'
+
+
+def bump_profile_version(user_id):
+    """Give the user a new profile version, so their cached copy is no longer used."""
+    cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def profile_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(_version_key(user_id), version, None):
+            version = cache.get(_version_key(user_id))
+    return version
+
+
+def forget_users(user_ids):
+    """Replace the profile versions of the users with user_ids, now and again once the transaction commits.
+
+    The second time covers a request that cached a user as they were before
+    the change in between. Without CACHED_AUTH no user is cached, so nothing
+    is done.
+    """
+    if not settings.CACHED_AUTH:
+        return
+    user_ids = list(user_ids)
+    for user_id in user_ids:
+        bump_profile_version(user_id)
+    transaction.on_commit(lambda: [bump_profile_version(user_id) for user_id in user_ids])
+
+
+def forget_user(sender, instance, **kwargs):
+    """post_save and post_delete handler forgetting the cached copy of the user saved or deleted."""
+    forget_users([instance.pk])
+
+
+class CachedUserBackend(ModelBackend):
+    """ModelBackend whose get_user() reads the user from the cache while their profile version is unchanged."""
+
+    def get_user(self, user_id):
+        key = f'clubs:user:{user_id}:{profile_version(user_id)}'
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        else:
+            remember(user)
+        return user
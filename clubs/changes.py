@@ -0,0 +1,68 @@
+"""Change tracking for incremental sync.
+
+Every save of a club, membership or user stamps it with the next number of
+one global change sequence, kept in the ChangeCounter row on the default
+database. The number is taken inside the transaction that writes the row,
+and the counter row stays locked until that transaction commits, so a
+reader that first reads the counter sees every row numbered up to it.
+Deleted memberships leave a MembershipTombstone numbered the same way.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+_moving_memberships = ContextVar('moving_memberships', default=False)
+
+
+def next_change_seq():
+    """Take the next number of the change sequence; call it inside the writing transaction."""
+    from .models import ChangeCounter
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not ChangeCounter.objects.filter(pk=1).update(value=F('value') + 1):
+            ChangeCounter.objects.get_or_create(pk=1)
+            ChangeCounter.objects.filter(pk=1).update(value=F('value') + 1)
+        return ChangeCounter.objects.values_list('value', flat=True).get(pk=1)
+
+
+def current_change_seq():
+    """Return the last number taken from the change sequence."""
+    from .models import ChangeCounter
+    return ChangeCounter.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+class ChangeTrackedQuerySet(models.QuerySet):
+    """QuerySet whose bulk updates are stamped with a change number like saves are."""
+
+    def update(self, **kwargs):
+        if 'change_seq' not in kwargs:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                return super().update(change_seq=next_change_seq(), updated_at=timezone.now(), **kwargs)
+        return super().update(**kwargs)
+    update.alters_data = True
+
+
+@contextmanager
+def moving_memberships():
+    """Delete memberships without leaving tombstones, because they now live on elsewhere.
+
+    Used while a club moves between shards; the copies take a new change number instead.
+    """
+    token = _moving_memberships.set(True)
+    try:
+        yield
+    finally:
+        _moving_memberships.reset(token)
+
+
+def record_membership_deletion(sender, instance, **kwargs):
+    """post_delete handler leaving a tombstone for a deleted membership."""
+    if _moving_memberships.get():
+        return
+    from .models import MembershipTombstone
+    MembershipTombstone.objects.create(
+        club_id=instance.club_id,
+        user_id=instance.user_id,
+        change_seq=next_change_seq(),
+    )
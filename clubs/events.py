@@ -0,0 +1,189 @@
+"""Live roster updates, read from the membership event log.
+
+Every role change appends a MembershipEvent in its own transaction, so the
+log is the broker: a roster stream sends the club's events after the last
+one it sent, whichever process wrote them. Under ASGI each stream is an
+async generator waiting on an asyncio queue between reads of the log;
+publish_membership_change() wakes the streams of this process as soon as a
+change commits, and streams served by other processes read it at their next
+poll. Each read of the log re-reads the viewer's role, so a stream renders
+rows as the viewer may currently see them and ends once they leave the club.
+Under WSGI a stream would tie up a worker thread for minutes, so the roster
+page polls the roster_changes view instead.
+"""
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections import defaultdict, namedtuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from .models import Club, Membership, MembershipArchive, MembershipEvent
+from .rendering import RosterRowRenderer
+
+RosterEvent = namedtuple('RosterEvent', ['id', 'change', 'user_id'])
+
+# The roster change each kind of event is sent as
+CHANGES = {
+    MembershipEvent.APPLIED: 'applied',
+    MembershipEvent.ACCEPTED: 'accepted',
+    MembershipEvent.PROMOTED: 'promoted',
+    MembershipEvent.DEMOTED: 'demoted',
+    MembershipEvent.REMOVED: 'removed',
+    MembershipEvent.REINSTATED: 'reinstated',
+    MembershipEvent.LEFT: 'left',
+    MembershipEvent.OWNERSHIP_TRANSFERRED: 'transferred',
+    MembershipEvent.IMPORTED: 'imported',
+}
+
+# The most events read from the log at once
+EVENT_BATCH = 100
+
+
+def latest_event_id(club_id):
+    """Return the id of the club's latest event, or 0 when it has none."""
+    return MembershipEvent.objects.filter(club_id=club_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def events_after(club_id, last_event_id):
+    """Return the club's RosterEvents after last_event_id, oldest first, at most EVENT_BATCH of them."""
+    events = (
+        MembershipEvent.objects.filter(club_id=club_id, id__gt=last_event_id)
+            .order_by('id').values_list('id', 'kind', 'user_id')[:EVENT_BATCH]
+    )
+    return [RosterEvent(event_id, CHANGES[kind], user_id) for event_id, kind, user_id in events]
+
+
+def viewer_access(club_id, user_id):
+    """Return (is_owner, user_membership) of a viewer of the club's roster, or None when they may not see it."""
+    if Club.objects.filter(pk=club_id, owner_id=user_id).exists():
+        return True, None
+    membership = Membership.objects.filter(club_id=club_id, user_id=user_id).order_by('pk').first()
+    if membership is None or membership.is_applicant() or membership.is_removed_user():
+        return None
+    return False, membership
+
+
+def roster_deltas(current_club, is_owner, user_membership, events):
+    """Return the JSON deltas patching the viewer's roster for events, in the same order."""
+    user_ids = {event.user_id for event in events}
+    memberships = {}
+    for membership in (
+        Membership.objects.filter(club=current_club, user_id__in=user_ids).prefetch_related('user').order_by('pk')
+    ):
+        memberships.setdefault(membership.user_id, membership)
+    # Removed users are only in the archive, with the level of a removed user
+    for archived in MembershipArchive.objects.filter(
+        club_id=current_club.id, user_id__in=user_ids - memberships.keys(),
+    ).select_related('user'):
+        memberships[archived.user_id] = archived
+    renderer = RosterRowRenderer(current_club, is_owner, user_membership)
+    deltas = []
+    for event in events:
+        delta = {'change': event.change, 'user_id': event.user_id, 'level': None, 'html': ''}
+        membership = memberships.get(event.user_id)
+        if membership is not None and membership.user.is_active:
+            delta['level'] = membership.level
+            # Members never see the applicants or the removed users
+            hidden = membership.is_applicant() or membership.is_removed_user()
+            if not (hidden and not is_owner and user_membership.is_member()):
+                delta['html'] = renderer.render_row(membership)
+        deltas.append(delta)
+    return deltas
+
+
+class RosterStreams:
+    """The roster streams open in this process, each woken through its asyncio queue.
+
+    Queues are held weakly, so a stream whose response is dropped before it
+    starts frees its place.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = defaultdict(weakref.WeakKeyDictionary)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._queues.values())
+
+    def open(self, club_id):
+        """Return the queue of a new stream of the club, or None when settings.ROSTER_STREAM_MAX_OPEN are open."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if sum(len(queues) for queues in self._queues.values()) >= settings.ROSTER_STREAM_MAX_OPEN:
+                return None
+            queue = asyncio.Queue()
+            self._queues[club_id][queue] = loop
+        return queue
+
+    def close(self, club_id, queue):
+        with self._lock:
+            self._queues[club_id].pop(queue, None)
+
+    def wake(self, club_id):
+        """Make the club's streams read the log now; safe to call from any thread."""
+        with self._lock:
+            waiting = list(self._queues.get(club_id, {}).items())
+        for queue, loop in waiting:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except RuntimeError:
+                # The stream's event loop has shut down
+                pass
+
+
+streams = RosterStreams()
+
+
+def publish_membership_change(club_id):
+    """Wake this process's roster streams of the club once the change being made is committed."""
+    transaction.on_commit(lambda: streams.wake(club_id))
+
+
+async def roster_event_stream(queue, current_club, user_id, last_event_id):
+    """Yield server-sent events for the club's events after last_event_id to the user with user_id.
+
+    The stream ends when its time is up or when the user may no longer see the roster.
+    """
+    read_access = sync_to_async(viewer_access)
+    read_events = sync_to_async(events_after)
+    render_deltas = sync_to_async(roster_deltas)
+    last_sent = time.monotonic()
+    deadline = last_sent + settings.ROSTER_STREAM_MAX_SECONDS
+    try:
+        yield f"retry: {settings.ROSTER_STREAM_RETRY_MS}\n\n"
+        while True:
+            access = await read_access(current_club.id, user_id)
+            if access is None:
+                break
+            is_owner, user_membership = access
+            events = await read_events(current_club.id, last_event_id)
+            if events:
+                deltas = await render_deltas(current_club, is_owner, user_membership, events)
+                for event, delta in zip(events, deltas):
+                    yield f"id: {event.id}\nevent: membership\ndata: {json.dumps(delta)}\n\n"
+                last_event_id = events[-1].id
+                last_sent = time.monotonic()
+                if len(events) == EVENT_BATCH:
+                    continue
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now - last_sent >= settings.ROSTER_STREAM_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_sent = now
+            timeout = min(
+                settings.ROSTER_STREAM_POLL_SECONDS, deadline - now, last_sent + settings.ROSTER_STREAM_HEARTBEAT - now,
+            )
+            try:
+                await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            # One read of the log covers every change announced so far
+            while not queue.empty():
+                queue.get_nowait()
+    finally:
+        streams.close(current_club.id, queue)
@@ -0,0 +1,88 @@
+"""Streaming exports of club rosters.
+
+The roster is read with iterator() a chunk at a time and written out row
+by row, so an export holds one chunk in memory however large the club is.
+"""
+import csv
+import json
+from django.conf import settings
+from .models import User, Membership
+from .sharding import sharding_enabled
+
+EXPORT_COLUMNS = ('first_name', 'last_name', 'email', 'level', 'chess_level')
+USER_COLUMNS = ('first_name', 'last_name', 'username', 'chess_level')
+LEVEL_NAMES = dict(Membership.MEMBER_CHOICES)
+CHESS_LEVEL_NAMES = dict(User.CHESS_CHOICES)
+
+
+def _row(user, level):
+    first_name, last_name, email, chess_level = user
+    return (first_name, last_name, email, level, CHESS_LEVEL_NAMES.get(chess_level, chess_level))
+
+
+def _sharded_chunk(memberships):
+    users = {
+        user_id: user
+        for user_id, *user in User.objects.filter(pk__in=[user_id for user_id, _ in memberships])
+            .values_list('pk', *USER_COLUMNS)
+    }
+    for user_id, level in memberships:
+        if user_id in users:
+            yield _row(users[user_id], LEVEL_NAMES[level])
+
+
+def roster_rows(club, chunk_size=None):
+    """Yield the club's owner and then each membership as a tuple of EXPORT_COLUMNS."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    yield _row(User.objects.values_list(*USER_COLUMNS).get(pk=club.owner_id), 'owner')
+    memberships = Membership.objects.filter(club=club).order_by('pk')
+    if not sharding_enabled():
+        rows = memberships.values_list(*(f'user__{column}' for column in USER_COLUMNS), 'level')
+        for *user, level in rows.iterator(chunk_size=chunk_size):
+            yield _row(user, LEVEL_NAMES[level])
+        return
+    # Users are not on the club's shard, so each chunk fetches its users with one IN query
+    chunk = []
+    for membership in memberships.values_list('user_id', 'level').iterator(chunk_size=chunk_size):
+        chunk.append(membership)
+        if len(chunk) == chunk_size:
+            yield from _sharded_chunk(chunk)
+            chunk = []
+    yield from _sharded_chunk(chunk)
+
+
+class _Echo:
+    """File-like object handing each line csv.writer writes straight back."""
+
+    def write(self, value):
+        return value
+
+
+# Leading characters that make a spreadsheet read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _spreadsheet_safe(value):
+    """Prefix a user-supplied value with ' when a spreadsheet would run it as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow([_spreadsheet_safe(value) for value in row])
+
+
+def ndjson_stream(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+
+# Export formats, by file extension: (stream of the rows, content type)
+EXPORT_FORMATS = {
+    'csv': (csv_stream, 'text/csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+}
@@ -137,3 +137,22 @@ class CreateClubForm(forms.ModelForm):
         )
         club.save()
         return club
+
+class ImportRosterForm(forms.Form):
+    """Form to import a club roster from a CSV file."""
+
+    file = forms.FileField(
+        label='Roster CSV',
+        help_text='Columns: first_name, last_name, email and optionally bio, chess_level, personal_statement and level.'
+    )
+    password = forms.CharField(
+        label='Password for new users',
+        required=False,
+        widget=forms.PasswordInput(),
+        help_text='Leave blank to create new users without a password.',
+        validators=[RegexValidator(
+            regex=r'^(?=.*[A-Z])(?=.*[a-z])(?=.*[0-9]).*$',
+            message='Password must contain an uppercase character, a lowercase '
+                'character and a number.'
+        )]
+    )
@@ -1,4 +1,6 @@
 """Decorators used on the view functions"""
+from functools import wraps
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect
 from django.conf import settings
 from .models import Club, Membership
@@ -8,12 +10,7 @@ def login_prohibited(view_function):
     def wrapper_func(request, *args, **kwargs):
         current_user = request.user
         if current_user.is_authenticated and not current_user.is_superuser:
-            clubs=Club.objects.all()
-            club=[club for club in clubs if club.is_part_of(current_user)]
-            if(len(club) >= 1):
-                club = club[0]
-            else:
-                club = clubs[0]
+            club = current_user.landing_club() or Club.objects.all()[0]
             return redirect(settings.REDIRECT_URL_WHEN_LOGGED_IN, club_id=club.id)
         else:
             return view_function(request)
@@ -42,9 +39,10 @@ def officer_or_above_required(view_function, *args, **kwargs):
         club=clubs.filter(pk=club_id)[0]
         if club.is_owner(current_user):
             return view_function(request, *args, **kwargs)
-        membership = Membership.objects.all().filter(user=current_user, club=club)[0]
+        # Removed users have no membership left, only an archived one
+        membership = Membership.objects.filter(user=current_user, club=club).first()
 
-        if (membership.is_officer()):
+        if membership is not None and membership.is_officer():
             return view_function(request, *args, **kwargs)
         else:
             return redirect('profile')
@@ -74,3 +72,27 @@ def owner_prohibited(view_function):
             messages.error(request,"Owner cannot do this")
             return redirect('user_list',club.id)
     return wrapper_func
+
+def sync_guards(*decorators):
+    """Apply the sync access-control decorators above to an async view.
+
+    The decorators run on a worker thread against a stand-in view; when they
+    let the request through, the async view runs, otherwise their redirect
+    is returned.
+    """
+    def decorator(view_function):
+        allowed = object()
+        def guard(request, *args, **kwargs):
+            return allowed
+        for guard_decorator in reversed(decorators):
+            guard = guard_decorator(guard)
+        guard = sync_to_async(guard)
+
+        @wraps(view_function)
+        async def wrapper_func(request, *args, **kwargs):
+            response = await guard(request, *args, **kwargs)
+            if response is not allowed:
+                return response
+            return await view_function(request, *args, **kwargs)
+        return wrapper_func
+    return decorator
@@ -0,0 +1,113 @@
+"""Request-scoped identity map for clubs and users.
+
+While IdentityMapMiddleware handles a request, looking up a Club or User by
+primary key returns the instance an earlier lookup of the same request
+loaded, instead of querying again. That covers get(pk=...) in views and
+decorators as well as following foreign keys such as club.owner and
+membership.user, since both models use their identity-mapped manager as
+their base manager. Saving or deleting an instance forgets it, and updating
+or deleting through a queryset forgets every instance of the model. Outside
+a request nothing is remembered.
+
+Instances are remembered per database, so a lookup routed to the primary
+never returns an instance read from the replica or from another shard.
+"""
+from contextvars import ContextVar
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models.query import ModelIterable
+
+_identity_map = ContextVar('identity_map', default=None)
+
+PK_LOOKUPS = {'pk', 'pk__exact', 'id', 'id__exact'}
+
+
+def start_identity_map():
+    return _identity_map.set({})
+
+
+def end_identity_map(token):
+    _identity_map.reset(token)
+
+
+def _pk_lookup(model, args, kwargs):
+    """Return the primary key get(*args, **kwargs) looks up, or None if it is not a lookup of one primary key."""
+    if args:
+        if kwargs or len(args) != 1 or not isinstance(args[0], models.Q):
+            return None
+        q = args[0]
+        if q.negated or len(q.children) != 1 or not isinstance(q.children[0], tuple):
+            return None
+        kwargs = dict(q.children)
+    if len(kwargs) != 1:
+        return None
+    (lookup, value), = kwargs.items()
+    if lookup not in PK_LOOKUPS or value is None:
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (TypeError, ValidationError):
+        return None
+
+
+def remember(instance):
+    """Add an instance loaded elsewhere, such as from a cache, to the current request's identity map."""
+    identities = _identity_map.get()
+    if identities is not None:
+        identities.setdefault((type(instance), instance._state.db, instance.pk), instance)
+
+
+def forget_model(model):
+    identities = _identity_map.get()
+    if identities:
+        for key in [key for key in identities if key[0] is model]:
+            del identities[key]
+
+
+def forget_instance(sender, instance, **kwargs):
+    """post_save and post_delete handler forgetting, on every database, instances other than the one saved."""
+    identities = _identity_map.get()
+    if identities:
+        for key in [key for key, remembered in identities.items()
+                    if key[0] is sender and key[2] == instance.pk and remembered is not instance]:
+            del identities[key]
+
+
+class IdentityMapQuerySet(models.QuerySet):
+    """QuerySet whose get() by primary key returns the instance already loaded in the current request."""
+
+    def _is_plain(self):
+        query = self.query
+        return (
+            self._iterable_class is ModelIterable
+            and not query.where
+            and not query.select_related
+            and not query.annotations
+            and not query.select_for_update
+            and not self._prefetch_related_lookups
+            and query.deferred_loading == (frozenset(), True)
+            and query.low_mark == 0 and query.high_mark is None
+        )
+
+    def get(self, *args, **kwargs):
+        identities = _identity_map.get()
+        pk = _pk_lookup(self.model, args, kwargs) if identities is not None else None
+        if pk is None or not self._is_plain():
+            return super().get(*args, **kwargs)
+        # Filtering may pin the lookup to a shard, so take the database from the filtered queryset
+        key = (self.model, self.filter(*args, **kwargs).db, pk)
+        instance = identities.get(key)
+        if instance is None:
+            instance = identities[key] = super().get(*args, **kwargs)
+        return instance
+
+    def update(self, **kwargs):
+        forget_model(self.model)
+        return super().update(**kwargs)
+    update.alters_data = True
+
+    def delete(self):
+        forget_model(self.model)
+        return super().delete()
+    delete.alters_data = True
+    delete.queryset_only = True
@@ -0,0 +1,146 @@
+"""Bulk import of a club roster from CSV.
+
+The CSV is read as a stream and handled a batch of rows at a time. Each row
+is checked with the same field rules as SignUpForm, and emails are checked
+against the database with one query per batch. The users and memberships
+of a batch are then written with bulk_create. New users all get the same
+password, hashed once for the whole import. An import never enrolls someone
+who has an account already: they have to apply to the club themselves.
+"""
+import csv
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from .activity import membership_change
+from .changes import next_change_seq
+from .forms import SignUpForm
+from .models import User, Membership, MembershipEvent
+from .sharding import shard_for_club, sharding_enabled
+
+IMPORT_COLUMNS = ('first_name', 'last_name', 'email', 'bio', 'chess_level', 'personal_statement', 'level')
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'email')
+# Levels a row can import into, by value or name
+IMPORT_LEVELS = {'1': '1', '2': '2', '3': '3', 'applicant': '1', 'member': '2', 'officer': '3'}
+CHESS_LEVELS = {
+    **{value: value for value, _ in User.CHESS_CHOICES},
+    **{name.lower(): value for value, name in User.CHESS_CHOICES},
+}
+
+
+class RosterImportError(Exception):
+    """Raised when a CSV cannot be imported at all."""
+
+
+# SignUpForm's own field objects check every row; cleaning them keeps no per-row state
+ROW_FIELDS = {name: field for name, field in SignUpForm.base_fields.items() if name in SignUpForm.Meta.fields}
+
+
+class ImportReport:
+    """What an import did: counts of what was created and the errors of rejected rows."""
+
+    def __init__(self):
+        self.created_users = 0
+        self.added_memberships = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+
+def import_roster_csv(club, lines, password=None, actor=None, batch_size=None):
+    """Import the CSV roster read from lines into club and return an ImportReport.
+
+    Rows of users with an account already are reported and skipped, like
+    rows with errors; the rest are imported in one transaction. Without a
+    password new users get an unusable one.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    reader = csv.DictReader(lines)
+    columns = set(reader.fieldnames or ())
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise RosterImportError(f"The CSV has no {', '.join(missing)} column")
+    password_hash = make_password(password)
+    report = ImportReport()
+    seen = {club.owner.username}
+    with membership_change(club):
+        batch = []
+        for row in reader:
+            batch.append((reader.line_num, row))
+            if len(batch) == batch_size:
+                _import_batch(club, batch, password_hash, actor, seen, report)
+                batch = []
+        if batch:
+            _import_batch(club, batch, password_hash, actor, seen, report)
+    return report
+
+
+def _clean_row(line, row, seen, report):
+    """Return the validated (user, level) of a row, or None after reporting its errors."""
+    data = {column: (row.get(column) or '').strip() for column in IMPORT_COLUMNS}
+    data['username'] = data.pop('email')
+    data['chess_level'] = CHESS_LEVELS.get(data['chess_level'].lower() or '1', data['chess_level'])
+    level = IMPORT_LEVELS.get(data.pop('level').lower() or '2')
+    cleaned, valid = {}, True
+    for name, field in ROW_FIELDS.items():
+        try:
+            cleaned[name] = field.clean(data[name])
+        except ValidationError as error:
+            report.error(line, f"{'email' if name == 'username' else name}: {' '.join(error.messages)}")
+            valid = False
+    if not valid:
+        return None
+    if level is None:
+        report.error(line, "level: Must be applicant, member or officer.")
+        return None
+    if cleaned['username'] in seen:
+        report.error(line, "email: Appears more than once or is the owner's.")
+        return None
+    seen.add(cleaned['username'])
+    return User(**cleaned), level
+
+
+def _import_batch(club, batch, password_hash, actor, seen, report):
+    rows = []
+    for line, row in batch:
+        cleaned = _clean_row(line, row, seen, report)
+        if cleaned:
+            rows.append((line, *cleaned))
+    if not rows:
+        return
+    existing = set(
+        User.objects.filter(username__in=[user.username for _, user, _ in rows]).values_list('username', flat=True)
+    )
+    seq, now = next_change_seq(), timezone.now()
+    new_users = []
+    for line, user, level in rows:
+        if user.username in existing:
+            # Nobody joins a club without asking to
+            report.error(line, "email: Already has an account, so they need to apply to the club themselves.")
+            continue
+        user.password = password_hash
+        user.change_seq, user.updated_at = seq, now
+        new_users.append((user, level))
+    User.objects.bulk_create([user for user, _ in new_users])
+    # bulk_create does not return primary keys on SQLite
+    user_ids = dict(
+        User.objects.filter(username__in=[user.username for user, _ in new_users]).values_list('username', 'pk')
+    ) if new_users else {}
+    memberships = [
+        Membership(club_id=club.id, user_id=user_ids[user.username], level=level, change_seq=seq, updated_at=now)
+        for user, level in new_users
+    ]
+    database = shard_for_club(club) if sharding_enabled() else None
+    Membership.objects.using(database).bulk_create(memberships)
+    MembershipEvent.objects.bulk_create([
+        MembershipEvent(
+            club_id=club.id,
+            user_id=membership.user_id,
+            actor_id=actor.pk if actor else None,
+            kind=MembershipEvent.IMPORTED,
+        )
+        for membership in memberships
+    ])
+    report.created_users += len(new_users)
+    report.added_memberships += len(memberships)
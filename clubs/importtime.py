@@ -0,0 +1,87 @@
+"""Import-time profiling of the project's start-up.
+
+Each start of a dyno or management command first imports Django, the
+settings and every installed app. profile_imports() runs a start-up in a
+fresh interpreter with `python -X importtime`, whose report on stderr gives
+each module's own import time and the time including the modules it
+imported, and parses that report. Modules Django loads with
+importlib.import_module, such as the apps' own models modules and the
+settings, are missing from the report; the modules they import are listed
+as top-level imports.
+"""
+import os
+import subprocess
+import sys
+import time
+from django.conf import settings
+
+# Imported only by the code paths that need them rather than at start-up:
+# django_heroku when settings run on Heroku, libgravatar when a gravatar URL is built.
+# (Faker is only ever imported by the seed command.)
+DEFERRED_IMPORTS = ('django_heroku', 'libgravatar')
+
+# Python snippets starting the project the way each kind of process does
+STARTUPS = {
+    'setup': "import django; django.setup()",
+    'wsgi': "import system.wsgi",
+    'manage': "import sys, runpy; sys.argv = ['manage.py', 'check']; runpy.run_path('manage.py', run_name='__main__')",
+}
+
+
+class ImportTime:
+    """One line of an -X importtime report; times are in microseconds."""
+
+    def __init__(self, module, self_us, cumulative_us, depth):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_importtime(lines):
+    """Return the ImportTime of each module in the -X importtime report read from lines."""
+    imports = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The report's header line
+            continue
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        imports.append(ImportTime(module, int(fields[0]), int(fields[1]), (len(name) - len(module) - 1) // 2))
+    return imports
+
+
+def _run_startup(startup, preload, options=()):
+    code = ''.join(f"import {module}; " for module in preload) + STARTUPS[startup]
+    environment = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'system.settings')}
+    process = subprocess.run(
+        [sys.executable, *options, '-c', code],
+        cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True,
+    )
+    if process.returncode:
+        raise RuntimeError(f"The {startup} start-up failed:\n{process.stderr[-2000:]}")
+    return process
+
+
+def profile_imports(startup='setup', preload=()):
+    """Run startup in a fresh interpreter and return the ImportTimes of its imports.
+
+    preload names modules to import before the start-up, to measure what
+    importing them eagerly would cost.
+    """
+    return parse_importtime(_run_startup(startup, preload, ['-X', 'importtime']).stderr.splitlines())
+
+
+def time_startup(startup='setup', preload=()):
+    """Run startup in a fresh interpreter and return the seconds it took, interpreter start included."""
+    start = time.perf_counter()
+    _run_startup(startup, preload)
+    return time.perf_counter() - start
+
+
+def total_us(imports):
+    """The total import time of a report: the sum of its top-level imports."""
+    return sum(entry.cumulative_us for entry in imports if entry.depth == 0)
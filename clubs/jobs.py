@@ -0,0 +1,105 @@
+"""Background jobs stored in the database and run by `manage.py run_worker`.
+
+A job names a function by its dotted path and the keyword arguments to call
+it with. Enqueueing inside a transaction only makes the job visible once the
+transaction commits, so a job never runs against data that was rolled back.
+Jobs that are done are kept for JOB_RETENTION seconds, then deleted by the
+workers while they are idle.
+"""
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+
+def enqueue(task, delay=0, max_attempts=None, **payload):
+    """Queue a call of task (a function or its dotted path) with payload, delay seconds from now."""
+    if callable(task):
+        task = f"{task.__module__}.{task.__qualname__}"
+    return Job.objects.create(
+        task=task,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts):
+    """Return the seconds to wait before retrying a job that has failed attempts times."""
+    return min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+
+
+def _ready_jobs(now):
+    # Running jobs whose lock has expired belong to a worker that died
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+    ).order_by('run_at', 'pk')
+
+
+def claim_job(worker):
+    """Lock the next due job for worker and return it, or None if no job is due.
+
+    Databases with row locks hand out jobs with SELECT ... FOR UPDATE SKIP
+    LOCKED. SQLite has none, so a job is claimed there by a conditional update
+    that only one worker can win.
+    """
+    now = timezone.now()
+    alias = router.db_for_write(Job)
+    ready = _ready_jobs(now).using(alias)
+    claimed = {'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now}
+    jobs = Job.objects.using(alias)
+    if connections[alias].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=alias):
+            pk = ready.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            jobs.filter(pk=pk).update(attempts=F('attempts') + 1, **claimed)
+    else:
+        for candidate in ready.values('pk', 'status', 'locked_at')[:settings.JOB_CLAIM_CANDIDATES]:
+            if jobs.filter(**candidate).update(attempts=F('attempts') + 1, **claimed):
+                pk = candidate['pk']
+                break
+        else:
+            return None
+    return jobs.get(pk=pk)
+
+
+def run_job(job):
+    """Run a claimed job and record whether it is done, will be retried, or has failed."""
+    held = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, locked_at=job.locked_at)
+    try:
+        import_string(job.task)(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            held.update(status=Job.FAILED, last_error=error, locked_at=None)
+            return Job.FAILED
+        run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+        held.update(status=Job.QUEUED, run_at=run_at, last_error=error, locked_at=None)
+        return Job.QUEUED
+    held.update(status=Job.DONE, locked_at=None)
+    return Job.DONE
+
+
+def purge_done_jobs(due_before=None, batch_size=None):
+    """Delete the done jobs that were due before due_before and return how many were deleted.
+
+    due_before defaults to JOB_RETENTION seconds ago. Jobs are deleted
+    batch_size at a time along the status and run_at index, each batch in its
+    own transaction. Failed jobs are kept for inspection.
+    """
+    if due_before is None:
+        due_before = timezone.now() - timedelta(seconds=settings.JOB_RETENTION)
+    batch_size = batch_size or settings.JOB_PURGE_BATCH_SIZE
+    expired = Job.objects.filter(status=Job.DONE, run_at__lt=due_before).order_by('run_at')
+    deleted = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += Job.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,98 @@
+"""Per-request data loaders for the batch API.
+
+A loader collects every key of its type wanted while a batch is resolved
+and fetches them all with one IN query when dispatched. The loaders of a
+batch are dispatched once each, in BatchLoaders.order; a loader only asks
+for keys of the loaders after it, so each type is queried at most once.
+"""
+from django.db.models import Count
+from .models import User, Club, Membership
+
+
+class DataLoader:
+    """Collects keys of one type and loads them with a single call of batch_load."""
+
+    def __init__(self, name, batch_load):
+        self.name = name
+        self.batch_load = batch_load
+        self.pending = set()
+        self.cache = {}
+        self.dispatched = False
+
+    def want(self, keys):
+        if self.dispatched:
+            raise RuntimeError(f"The {self.name} loader has already been dispatched")
+        self.pending.update(key for key in keys if key not in self.cache)
+
+    def dispatch(self):
+        if self.pending:
+            self.cache.update(self.batch_load(sorted(self.pending)))
+            self.pending.clear()
+        self.dispatched = True
+
+    def get(self, key, default=None):
+        return self.cache.get(key, default)
+
+
+class BatchLoaders:
+    """The loaders of one batch request made by viewer.
+
+    columns maps 'users', 'clubs' and 'memberships' to the columns to load
+    of each, so only the fields being returned are read.
+    """
+
+    order = ('rosters', 'stats', 'roles', 'clubs', 'users')
+
+    def __init__(self, viewer, columns):
+        self.viewer = viewer
+        self.columns = columns
+        self.loaders = {name: DataLoader(name, getattr(self, f'load_{name}')) for name in self.order}
+
+    def __getitem__(self, name):
+        return self.loaders[name]
+
+    def dispatch(self):
+        for name in self.order:
+            self.loaders[name].dispatch()
+
+    def load_rosters(self, club_ids):
+        """Every membership of the clubs, as lists keyed by club id."""
+        rosters = {club_id: [] for club_id in club_ids}
+        memberships = Membership.objects.filter(club_id__in=club_ids).order_by('pk').only(
+            'id', 'club', 'user', 'level', *self.columns['memberships']
+        )
+        for membership in memberships:
+            rosters[membership.club_id].append(membership)
+        self['roles'].want(club_ids)
+        self['clubs'].want(club_ids)
+        self['users'].want(membership.user_id for roster in rosters.values() for membership in roster)
+        return rosters
+
+    def load_stats(self, club_ids):
+        """The number of memberships of each level, as dicts keyed by club id."""
+        stats = {club_id: {} for club_id in club_ids}
+        counts = (
+            Membership.objects.filter(club_id__in=club_ids).order_by()
+                .values('club_id', 'level').annotate(count=Count('id'))
+        )
+        for row in counts:
+            stats[row['club_id']][row['level']] = row['count']
+        self['roles'].want(club_ids)
+        self['clubs'].want(club_ids)
+        return stats
+
+    def load_roles(self, club_ids):
+        """The viewer's membership of each club they belong to, keyed by club id."""
+        memberships = Membership.objects.filter(club_id__in=club_ids, user_id=self.viewer.id).only(
+            'id', 'club', 'user', 'level'
+        )
+        self['clubs'].want(club_ids)
+        return {membership.club_id: membership for membership in memberships}
+
+    def load_clubs(self, club_ids):
+        clubs = Club.objects.only('id', 'owner', *self.columns['clubs']).in_bulk(club_ids)
+        self['users'].want(club.owner_id for club in clubs.values())
+        return clubs
+
+    def load_users(self, user_ids):
+        return User.objects.only('id', *self.columns['users']).in_bulk(user_ids)
@@ -0,0 +1,282 @@
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction, OperationalError
+from django.db.models import F
+from django.template import Context, Template
+from django.test import Client, override_settings
+from django.urls import reverse
+from clubs.importtime import DEFERRED_IMPORTS, profile_imports, time_startup, total_us
+from clubs.imports import IMPORT_COLUMNS, import_roster_csv
+from clubs.models import User, Club, Membership, MembershipArchive
+from clubs.rendering import RosterRowRenderer
+from clubs.snapshots import restore_snapshot, write_snapshot
+
+import csv
+import importlib.util
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+
+class Command(BaseCommand):
+    """Performance benchmarks run against a throwaway copy of the schema."""
+
+    help = "Run a performance benchmark scenario against a temporary database."
+
+    scenarios = ['sqlite', 'import', 'snapshot', 'render', 'startup', 'messages']
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=self.scenarios)
+        parser.add_argument('--members', type=int, default=200, help="Memberships in the benchmark club.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds each load run lasts.")
+        parser.add_argument('--readers', type=int, default=4, help="Concurrent reader threads.")
+        parser.add_argument('--writers', type=int, default=1, help="Concurrent writer threads.")
+        parser.add_argument('--rows', type=int, default=50000, help="Rows in the imported roster CSV.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs timed per variant; the best is reported.")
+        parser.add_argument('--cycles', type=int, default=50, help="Promotions timed per variant by the messages scenario.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The benchmarks run against a temporary SQLite database.")
+        with self.temporary_database():
+            self.club = self.seed_club(options['members'])
+            getattr(self, f"bench_{options['scenario']}")(options)
+
+    @contextmanager
+    def temporary_database(self):
+        """Point the default database at a fresh, migrated file for the duration."""
+        database = connections.databases['default']
+        original_name = database['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            connections.close_all()
+            database['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            try:
+                call_command('migrate', verbosity=0)
+                yield
+            finally:
+                connections.close_all()
+                database['NAME'] = original_name
+
+    def seed_club(self, member_count):
+        """Create one club with member_count users: applicants, members and officers, and every fourth one removed.
+
+        Removed users only have an archived membership, as in the live tables.
+        """
+        password = make_password('Password123')
+        User.objects.bulk_create([
+            User(
+                username=f'bench{index}@example.org',
+                first_name=f'Bench{index}',
+                last_name='User',
+                chess_level=str(index % 5 + 1),
+                password=password,
+            )
+            for index in range(member_count + 1)
+        ])
+        # bulk_create does not return primary keys on SQLite
+        users = list(User.objects.filter(username__startswith='bench').order_by('id'))
+        club = Club.objects.create(owner=users[0], name='Bench Chess Club', location='London', description='Benchmarks')
+        Membership.objects.bulk_create([
+            Membership(user=user, club=club, level=str(index % 4))
+            for index, user in enumerate(users[1:]) if index % 4
+        ])
+        MembershipArchive.objects.bulk_create([
+            MembershipArchive(user=user, club=club, previous_level='2')
+            for index, user in enumerate(users[1:]) if not index % 4
+        ])
+        return club
+
+    def report(self, label, values):
+        self.stdout.write(f"{label:<24}" + "  ".join(f"{key}={value}" for key, value in values.items()))
+
+    def bench_sqlite(self, options):
+        """Mixed read/write load with default SQLite settings versus SQLITE_PRAGMAS."""
+        membership_ids = list(Membership.objects.filter(club=self.club).values_list('id', flat=True))
+        original_tuning = getattr(settings, 'SQLITE_TUNING', False)
+        try:
+            for tuned in (False, True):
+                settings.SQLITE_TUNING = tuned
+                connections.close_all()
+                self._set_journal_mode('WAL' if tuned else 'DELETE')
+                results = self._run_mixed_load(membership_ids, tuned, options)
+                self.report('tuned' if tuned else 'default', results)
+        finally:
+            settings.SQLITE_TUNING = original_tuning
+            connections.close_all()
+
+    def _set_journal_mode(self, mode):
+        connection.ensure_connection()
+        connection.connection.execute(f'PRAGMA journal_mode = {mode}')
+        connection.close()
+
+    def _run_mixed_load(self, membership_ids, persistent, options):
+        """Run reader and writer threads for the configured duration and count operations."""
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def read():
+            list(Membership.objects.filter(club=self.club).select_related('user'))
+
+        def write():
+            with transaction.atomic():
+                Membership.objects.filter(pk=random.choice(membership_ids)).update(level=F('level'))
+
+        def worker(operation, key):
+            done = locked = 0
+            while time.perf_counter() < deadline:
+                try:
+                    operation()
+                    done += 1
+                except OperationalError:
+                    locked += 1
+                if not persistent:
+                    # Mirrors CONN_MAX_AGE = 0: a new connection for every request
+                    connection.close()
+            connection.close()
+            with lock:
+                counts[key] += done
+                counts['locked'] += locked
+
+        threads = [threading.Thread(target=worker, args=(read, 'reads')) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=(write, 'writes')) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = options['duration']
+        return {
+            'reads/s': round(counts['reads'] / duration),
+            'writes/s': round(counts['writes'] / duration),
+            'locked': counts['locked'],
+        }
+
+    def bench_import(self, options):
+        """Import a generated roster CSV of --rows new users into the benchmark club."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(IMPORT_COLUMNS)
+        for index in range(options['rows']):
+            writer.writerow([f'Import{index}', 'User', f'import{index}@example.org', '', str(index % 5 + 1), '', 'member'])
+        buffer.seek(0)
+        start = time.perf_counter()
+        report = import_roster_csv(self.club, buffer, password='Password123')
+        duration = time.perf_counter() - start
+        self.report('import', {
+            'rows': options['rows'],
+            'seconds': round(duration, 2),
+            'rows/s': round(options['rows'] / duration),
+            'errors': len(report.errors),
+        })
+
+    def bench_snapshot(self, options):
+        """Time a snapshot and restore of the seeded tables against dumpdata and loaddata."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'clubs.snapshot')
+            start = time.perf_counter()
+            with open(path, 'wb') as output:
+                write_snapshot(output)
+            written = time.perf_counter()
+            with open(path, 'rb') as snapshot:
+                restore_snapshot(snapshot)
+            restored = time.perf_counter()
+            self.report('snapshot', {
+                'dump_s': round(written - start, 2),
+                'load_s': round(restored - written, 2),
+                'bytes': os.path.getsize(path),
+            })
+
+            path = os.path.join(directory, 'clubs.json')
+            start = time.perf_counter()
+            call_command('dumpdata', 'clubs', output=path, verbosity=0)
+            written = time.perf_counter()
+            call_command('loaddata', path, verbosity=0)
+            restored = time.perf_counter()
+            self.report('dumpdata', {
+                'dump_s': round(written - start, 2),
+                'load_s': round(restored - written, 2),
+                'bytes': os.path.getsize(path),
+            })
+
+    def bench_render(self, options):
+        """Time rendering the roster rows with the row template included per row against RosterRowRenderer."""
+        memberships = list(Membership.objects.filter(club=self.club).select_related('user'))
+        context = {'current_club': self.club, 'is_owner': True, 'user_membership': None, 'membership_list': memberships}
+        included = Template(
+            "{% for membership in membership_list %}{% include 'partials/roster_row.html' %}{% endfor %}"
+        )
+        renderers = {
+            'include': lambda: included.render(Context(context)),
+            'compiled': lambda: RosterRowRenderer(self.club, True, None).render(memberships),
+        }
+        for label, render in renderers.items():
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                render()
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            self.report(label, {
+                'rows': len(memberships),
+                'ms': round(best * 1000, 1),
+                'rows/s': round(len(memberships) / best),
+            })
+
+    def bench_startup(self, options):
+        """Time booting a web worker and running manage.py check, with the deferred imports made eagerly and not."""
+        eager = [module for module in DEFERRED_IMPORTS if importlib.util.find_spec(module)]
+        for startup in ('wsgi', 'manage'):
+            for label, preload in (('eager', eager), ('deferred', [])):
+                seconds = min(time_startup(startup, preload) for _ in range(options['repeat']))
+                imports = profile_imports(startup, preload)
+                self.report(f'{startup} {label}', {
+                    'ms': round(seconds * 1000),
+                    'import_ms': round(total_us(imports) / 1000),
+                    'modules': len(imports),
+                })
+
+    def bench_messages(self, options):
+        """Count the database writes of promote-redirect-render cycles with session and with cookie-first messages.
+
+        Each cycle renders the whole roster, so only --cycles members are promoted however large the club is.
+        """
+        storages = {
+            'session': 'django.contrib.messages.storage.session.SessionStorage',
+            'cookie-first': settings.MESSAGE_STORAGE,
+        }
+        for label, storage in storages.items():
+            Membership.objects.filter(club=self.club, level='3').update(level='2')
+            members = list(
+                Membership.objects.filter(club=self.club, level='2').order_by('pk')
+                    .values_list('user_id', flat=True)[:options['cycles']]
+            )
+            writes = {'all': 0, 'session': 0}
+
+            def count_writes(execute, sql, params, many, context):
+                if sql.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+                    writes['all'] += 1
+                    writes['session'] += 'django_session' in sql
+                return execute(sql, params, many, context)
+
+            with override_settings(MESSAGE_STORAGE=storage):
+                client = Client(HTTP_HOST='localhost')
+                client.login(username=self.club.owner.username, password='Password123')
+                start = time.perf_counter()
+                with connection.execute_wrapper(count_writes):
+                    for user_id in members:
+                        client.get(
+                            reverse('promote_club_member', kwargs={'club_id': self.club.id, 'user_id': user_id}),
+                            follow=True,
+                        )
+                duration = time.perf_counter() - start
+            self.report(label, {
+                'cycles': len(members),
+                'writes/cycle': round(writes['all'] / len(members), 2),
+                'session_writes/cycle': round(writes['session'] / len(members), 2),
+                'ms/cycle': round(duration * 1000 / len(members), 1),
+            })
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from clubs.session_cleanup import delete_expired_sessions
+
+class Command(BaseCommand):
+    """Delete expired sessions in small batches, for running from cron or a scheduler."""
+
+    help = "Delete expired sessions a batch at a time without holding up logins."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Sessions deleted per transaction.")
+        parser.add_argument('--pause', type=float, help="Seconds to wait between batches.")
+
+    def handle(self, *args, **options):
+        def progress(deleted):
+            if options['verbosity']:
+                self.stdout.write(f"Deleted {deleted} expired sessions so far...")
+        deleted = delete_expired_sessions(options['batch_size'], options['pause'], progress=progress)
+        if options['verbosity']:
+            self.stdout.write(f"Deleted {deleted} expired sessions.")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from clubs.imports import RosterImportError, import_roster_csv
+from clubs.models import Club
+
+class Command(BaseCommand):
+    """Import a club roster from a CSV file, as the import page does."""
+
+    help = "Import users and memberships into a club from a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('club_id', type=int)
+        parser.add_argument('csv_file')
+        parser.add_argument('--password', help="Password for new users; without it they get none.")
+        parser.add_argument('--batch-size', type=int, help="Rows validated and inserted together.")
+
+    def handle(self, *args, **options):
+        club = Club.objects.filter(pk=options['club_id']).first()
+        if club is None:
+            raise CommandError(f"Club {options['club_id']} does not exist.")
+        try:
+            with open(options['csv_file'], encoding='utf-8-sig', newline='') as lines:
+                report = import_roster_csv(
+                    club, lines, password=options['password'], actor=club.owner, batch_size=options['batch_size']
+                )
+        except (OSError, RosterImportError, UnicodeDecodeError) as error:
+            raise CommandError(str(error))
+        for line, message in report.errors:
+            self.stderr.write(f"Line {line}: {message}")
+        self.stdout.write(
+            f"Created {report.created_users} users and added {report.added_memberships} memberships "
+            f"to {club.name}; {len(report.errors)} errors."
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from clubs.importtime import STARTUPS, profile_imports, total_us
+
+class Command(BaseCommand):
+    """Report the slowest imports of a start-up of the project, measured with python -X importtime."""
+
+    help = "Profile the modules imported while the project starts up."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--startup', choices=STARTUPS, default='setup', help="The start-up to profile.")
+        parser.add_argument('--limit', type=int, default=25, help="Modules listed.")
+        parser.add_argument(
+            '--sort', choices=['cumulative', 'self'], default='cumulative',
+            help="Rank modules by their time including or excluding the modules they import.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            imports = profile_imports(options['startup'])
+        except RuntimeError as error:
+            raise CommandError(error)
+        key = 'cumulative_us' if options['sort'] == 'cumulative' else 'self_us'
+        slowest = sorted(imports, key=lambda entry: getattr(entry, key), reverse=True)[:options['limit']]
+        self.stdout.write(f"{'cumulative ms':>14}{'self ms':>10}  module")
+        for entry in slowest:
+            self.stdout.write(f"{entry.cumulative_us / 1000:>14.1f}{entry.self_us / 1000:>10.1f}  {entry.module}")
+        self.stdout.write(f"{len(imports)} modules imported in {total_us(imports) / 1000:.1f} ms.")
@@ -0,0 +1,22 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from clubs.archive import purge_expired_archive
+
+class Command(BaseCommand):
+    """Delete archived memberships older than the retention period, as the purge job does."""
+
+    help = "Delete removed memberships that have been archived for longer than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.MEMBERSHIP_ARCHIVE_RETENTION_DAYS,
+            help="Keep memberships archived within this many days.",
+        )
+        parser.add_argument('--batch-size', type=int, help="Rows deleted per transaction.")
+
+    def handle(self, *args, **options):
+        removed_before = timezone.now() - timedelta(days=options['days'])
+        deleted = purge_expired_archive(removed_before, batch_size=options['batch_size'])
+        self.stdout.write(f"Deleted {deleted} archived memberships.")
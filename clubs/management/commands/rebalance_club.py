@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from clubs.changes import moving_memberships, next_change_seq
+from clubs.models import Club, ClubShard, Membership
+
+class Command(BaseCommand):
+    """Move a club and its memberships from its current shard to another one."""
+
+    help = "Move a club and its memberships to another shard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('club_id', type=int)
+        parser.add_argument('shard', choices=settings.SHARD_DATABASES)
+
+    def handle(self, *args, **options):
+        club_id = options['club_id']
+        target = options['shard']
+        try:
+            entry = ClubShard.objects.get(pk=club_id)
+        except ClubShard.DoesNotExist:
+            raise CommandError(f"Club {club_id} is not in the shard directory.")
+        source = entry.shard
+        if source == target:
+            self.stdout.write(f"Club {club_id} is already on {target}.")
+            return
+
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), \
+                transaction.atomic(using=source), \
+                transaction.atomic(using=target):
+            club = Club.objects.using(source).get(pk=club_id)
+            memberships = list(Membership.objects.using(source).filter(club_id=club_id))
+            club.save(using=target, force_insert=True)
+            # Membership ids are only unique per shard, so moved rows get new ones,
+            # and a new change number so syncing clients pick them up
+            change_seq = next_change_seq()
+            for membership in memberships:
+                membership.pk = None
+                membership.change_seq = change_seq
+            Membership.objects.using(target).bulk_create(memberships)
+            with moving_memberships():
+                Club.objects.using(source).filter(pk=club_id).delete()
+            ClubShard.objects.filter(pk=club_id).update(shard=target)
+
+        self.stdout.write(f"Moved club {club_id} and {len(memberships)} memberships from {source} to {target}.")
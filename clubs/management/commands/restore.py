@@ -0,0 +1,30 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from clubs.snapshots import SnapshotError, restore_snapshot
+
+class Command(BaseCommand):
+    """Replace the clubs tables with a snapshot written by the snapshot command."""
+
+    help = "Restore the clubs tables from a snapshot, replacing what is there."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Snapshot to read, or - for standard input.")
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+            help="Do not ask before replacing the current data.")
+
+    def handle(self, *args, **options):
+        if options['interactive']:
+            answer = input("This replaces every user, club and membership. Type 'yes' to continue: ")
+            if answer != 'yes':
+                raise CommandError("Restore cancelled.")
+        try:
+            if options['input'] == '-':
+                counts = restore_snapshot(sys.stdin.buffer)
+            else:
+                with open(options['input'], 'rb') as snapshot:
+                    counts = restore_snapshot(snapshot)
+        except (OSError, EOFError, ValueError, SnapshotError, IntegrityError) as error:
+            raise CommandError(f"Restore failed, nothing was changed: {error}")
+        for model, count in counts.items():
+            self.stdout.write(f"{model}: {count}")
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from clubs.jobs import claim_job, purge_done_jobs, run_job
+
+import os
+import socket
+import threading
+import time
+
+class Command(BaseCommand):
+    """Run queued background jobs until interrupted."""
+
+    help = "Run background jobs from the job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOB_WORKER_CONCURRENCY,
+            help="Number of jobs to run at the same time.")
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+            help="Seconds to wait before looking again when no job is due.")
+        parser.add_argument('--burst', action='store_true',
+            help="Exit once no job is due instead of waiting for more.")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.poll_interval = options['poll_interval']
+        self.burst = options['burst']
+        self.purge_lock = threading.Lock()
+        self.next_purge = time.monotonic()
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        concurrency = max(options['concurrency'], 1)
+        if concurrency == 1:
+            self.work(f"{name}:0", close_connections=False)
+            return
+        threads = [
+            threading.Thread(target=self.work, args=(f"{name}:{number}",), daemon=True)
+            for number in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the running jobs...")
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, worker, close_connections=True):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim_job(worker)
+                if job is None:
+                    self.purge_if_due(worker)
+                    if self.burst:
+                        return
+                    self.stop.wait(self.poll_interval)
+                    continue
+                outcome = run_job(job)
+                self.stdout.write(f"{worker} {job.task} #{job.pk}: {outcome}")
+        finally:
+            if close_connections:
+                connections.close_all()
+
+    def purge_if_due(self, worker):
+        """Delete expired done jobs, at most once every JOB_PURGE_INTERVAL seconds across the threads."""
+        with self.purge_lock:
+            now = time.monotonic()
+            if now < self.next_purge:
+                return
+            self.next_purge = now + settings.JOB_PURGE_INTERVAL
+        deleted = purge_done_jobs()
+        if deleted:
+            self.stdout.write(f"{worker} deleted {deleted} done jobs")
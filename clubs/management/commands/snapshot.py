@@ -0,0 +1,22 @@
+import sys
+from django.core.management.base import BaseCommand
+from clubs.snapshots import write_snapshot
+
+class Command(BaseCommand):
+    """Write a compressed snapshot of the clubs tables, for the restore command."""
+
+    help = "Snapshot users, clubs, memberships and the rest of the clubs tables to a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, or - for standard output.")
+        parser.add_argument('--chunk-size', type=int, help="Rows read and written together.")
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            counts = write_snapshot(sys.stdout.buffer, chunk_size=options['chunk_size'])
+            out = self.stderr
+        else:
+            with open(options['output'], 'wb') as output:
+                counts = write_snapshot(output, chunk_size=options['chunk_size'])
+            out = self.stdout
+        out.write(f"Snapshot of {sum(counts.values())} rows written.")
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+import sqlite3
+
+class Command(BaseCommand):
+    """Copy the primary SQLite database onto the local replica file."""
+
+    help = "Bring the local SQLite read replica up to date with the primary."
+
+    def handle(self, *args, **options):
+        replica = settings.REPLICA_DATABASE
+        if not replica:
+            raise CommandError("No replica configured; set DATABASE_REPLICA.")
+        if connections['default'].vendor != 'sqlite' or connections[replica].vendor != 'sqlite':
+            raise CommandError("sync_replica only copies between SQLite databases.")
+        primary = sqlite3.connect(connections['default'].settings_dict['NAME'])
+        target = sqlite3.connect(connections[replica].settings_dict['NAME'])
+        try:
+            primary.backup(target)
+        finally:
+            target.close()
+            primary.close()
+        self.stdout.write("Replica synced!")
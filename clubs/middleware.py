@@ -0,0 +1,138 @@
+"""Middleware used by the clubs app.
+
+Each middleware runs natively in both modes: under WSGI it is called
+synchronously, and under ASGI it awaits the rest of the chain on the event
+loop. Django would otherwise adapt a sync-only middleware onto the one
+thread shared by every request, serialising the async views behind it.
+"""
+import asyncio
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.shortcuts import render
+from .identity import end_identity_map, start_identity_map
+from .profiling import PROFILE_MODES, RequestProfile
+from .routers import RequestRouting, current_routing, reset_routing, set_routing
+
+PROFILE_PARAMETER = '__profile'
+
+STICKY_PRIMARY_COOKIE = 'sticky_primary'
+
+
+class SyncAndAsyncMiddleware:
+    """Base of the middleware below: __call__ handles sync requests and __acall__ async ones."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function, so Django awaits it
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class RequestProfilerMiddleware(SyncAndAsyncMiddleware):
+    """Replace the response with a profile report when a staff user asks for one.
+
+    Adding ?__profile=cprofile or ?__profile=sql to any URL profiles the request.
+    Must come after AuthenticationMiddleware; the parameter is ignored for
+    anyone who is not staff. Under ASGI a profiled request runs on a worker
+    thread, so the report leaves out queries an async view runs on other threads.
+    """
+
+    def handle(self, request):
+        mode = request.GET.get(PROFILE_PARAMETER)
+        if mode not in PROFILE_MODES or not request.user.is_staff:
+            return self.get_response(request)
+        return self._profile(request, mode, self.get_response)
+
+    async def __acall__(self, request):
+        mode = request.GET.get(PROFILE_PARAMETER)
+        # Only a request asking for a profile loads the user
+        if mode not in PROFILE_MODES or not await sync_to_async(lambda: request.user.is_staff)():
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(request, mode, async_to_sync(self.get_response))
+
+    def _profile(self, request, mode, get_response):
+        profile = RequestProfile(mode)
+        response = profile.run(get_response, request)
+        return render(request, 'profile_report.html', {
+            'profile': profile,
+            'profiled_path': request.path,
+            'profiled_status': response.status_code,
+        })
+
+
+class IdentityMapMiddleware(SyncAndAsyncMiddleware):
+    """Give each request its own identity map of clubs and users (see clubs/identity.py)."""
+
+    def handle(self, request):
+        token = start_identity_map()
+        try:
+            return self.get_response(request)
+        finally:
+            end_identity_map(token)
+
+    async def __acall__(self, request):
+        token = start_identity_map()
+        try:
+            return await self.get_response(request)
+        finally:
+            end_identity_map(token)
+
+
+class ReplicaRoutingMiddleware(SyncAndAsyncMiddleware):
+    """Let ReplicaRouter send reads from settings.REPLICA_READ_VIEWS to the replica.
+
+    Only GET and HEAD requests are routed to the replica. A request that writes
+    sets a short-lived cookie that keeps the user's next requests on the
+    primary, so they do not read data the replica has not caught up with yet.
+    """
+
+    def handle(self, request):
+        routing = RequestRouting()
+        token = set_routing(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_routing(token)
+        return self._stick_to_primary(routing, response)
+
+    async def __acall__(self, request):
+        routing = RequestRouting()
+        token = set_routing(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_routing(token)
+        return self._stick_to_primary(routing, response)
+
+    def _stick_to_primary(self, routing, response):
+        if routing.wrote and settings.REPLICA_DATABASE:
+            response.set_cookie(
+                STICKY_PRIMARY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = current_routing()
+        routing.use_replica = bool(
+            settings.REPLICA_DATABASE
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.url_name in settings.REPLICA_READ_VIEWS
+            and STICKY_PRIMARY_COOKIE not in request.COOKIES
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.8 on 2026-10-19 14:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0006_applicant_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membershipevent',
+            name='actor',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='membershipevent',
+            name='kind',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'applied'), (2, 'accepted'), (3, 'promoted'), (4, 'demoted'), (5, 'removed'), (6, 'reinstated'), (7, 'left'), (8, 'ownership transferred')]),
+        ),
+    ]
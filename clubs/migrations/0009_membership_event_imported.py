@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0008_change_tracking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='membershipevent',
+            name='kind',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'applied'), (2, 'accepted'), (3, 'promoted'), (4, 'demoted'), (5, 'removed'), (6, 'reinstated'), (7, 'left'), (8, 'ownership transferred'), (9, 'imported')]),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 3.2.8 on 2026-10-19 15:05
+
+from django.conf import settings
+from django.db import connections, migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def _membership_databases(apps, alias):
+    """The databases with a membership table: this one and any shards already migrated."""
+    table = apps.get_model('clubs', 'Membership')._meta.db_table
+    return [
+        database for database in [alias, *settings.CLUB_SHARDS]
+        if table in connections[database].introspection.table_names()
+    ]
+
+
+def archive_removed_memberships(apps, schema_editor):
+    Membership = apps.get_model('clubs', 'Membership')
+    MembershipArchive = apps.get_model('clubs', 'MembershipArchive')
+    alias = schema_editor.connection.alias
+    for database in _membership_databases(apps, alias):
+        removed = Membership.objects.using(database).filter(level='0')
+        archived = {
+            (membership.club_id, membership.user_id): MembershipArchive(
+                club_id=membership.club_id,
+                user_id=membership.user_id,
+                previous_level='0',
+                change_seq=membership.change_seq,
+                updated_at=membership.updated_at,
+            )
+            for membership in removed.iterator()
+        }
+        MembershipArchive.objects.using(alias).bulk_create(archived.values())
+        removed.delete()
+
+
+def unarchive_removed_memberships(apps, schema_editor):
+    Membership = apps.get_model('clubs', 'Membership')
+    MembershipArchive = apps.get_model('clubs', 'MembershipArchive')
+    ClubShard = apps.get_model('clubs', 'ClubShard')
+    alias = schema_editor.connection.alias
+    shards = dict(ClubShard.objects.using(alias).values_list('pk', 'shard')) if settings.CLUB_SHARDS else {}
+    for archived in MembershipArchive.objects.using(alias).iterator():
+        Membership.objects.using(shards.get(archived.club_id, alias)).create(
+            club_id=archived.club_id,
+            user_id=archived.user_id,
+            level='0',
+            change_seq=archived.change_seq,
+            updated_at=archived.updated_at,
+        )
+    MembershipArchive.objects.using(alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0009_membership_event_imported'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change_seq', models.PositiveBigIntegerField(db_index=True, default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('previous_level', models.CharField(choices=[('0', 'removed_user'), ('1', 'applicant'), ('2', 'member'), ('3', 'officer')], max_length=12)),
+                ('club', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='clubs.club')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='membershiparchive',
+            index=models.Index(fields=['updated_at'], name='clubs_membe_updated_4fee15_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='membershiparchive',
+            constraint=models.UniqueConstraint(fields=('club', 'user'), name='unique_archived_membership'),
+        ),
+        migrations.RunPython(archive_removed_memberships, unarchive_removed_memberships),
+    ]
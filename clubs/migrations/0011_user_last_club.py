@@ -0,0 +1,19 @@
+# Generated by Django 3.2.8 on 2026-10-19 15:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0010_membership_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='last_club',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='clubs.club'),
+        ),
+    ]
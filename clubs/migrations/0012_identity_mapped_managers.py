@@ -0,0 +1,28 @@
+# Generated by Django 3.2.8 on 2026-10-19 15:20
+
+import clubs.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0011_user_last_club'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='club',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'base_manager_name': 'objects', 'verbose_name': 'user', 'verbose_name_plural': 'users'},
+        ),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', clubs.models.UserManager()),
+            ],
+        ),
+    ]
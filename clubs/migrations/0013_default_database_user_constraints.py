@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class AlterFieldOffShards(migrations.AlterField):
+    """AlterField that leaves shard databases alone.
+
+    Shards hold clubs and memberships but no users table, so their foreign
+    keys to users stay without a constraint while the default database gets
+    its constraints back.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias not in settings.SHARD_DATABASES:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.alias not in settings.SHARD_DATABASES:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0012_identity_mapped_managers'),
+    ]
+
+    operations = [
+        AlterFieldOffShards(
+            model_name='club',
+            name='owner',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owner', to=settings.AUTH_USER_MODEL),
+        ),
+        AlterFieldOffShards(
+            model_name='membership',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
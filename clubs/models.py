@@ -1,10 +1,42 @@
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, transaction
 from django.core.validators import RegexValidator
-from django.contrib.auth.models import AbstractUser
-from libgravatar import Gravatar
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+from django.utils import timezone
 from system import settings
+from .changes import next_change_seq
+from .identity import IdentityMapQuerySet
+from .sharding import ClubManager, MembershipManager, allocate_club, sharding_enabled
 
-class User(AbstractUser):
+
+class ChangeTracked(models.Model):
+    """Abstract model numbered from the change sequence on every save (see clubs/changes.py)."""
+
+    change_seq = models.PositiveBigIntegerField(default=0, db_index=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    # Fields not worth syncing when they are the only ones saved
+    untracked_fields = frozenset()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if set(update_fields) <= self.untracked_fields:
+                return super().save(*args, **kwargs)
+            kwargs['update_fields'] = {*update_fields, 'change_seq', 'updated_at'}
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            self.change_seq = next_change_seq()
+            self.updated_at = timezone.now()
+            super().save(*args, **kwargs)
+
+
+class UserManager(BaseUserManager.from_queryset(IdentityMapQuerySet)):
+    """Manager for users, remembering the ones looked up by primary key during a request."""
+
+
+class User(AbstractUser, ChangeTracked):
 
     """The chess level choices"""
     CHESS_CHOICES = (
@@ -29,12 +61,20 @@ class User(AbstractUser):
         ],
     )
     personal_statement = models.CharField(max_length=520, blank=True)
+    # Kept up to date by the notification digests, so the menu badge costs no query
+    unread_notifications = models.PositiveIntegerField(default=0)
+    # The club whose user list was last opened, where logging in leads back to.
+    # Clubs may live on a shard, so no constraint.
+    last_club = models.ForeignKey(
+        'Club', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
 
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
     def gravatar(self, size=120):
         """Return a URL to the user's gravatar."""
+        from libgravatar import Gravatar
         gravatar_object = Gravatar(self.username)
         gravatar_url = gravatar_object.get_image(size=size, default="identicon")
         return gravatar_url
@@ -43,16 +83,63 @@ class User(AbstractUser):
         """Return a URL to a miniature version of the user's gravatar."""
         return self.gravatar(size=60)
 
+    def landing_club(self):
+        """Return the club to go to after logging in, or None if the user is in no club.
+
+        That is the club last opened while the user still belongs to it,
+        checked by primary key, or else the first club they belong to.
+        """
+        clubs = Club.objects.belonging_to(self)
+        if self.last_club_id is not None:
+            club = clubs.filter(pk=self.last_club_id).first()
+            if club is not None:
+                return club
+        # Sharded clubs are sliced per shard, so take the lowest of each shard's first
+        return min(clubs.order_by('pk')[:1], key=lambda club: club.pk, default=None)
+
+    def last_opened_club(self):
+        """Return the club whose user list the user last opened, or None."""
+        if self.last_club_id is None:
+            return None
+        return Club.objects.filter(pk=self.last_club_id).first()
+
+    def remember_club(self, club):
+        """Record club as the one to land on at the next login, if it is not already.
+
+        The user list calls this on GETs served from the replica, so it
+        writes to the primary directly: going through the router would mark
+        the request as a writer and keep the user on the primary.
+        """
+        if self.last_club_id != club.id:
+            self.last_club_id = club.id
+            self.save(update_fields=['last_club'], using=DEFAULT_DB_ALIAS)
+
+    untracked_fields = frozenset({'last_login', 'last_club'})
+
+    objects = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        # Following foreign keys to users goes through the identity map too
+        base_manager_name = 'objects'
+
 User._meta.get_field("username").verbose_name = "email"
 
 
-class Club(models.Model):
+class ClubShard(models.Model):
+    """Directory entry handing out a club id and recording the shard the club lives on."""
+
+    shard = models.CharField(max_length=50)
+
+
+class Club(ChangeTracked):
 
     name = models.CharField(max_length=50, blank=False, unique = True)
     location = models.CharField(max_length=50, blank=False)
     description = models.CharField(max_length=50, blank=False)
 
-    # The owner is stored in the club and does not have a membership
+    # The owner is stored in the club and does not have a membership.
+    # Shard databases have no users table, so their copy of this column has
+    # no constraint (see migration 0013).
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -64,8 +151,35 @@ class Club(models.Model):
 
     members = models.ManyToManyField(User, through='Membership')
 
+    objects = ClubManager()
+
+    class Meta:
+        # Following foreign keys to clubs goes through the identity map too
+        base_manager_name = 'objects'
+
+    def save(self, *args, **kwargs):
+        if self.pk is None and sharding_enabled():
+            self.pk, kwargs['using'] = allocate_club()
+            kwargs['force_insert'] = True
+            try:
+                super().save(*args, **kwargs)
+            except Exception:
+                # The directory entry lives on the default database, outside the shard's transaction
+                ClubShard.objects.filter(pk=self.pk).delete()
+                self.pk = None
+                raise
+            return
+        super().save(*args, **kwargs)
+
     def is_part_of(self, user):
-        return user == self.owner or self.members.filter(pk=user.id)
+        return user == self.owner or Membership.objects.filter(club=self, user_id=user.id).exists()
+
+    def member_users(self):
+        """Return the users with a membership of this club, even when it lives on a shard."""
+        if not sharding_enabled():
+            return User.objects.filter(membership__club=self)
+        user_ids = Membership.objects.filter(club=self).values_list('user_id', flat=True)
+        return User.objects.filter(pk__in=list(user_ids))
 
     def removed_members(self,user):
         self.members.remove(user.id)
@@ -76,7 +190,7 @@ class Club(models.Model):
     def __str__(self):
         return self.name
 
-class Membership(models.Model):
+class Membership(ChangeTracked):
 
     MEMBER_CHOICES = (
         ("0","removed_user"),
@@ -85,6 +199,7 @@ class Membership(models.Model):
         ("3","officer"),
     )
 
+    # Unconstrained on shard databases, which have no users table (see migration 0013)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     club = models.ForeignKey(Club, on_delete=models.CASCADE)
     level = models.CharField(
@@ -93,6 +208,8 @@ class Membership(models.Model):
         default="1",
     )
 
+    objects = MembershipManager()
+
     def leave_club(self):
         self.club.removed_members(self.user)
         self.delete()
@@ -110,10 +227,171 @@ class Membership(models.Model):
         return self.level == "3"
 
     def remove_user(self):
-         self.level = '0'
-         self.save()
+        """Move the membership to the archive and return the archived row.
+
+        This instance is left with the level of a removed user.
+        """
+        archived = None
+        if self.pk is not None:
+            archived, _ = MembershipArchive.objects.update_or_create(
+                club_id=self.club_id,
+                user_id=self.user_id,
+                defaults={'previous_level': self.level},
+            )
+            self.delete()
+        self.level = '0'
+        return archived
 
     def reinstate_user(self):
         if self.level == "0":
             self.level = '1'
             self.save()
+
+
+class MembershipArchive(ChangeTracked):
+    """A removed membership, kept out of the membership table until it is reinstated or purged.
+
+    Archived rows live on the default database even when the club is on a
+    shard, so they have no constraints. They stand in for the membership on
+    the roster, with the level of a removed user; updated_at is when it was
+    removed.
+    """
+
+    level = "0"
+
+    club = models.ForeignKey(Club, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    previous_level = models.CharField(max_length=12, choices=Membership.MEMBER_CHOICES)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['club', 'user'], name='unique_archived_membership')]
+        indexes = [models.Index(fields=['updated_at'])]
+
+    def is_removed_user(self):
+        return True
+
+    def is_applicant(self):
+        return False
+
+    def is_member(self):
+        return False
+
+    def is_officer(self):
+        return False
+
+    def reinstate_user(self):
+        """Move the membership back to the club as an applicant and return it."""
+        membership = Membership(club_id=self.club_id, user_id=self.user_id, level='1')
+        membership.save()
+        self.delete()
+        return membership
+
+
+class ChangeCounter(models.Model):
+    """The single row holding the last number taken from the change sequence."""
+
+    value = models.PositiveBigIntegerField(default=0)
+
+
+class MembershipTombstone(models.Model):
+    """Marks a deleted membership for clients syncing changes (see clubs/changes.py)."""
+
+    club = models.ForeignKey(Club, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    change_seq = models.PositiveBigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['club', 'change_seq'])]
+
+
+class MembershipEvent(models.Model):
+    """Append-only record of something that happened to a membership.
+
+    The log outlives deleted clubs and users, and lives on the default
+    database even when the club is on a shard, so it has no constraints.
+    """
+
+    APPLIED = 1
+    ACCEPTED = 2
+    PROMOTED = 3
+    DEMOTED = 4
+    REMOVED = 5
+    REINSTATED = 6
+    LEFT = 7
+    OWNERSHIP_TRANSFERRED = 8
+    IMPORTED = 9
+    KIND_CHOICES = (
+        (APPLIED, "applied"),
+        (ACCEPTED, "accepted"),
+        (PROMOTED, "promoted"),
+        (DEMOTED, "demoted"),
+        (REMOVED, "removed"),
+        (REINSTATED, "reinstated"),
+        (LEFT, "left"),
+        (OWNERSHIP_TRANSFERRED, "ownership transferred"),
+        (IMPORTED, "imported"),
+    )
+
+    club = models.ForeignKey(Club, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    # The user whose membership changed, and who changed it if that was someone else
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    actor = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['club', 'id'])]
+
+
+class Notification(models.Model):
+    """A digest telling an officer or owner about a club's new applicants (see clubs/notifications.py)."""
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    club = models.ForeignKey(Club, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    applicant_count = models.PositiveIntegerField()
+    # The applications covered, as the range of their MembershipEvent ids
+    first_event_id = models.PositiveBigIntegerField()
+    last_event_id = models.PositiveBigIntegerField()
+    read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'id']),
+            models.Index(fields=['club', 'last_event_id']),
+        ]
+
+
+class Job(models.Model):
+    """A background job waiting for, or run by, a `run_worker` process (see clubs/jobs.py)."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    # Dotted path of the function to call with the payload as keyword arguments
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
@@ -0,0 +1,77 @@
+"""Applicant notifications, sent to a club's officers and owner as batched digests.
+
+Applying only appends a MembershipEvent and, once per club and time window,
+queues a digest job. The job turns every application since the club's last
+digest into one Notification per officer and bumps their unread counters.
+"""
+import time
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from .activity import log_membership_event
+from .auth import forget_users
+from .jobs import enqueue
+from .models import User, Club, Membership, MembershipEvent, Notification, Job
+
+DIGEST_TASK = 'clubs.notifications.send_applicant_digest'
+
+
+def record_application(club, user):
+    """Log that user applied to club and make sure the officers get a digest of it."""
+    log_membership_event(club, user, MembershipEvent.APPLIED)
+    schedule_digest(club.id)
+
+
+def schedule_digest(club_id):
+    """Queue the digest for the club's current time window unless it is already queued."""
+    window_length = settings.NOTIFICATION_DIGEST_WINDOW
+    now = time.time()
+    window = int(now // window_length)
+    queued = Job.objects.filter(
+        task=DIGEST_TASK, status=Job.QUEUED, payload__club_id=club_id, payload__window=window
+    )
+    if not queued.exists():
+        enqueue(DIGEST_TASK, delay=(window + 1) * window_length - now, club_id=club_id, window=window)
+
+
+def send_applicant_digest(club_id, window=None):
+    """Notify the club's officers and owner of the applications since its last digest.
+
+    Returns the number of applications covered. Running it again is harmless,
+    as the last digest's event id is the cursor for the next one.
+    """
+    with transaction.atomic():
+        cursor = Notification.objects.filter(club_id=club_id).aggregate(cursor=Max('last_event_id'))['cursor']
+        event_ids = list(
+            MembershipEvent.objects.filter(club_id=club_id, kind=MembershipEvent.APPLIED, id__gt=cursor or 0)
+                .order_by('id').values_list('id', flat=True)
+        )
+        if not event_ids:
+            return 0
+        club = Club.objects.filter(pk=club_id).first()
+        if club is None:
+            return 0
+        officer_ids = Membership.objects.filter(club_id=club_id, level='3').values_list('user_id', flat=True)
+        recipient_ids = {club.owner_id, *officer_ids} - {None}
+        Notification.objects.bulk_create([
+            Notification(
+                recipient_id=recipient_id,
+                club_id=club_id,
+                applicant_count=len(event_ids),
+                first_event_id=event_ids[0],
+                last_event_id=event_ids[-1],
+            )
+            for recipient_id in recipient_ids
+        ])
+        User.objects.filter(pk__in=recipient_ids).update(unread_notifications=F('unread_notifications') + 1)
+        forget_users(recipient_ids)
+    return len(event_ids)
+
+
+def mark_notifications_read(user):
+    """Mark all of user's notifications as read and clear their badge."""
+    with transaction.atomic():
+        Notification.objects.filter(recipient=user, read=False).update(read=True)
+        User.objects.filter(pk=user.pk).update(unread_notifications=0)
+        forget_users([user.pk])
+    user.unread_notifications = 0
@@ -0,0 +1,64 @@
+"""Who may take which action on a membership of a club.
+
+A viewer acts with a role: OWNER, or the level of their own membership.
+ROSTER_ACTIONS maps every (role, target membership level) pair to the
+actions allowed, and is built once at import from ACTION_RULES. The roster
+template looks each row's actions up there, and the views and the API check
+the same table before changing a membership.
+"""
+from .models import Membership
+
+OWNER = 'owner'
+
+TRANSFER = 'transfer'
+PROMOTE = 'promote'
+DEMOTE = 'demote'
+ACCEPT = 'accept'
+REJECT = 'reject'
+REMOVE = 'remove'
+REINSTATE = 'reinstate'
+
+# The roles allowed to take each action, and the levels it can be taken on
+ACTION_RULES = {
+    TRANSFER: ({OWNER}, {'3'}),
+    PROMOTE: ({OWNER}, {'2'}),
+    DEMOTE: ({OWNER}, {'3'}),
+    ACCEPT: ({OWNER, '3'}, {'1'}),
+    REJECT: ({OWNER}, {'1'}),
+    REMOVE: ({OWNER}, {'2', '3'}),
+    REINSTATE: ({OWNER}, {'0'}),
+}
+
+ROLES = (OWNER, '3', '2', '1', '0')
+LEVELS = ('0', '1', '2', '3')
+NO_ACTIONS = frozenset()
+
+ROSTER_ACTIONS = {
+    (role, level): frozenset(
+        action for action, (roles, levels) in ACTION_RULES.items() if role in roles and level in levels
+    )
+    for role in ROLES
+    for level in LEVELS
+}
+
+
+def role_of(is_owner, membership):
+    """Return the role of a viewer who owns the club if is_owner, or else holds membership (possibly None)."""
+    if is_owner:
+        return OWNER
+    return membership.level if membership else None
+
+
+def viewer_role(club, user):
+    """Return the role user acts with in club, looking their membership up unless they own it."""
+    if club.is_owner(user):
+        return OWNER
+    return role_of(False, Membership.objects.filter(club=club, user_id=user.id).order_by('pk').first())
+
+
+def actions_for(role, level):
+    return ROSTER_ACTIONS.get((role, level), NO_ACTIONS)
+
+
+def can(action, role, level):
+    return action in ROSTER_ACTIONS.get((role, level), NO_ACTIONS)
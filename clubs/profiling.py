@@ -0,0 +1,143 @@
+"""Collectors used by the on-demand request profiler."""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+PROFILE_MODES = ('cprofile', 'sql')
+
+# Number of rows kept from the cProfile call statistics
+STATS_LIMIT = 40
+
+_active = threading.local()
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    """Template.render replacement recording render time while a profile is active."""
+    timings = getattr(_active, 'templates', None)
+    if timings is None:
+        return _original_render(self, context)
+    depth = _active.depth
+    entry = {'name': self.origin.template_name or self.origin.name, 'depth': depth, 'time': 0.0}
+    timings.append(entry)
+    _active.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        entry['time'] = (time.perf_counter() - start) * 1000
+        _active.depth = depth
+
+
+_timer_lock = threading.Lock()
+_timer_users = 0
+
+
+@contextmanager
+def template_timer():
+    """Patch template rendering for as long as at least one profiled request is running.
+
+    Requests that are not profiled render with the original Template.render
+    whenever no profile is in progress.
+    """
+    global _timer_users
+    with _timer_lock:
+        if _timer_users == 0:
+            Template.render = _timed_render
+        _timer_users += 1
+    try:
+        yield
+    finally:
+        with _timer_lock:
+            _timer_users -= 1
+            if _timer_users == 0:
+                Template.render = _original_render
+
+
+def _query_origin():
+    """Return the innermost project frames that led to the current query."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+            and 'site-packages' not in frame.filename
+            and not frame.filename.endswith('profiling.py')
+    ]
+    return [
+        f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in frames[-3:]
+    ]
+
+
+class QueryCollector:
+    """Database execute wrapper recording every query with its timing and origin."""
+
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': params,
+                'time': (time.perf_counter() - start) * 1000,
+                'origin': _query_origin(),
+            })
+
+
+class RequestProfile:
+    """Profile of a single request, filled in while the view runs."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.queries = []
+        self.templates = []
+        self.stats = ''
+        self.total_time = 0.0
+
+    def run(self, function, *args):
+        """Call function while collecting queries, templates and (optionally) cProfile stats."""
+        profiler = cProfile.Profile() if self.mode == 'cprofile' else None
+        collector = QueryCollector(self.queries)
+        _active.templates = self.templates
+        _active.depth = 0
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(template_timer())
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(collector))
+                if profiler:
+                    profiler.enable()
+                try:
+                    return function(*args)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            self.total_time = (time.perf_counter() - start) * 1000
+            _active.templates = None
+            if profiler:
+                self.stats = self._format_stats(profiler)
+
+    def _format_stats(self, profiler):
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output).sort_stats('cumulative')
+        stats.print_stats(STATS_LIMIT)
+        stats.print_callees(STATS_LIMIT)
+        return output.getvalue()
+
+    @property
+    def query_time(self):
+        return sum(query['time'] for query in self.queries)
@@ -0,0 +1,121 @@
+"""Database routers for the clubs app."""
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from .sharding import shard_for_club
+
+# Apps that are always read from the primary and whose writes do not make a request sticky
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_request_routing = ContextVar('request_routing', default=None)
+
+
+class RequestRouting:
+    """Routing state of the request being handled."""
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def current_routing():
+    return _request_routing.get()
+
+
+def set_routing(routing):
+    return _request_routing.set(routing)
+
+
+def reset_routing(token):
+    _request_routing.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads from the read-only views to settings.REPLICA_DATABASE.
+
+    Writes always go to the primary. Once a request has written, its remaining
+    reads go to the primary too so it reads its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing()
+        if (routing and routing.use_replica and not routing.wrote
+                and settings.REPLICA_DATABASE
+                and model._meta.app_label not in PRIMARY_ONLY_APPS):
+            return settings.REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        routing = current_routing()
+        if routing and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            routing.wrote = True
+        instance = hints.get('instance')
+        if instance is not None and settings.REPLICA_DATABASE and instance._state.db == settings.REPLICA_DATABASE:
+            # Instances read from the replica are saved back to the primary
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        replicated = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+        if obj1._state.db in replicated and obj2._state.db in replicated:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if settings.REPLICA_DATABASE and db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+
+class ShardRouter:
+    """Keep clubs and memberships on their club's shard while sharding is on.
+
+    Everything else, users included, stays on the default database. Shard
+    databases only ever get the Club and Membership tables.
+    """
+
+    sharded_models = {'club', 'membership'}
+
+    def _is_sharded(self, model):
+        return model._meta.app_label == 'clubs' and model._meta.model_name in self.sharded_models
+
+    def _hinted_shard(self, hints):
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._state.db in settings.CLUB_SHARDS:
+            return instance._state.db
+        if instance._meta.model_name == 'membership':
+            return shard_for_club(instance.club_id) if instance.club_id else None
+        if instance._meta.model_name == 'club' and instance.pk:
+            return shard_for_club(instance.pk)
+        return None
+
+    def _route(self, model, hints):
+        if not settings.CLUB_SHARDS:
+            return None
+        if self._is_sharded(model):
+            return self._hinted_shard(hints)
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in settings.CLUB_SHARDS:
+            # Users related to a club on a shard are still global
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if settings.CLUB_SHARDS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.SHARD_DATABASES:
+            return app_label == 'clubs' and model_name in self.sharded_models
+        if app_label == 'clubs' and model_name == 'clubshard':
+            return db == DEFAULT_DB_ALIAS
+        return None
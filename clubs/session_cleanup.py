@@ -0,0 +1,33 @@
+"""Deletion of expired sessions.
+
+Django's clearsessions deletes every expired session in one statement,
+which on a large table holds the write lock long enough to stall logins.
+delete_expired_sessions() deletes them a batch at a time instead, oldest
+first along the expire_date index, each batch in its own short transaction,
+and pauses between batches so logins get the lock in between.
+"""
+import time
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+
+def delete_expired_sessions(batch_size=None, pause=None, expired_before=None, progress=None):
+    """Delete the sessions that expired before expired_before (default now) and return how many were deleted.
+
+    progress, if given, is called with the running total after each batch.
+    """
+    batch_size = batch_size or settings.SESSION_CLEANUP_BATCH_SIZE
+    pause = settings.SESSION_CLEANUP_PAUSE if pause is None else pause
+    expired = Session.objects.filter(expire_date__lt=expired_before or timezone.now()).order_by('expire_date')
+    deleted = 0
+    while True:
+        keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        if progress:
+            progress(deleted)
+        if len(keys) < batch_size:
+            return deleted
+        time.sleep(pause)
@@ -0,0 +1,159 @@
+"""Club sharding: clubs and their memberships live on one of settings.CLUB_SHARDS.
+
+Users stay on the default database. The ClubShard directory on the default
+database hands out club ids and records the shard each club lives on.
+Sharding is off while settings.CLUB_SHARDS is empty, and everything then
+behaves as a single database.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, models
+from django.db.models import Count
+from .changes import ChangeTrackedQuerySet
+from .identity import IdentityMapQuerySet
+
+
+def sharding_enabled():
+    return bool(settings.CLUB_SHARDS)
+
+
+def allocate_club():
+    """Reserve a new club id on the least-loaded shard and return (club_id, shard)."""
+    from .models import ClubShard
+    loads = dict(ClubShard.objects.values_list('shard').annotate(Count('id')))
+    shard = min(settings.CLUB_SHARDS, key=lambda alias: loads.get(alias, 0))
+    entry = ClubShard.objects.create(shard=shard)
+    return entry.id, shard
+
+
+def shard_for_club(club):
+    """Return the shard holding club, given as a Club or its id, or None if unknown."""
+    from .models import Club, ClubShard
+    if isinstance(club, Club):
+        if club._state.db in settings.CLUB_SHARDS:
+            return club._state.db
+        club = club.pk
+    try:
+        return ClubShard.objects.values_list('shard', flat=True).get(pk=club)
+    except (ClubShard.DoesNotExist, ValueError, TypeError):
+        return None
+
+
+def scatter_gather(function, shards=None):
+    """Call function(alias) for every shard and return the results in shard order.
+
+    Shards are queried in parallel threads, except inside a transaction
+    whose uncommitted rows other connections could not see.
+    """
+    shards = list(shards or settings.CLUB_SHARDS)
+    in_transaction = any(connections[alias].in_atomic_block for alias in [*shards, 'default'])
+    if len(shards) == 1 or in_transaction or not settings.CLUB_SHARD_PARALLEL:
+        return [function(alias) for alias in shards]
+
+    def run(alias):
+        try:
+            return function(alias)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        return list(executor.map(run, shards))
+
+
+class ShardedQuerySet(models.QuerySet):
+    """QuerySet that picks its shard from the club it is filtered on.
+
+    Filtering on one of shard_keys pins the query to that club's shard.
+    Reads that cannot be pinned are scatter-gathered over every shard; their
+    ordering and slicing then apply per shard. Aggregates are not gathered.
+    """
+
+    shard_keys = ()
+
+    def _filter_or_exclude(self, negate, args, kwargs):
+        clone = super()._filter_or_exclude(negate, args, kwargs)
+        if sharding_enabled() and not negate and clone._db is None:
+            for key in self.shard_keys:
+                if key in kwargs:
+                    shard = shard_for_club(kwargs[key])
+                    if shard:
+                        clone._db = shard
+                    break
+        return clone
+
+    def _is_scattered(self):
+        return sharding_enabled() and self._db is None and self.db not in settings.CLUB_SHARDS
+
+    def _gather(self, function):
+        return scatter_gather(lambda alias: function(self.using(alias)))
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._is_scattered():
+            self._result_cache = [obj for results in self._gather(list) for obj in results]
+            self._prefetch_done = True
+        super()._fetch_all()
+
+    def iterator(self, chunk_size=2000):
+        if self._is_scattered():
+            return (obj for alias in settings.CLUB_SHARDS for obj in self.using(alias).iterator(chunk_size))
+        return super().iterator(chunk_size)
+
+    def count(self):
+        if self._result_cache is None and self._is_scattered():
+            return sum(self._gather(lambda queryset: queryset.count()))
+        return super().count()
+
+    def exists(self):
+        if self._result_cache is None and self._is_scattered():
+            return any(self._gather(lambda queryset: queryset.exists()))
+        return super().exists()
+
+    def update(self, **kwargs):
+        if self._is_scattered():
+            return sum(self.using(alias).update(**kwargs) for alias in settings.CLUB_SHARDS)
+        return super().update(**kwargs)
+    update.alters_data = True
+
+    def delete(self):
+        if self._is_scattered():
+            deleted, rows = 0, {}
+            for alias in settings.CLUB_SHARDS:
+                shard_deleted, shard_rows = self.using(alias).delete()
+                deleted += shard_deleted
+                for label, count in shard_rows.items():
+                    rows[label] = rows.get(label, 0) + count
+            self._result_cache = None
+            return deleted, rows
+        return super().delete()
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class ClubQuerySet(IdentityMapQuerySet, ChangeTrackedQuerySet, ShardedQuerySet):
+    shard_keys = ('pk', 'id')
+
+    def belonging_to(self, user):
+        """The clubs user owns or holds a non-removed membership of."""
+        return self.filter(
+            models.Q(owner=user) | models.Q(membership__user=user, membership__level__in=['1', '2', '3'])
+        )
+
+
+class MembershipQuerySet(ChangeTrackedQuerySet, ShardedQuerySet):
+    shard_keys = ('club', 'club_id', 'club__id', 'club__pk')
+
+
+class ClubManager(models.Manager.from_queryset(ClubQuerySet)):
+    """Manager for clubs, which may live on different shards."""
+
+    def for_user(self, user):
+        """Return the clubs user owns or holds a non-removed membership of, from every shard."""
+        return list(self.belonging_to(user).distinct())
+
+
+class MembershipManager(models.Manager.from_queryset(MembershipQuerySet)):
+    """Manager for memberships, which live on the shard of their club."""
+
+    def roster(self, club_id):
+        """Return the club's memberships in user order, with their users loaded by one more query."""
+        return list(self.filter(club_id=club_id).prefetch_related('user').order_by('user_id', 'pk'))
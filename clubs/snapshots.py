@@ -0,0 +1,218 @@
+"""Compact snapshots of the clubs tables, for cloning environments and restoring backups.
+
+A snapshot is a gzip stream starting with SNAPSHOT_MAGIC, followed by
+frames of a 4-byte big-endian length and a JSON payload. A JSON object
+starts a table and names its model, database and columns; each JSON array
+after it holds a chunk of that table's rows, in primary key order. Tables
+are read with iterator() and written back with executemany a chunk at a
+time, so neither side holds more than one chunk in memory.
+
+Each database is read in one transaction, so a snapshot taken under live
+writes sees every table of a database as of the same moment. Django's auth
+groups and permissions are not part of a snapshot, so neither are the
+tables linking users to them; a restore clears those links.
+"""
+import datetime
+import decimal
+import gzip
+import json
+import struct
+import uuid
+from contextlib import ExitStack
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from .routers import ShardRouter
+from .sharding import sharding_enabled
+
+SNAPSHOT_MAGIC = b'CLUBSNAPSHOT1\n'
+FRAME_HEADER = struct.Struct('>I')
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be read or restored."""
+
+
+def _links_outside_clubs(model):
+    """Whether model is an automatic many-to-many table linking to another app, such as User.groups."""
+    return model._meta.auto_created and any(
+        field.related_model._meta.app_label != 'clubs' for field in model._meta.concrete_fields if field.is_relation
+    )
+
+
+def snapshot_models():
+    """The models of the clubs app, with their automatic many-to-many tables within it, in dependency order."""
+    return [
+        model for model in apps.get_app_config('clubs').get_models(include_auto_created=True)
+        if not _links_outside_clubs(model)
+    ]
+
+
+def cleared_models():
+    """The automatic many-to-many tables a restore empties without refilling, such as User.groups."""
+    return [
+        model for model in apps.get_app_config('clubs').get_models(include_auto_created=True)
+        if _links_outside_clubs(model)
+    ]
+
+
+def model_databases(model):
+    """The databases holding model's rows."""
+    if sharding_enabled() and ShardRouter()._is_sharded(model):
+        return list(settings.CLUB_SHARDS)
+    return [DEFAULT_DB_ALIAS]
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Cannot snapshot a {type(value).__name__}")
+
+
+def _write_frame(stream, payload):
+    data = json.dumps(payload, default=_encode, separators=(',', ':')).encode()
+    stream.write(FRAME_HEADER.pack(len(data)))
+    stream.write(data)
+
+
+def _read_frames(stream):
+    if stream.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a clubs snapshot")
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < FRAME_HEADER.size:
+            raise SnapshotError("The snapshot is truncated")
+        length, = FRAME_HEADER.unpack(header)
+        data = stream.read(length)
+        if len(data) < length:
+            raise SnapshotError("The snapshot is truncated")
+        yield json.loads(data)
+
+
+def write_snapshot(fileobj, chunk_size=None):
+    """Write a snapshot of every clubs table to the binary file fileobj and return the rows written per model."""
+    chunk_size = chunk_size or settings.SNAPSHOT_CHUNK_SIZE
+    counts = {}
+    with gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6) as stream, ExitStack() as stack:
+        for database in sorted({DEFAULT_DB_ALIAS, *settings.CLUB_SHARDS}):
+            _read_consistently(stack, database)
+        stream.write(SNAPSHOT_MAGIC)
+        for model in snapshot_models():
+            fields = model._meta.concrete_fields
+            for database in model_databases(model):
+                _write_frame(stream, {
+                    'model': model._meta.label_lower,
+                    'database': database,
+                    'columns': [field.column for field in fields],
+                })
+                rows = (
+                    model._base_manager.using(database).order_by('pk')
+                        .values_list(*(field.attname for field in fields)).iterator(chunk_size=chunk_size)
+                )
+                count, chunk = 0, []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) == chunk_size:
+                        _write_frame(stream, chunk)
+                        count, chunk = count + len(chunk), []
+                if chunk:
+                    _write_frame(stream, chunk)
+                counts[model._meta.label_lower] = counts.get(model._meta.label_lower, 0) + count + len(chunk)
+    return counts
+
+
+def _read_consistently(stack, database):
+    """Read database in one transaction on stack, so every table is read as of the same moment."""
+    stack.enter_context(transaction.atomic(using=database))
+    connection = connections[database]
+    if connection.vendor == 'postgresql':
+        # PostgreSQL's default isolation takes a new snapshot for every statement
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+
+class _TableRestore:
+    """Inserts the chunks of one table of a snapshot into its database."""
+
+    def __init__(self, header):
+        try:
+            self.model = apps.get_model(header['model'])
+        except LookupError:
+            raise SnapshotError(f"Unknown model {header['model']}")
+        self.database = header['database']
+        if self.database not in model_databases(self.model):
+            raise SnapshotError(f"{header['model']} is not kept on {self.database} here; was sharding set up differently?")
+        self.connection = connections[self.database]
+        fields = {field.column: field for field in self.model._meta.concrete_fields}
+        missing = [column for column in header['columns'] if column not in fields]
+        if missing:
+            raise SnapshotError(f"{header['model']} has no column {', '.join(missing)}")
+        self.fields = [fields[column] for column in header['columns']]
+        quote = self.connection.ops.quote_name
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(self.model._meta.db_table),
+            ', '.join(quote(column) for column in header['columns']),
+            ', '.join(['%s'] * len(self.fields)),
+        )
+
+    def insert(self, chunk):
+        rows = [
+            [field.get_db_prep_save(field.to_python(value), self.connection) for field, value in zip(self.fields, row)]
+            for row in chunk
+        ]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.sql, rows)
+
+
+def restore_snapshot(fileobj):
+    """Replace the clubs tables with the snapshot read from the binary file fileobj.
+
+    Every database is emptied and refilled in one transaction, with
+    constraint checks deferred to the end. Returns the rows restored per model.
+    """
+    databases = sorted({DEFAULT_DB_ALIAS, *settings.CLUB_SHARDS})
+    restored_models = set(snapshot_models())
+    counts = {}
+    with gzip.GzipFile(fileobj=fileobj, mode='rb') as stream, ExitStack() as stack:
+        for database in databases:
+            stack.enter_context(transaction.atomic(using=database))
+            stack.enter_context(connections[database].constraint_checks_disabled())
+            _empty_tables(database)
+        table, skipping = None, False
+        for frame in _read_frames(stream):
+            if isinstance(frame, dict):
+                table = _TableRestore(frame)
+                # Older snapshots also hold the users' groups and permissions
+                skipping = table.model not in restored_models
+                if not skipping:
+                    counts.setdefault(table.model._meta.label_lower, 0)
+            elif table is None:
+                raise SnapshotError("The snapshot has rows before any table")
+            elif not skipping:
+                table.insert(frame)
+                counts[table.model._meta.label_lower] += len(frame)
+        for database in databases:
+            connection = connections[database]
+            connection.check_constraints(table_names=_table_names(database))
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), snapshot_models()):
+                    cursor.execute(sql)
+    return counts
+
+
+def _table_names(database, models=None):
+    """The tables of models (by default the snapshot's) that exist on database."""
+    tables = set(connections[database].introspection.table_names())
+    return [model._meta.db_table for model in models or snapshot_models() if model._meta.db_table in tables]
+
+
+def _empty_tables(database):
+    connection = connections[database]
+    with connection.cursor() as cursor:
+        for table_name in reversed(_table_names(database, snapshot_models() + cleared_models())):
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(table_name)}')
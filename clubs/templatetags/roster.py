@@ -0,0 +1,20 @@
+"""Template tags for the club roster."""
+from django import template
+from django.utils.safestring import mark_safe
+from clubs.rendering import RosterRowRenderer
+from clubs.permissions import actions_for, role_of
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def roster_actions(context, membership):
+    """Return the actions the viewing user may take on membership (see clubs/permissions.py)."""
+    return actions_for(role_of(context.get('is_owner'), context.get('user_membership')), membership.level)
+
+
+@register.simple_tag(takes_context=True)
+def roster_rows(context, memberships):
+    """Render a roster row for each of memberships, as partials/roster_row.html would."""
+    renderer = RosterRowRenderer(context['current_club'], context.get('is_owner'), context.get('user_membership'))
+    return mark_safe(renderer.render(memberships))
@@ -0,0 +1,80 @@
+"""Tests of the batch API."""
+from django.test import TestCase
+from django.urls import reverse
+from clubs.models import Club, Membership, User
+from clubs.tests.helpers import CreateClubs
+
+class BatchApiTestCase(TestCase, CreateClubs):
+    """Tests of the batch API."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+        self.other_club = Club.objects.create(name="club2", location="Leeds", description="", owner=self.officer)
+        Membership.objects.create(club=self.other_club, user=self.member, level='1')
+        self.url = reverse('api_batch')
+
+    def _batch(self, user, **resources):
+        self.client.login(username=user.username, password='Password123')
+        return self.client.get(self.url, {name: ','.join(map(str, ids)) for name, ids in resources.items()})
+
+    def test_batch_url(self):
+        self.assertEqual(self.url, '/api/batch')
+
+    def test_batch_is_unauthorized_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_dashboard_of_several_clubs(self):
+        club_ids = [self.club.id, self.other_club.id]
+        response = self._batch(self.member, clubs=club_ids, rosters=club_ids, stats=club_ids, roles=club_ids)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        club, other_club = str(self.club.id), str(self.other_club.id)
+        self.assertEqual(data['clubs'][club]['owner']['first_name'], "John")
+        self.assertEqual(data['roles'], {club: 'member', other_club: 'applicant'})
+        self.assertEqual(data['stats'][club], {'members': 1, 'officers': 1})
+        self.assertEqual({item['user_id'] for item in data['rosters'][club]}, {self.officer.id, self.member.id})
+        self.assertIsNone(data['rosters'][other_club])
+
+    def test_officers_see_applicants(self):
+        response = self._batch(self.officer, rosters=[self.club.id], stats=[self.club.id])
+        data = response.json()
+        self.assertEqual(len(data['rosters'][str(self.club.id)]), 3)
+        self.assertEqual(data['stats'][str(self.club.id)]['applicants'], 1)
+
+    def test_private_fields_follow_profile_visibility(self):
+        response = self._batch(self.member, users=[self.member.id, self.officer.id])
+        users = response.json()['users']
+        self.assertEqual(users[str(self.member.id)]['username'], self.member.username)
+        self.assertNotIn('username', users[str(self.officer.id)])
+
+    def test_missing_ids_are_none(self):
+        response = self._batch(self.member, clubs=[999], users=[999], roles=[999])
+        self.assertEqual(response.json(), {'clubs': {'999': None}, 'roles': {'999': None}, 'users': {'999': None}})
+
+    def test_unknown_resource_is_rejected(self):
+        response = self._batch(self.member, games=[1])
+        self.assertEqual(response.status_code, 400)
+
+    def test_ids_must_be_numbers(self):
+        response = self._batch(self.member, clubs=['one'])
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_grow_with_the_clubs(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        club_ids = [self.club.id, self.other_club.id]
+        dashboard = {name: ','.join(map(str, club_ids)) for name in ('clubs', 'rosters', 'stats', 'roles')}
+        # Session and user, then rosters, stats, roles, clubs and users once each
+        with self.assertNumQueries(7):
+            self.client.get(self.url, dashboard)
+        for number in range(3, 6):
+            club = Club.objects.create(name=f"club{number}", location="York", description="", owner=self.member)
+            Membership.objects.create(club=club, user=self.owner, level='2')
+            club_ids.append(club.id)
+        dashboard = {name: ','.join(map(str, club_ids)) for name in ('clubs', 'rosters', 'stats', 'roles')}
+        with self.assertNumQueries(7):
+            self.client.get(self.url, dashboard)
@@ -0,0 +1,86 @@
+"""Tests of the club changes API."""
+from django.test import TestCase
+from django.urls import reverse
+from clubs.models import Membership, User
+from clubs.tests.helpers import CreateClubs
+
+class ClubChangesApiTestCase(TestCase, CreateClubs):
+    """Tests of the club changes API."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+        self.url = reverse('club_changes', kwargs={'club_id': self.club.id})
+
+    def _changes(self, user=None, since=None):
+        self.client.login(username=(user or self.owner).username, password='Password123')
+        response = self.client.get(self.url, {} if since is None else {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_club_changes_url(self):
+        self.assertEqual(self.url, f'/api/clubs/{self.club.id}/changes')
+
+    def test_club_changes_is_unauthorized_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_saves_take_increasing_change_numbers(self):
+        membership = Membership.objects.get(user=self.member, club=self.club)
+        before = membership.change_seq
+        membership.save()
+        self.assertGreater(membership.change_seq, before)
+        self.member.bio = "New bio"
+        self.member.save()
+        self.assertGreater(self.member.change_seq, membership.change_seq)
+
+    def test_logging_in_is_not_a_change(self):
+        before = User.objects.get(pk=self.member.pk).change_seq
+        self.client.login(username=self.member.username, password='Password123')
+        self.assertEqual(User.objects.get(pk=self.member.pk).change_seq, before)
+
+    def test_first_sync_returns_the_whole_club(self):
+        data = self._changes()
+        self.assertEqual(data['club']['name'], "club1")
+        self.assertEqual(len(data['memberships']), 3)
+        self.assertEqual({user['id'] for user in data['users']},
+            {self.owner.id, self.officer.id, self.member.id, self.applicant.id})
+        self.assertGreater(data['cursor'], 0)
+
+    def test_sync_from_cursor_returns_only_changes(self):
+        cursor = self._changes()['cursor']
+        data = self._changes(since=cursor)
+        self.assertIsNone(data['club'])
+        self.assertEqual(data['memberships'], [])
+        self.assertEqual(data['users'], [])
+        self.assertEqual(data['cursor'], cursor)
+
+        Membership.objects.filter(user=self.member, club=self.club).update(level='3')
+        self.officer.bio = "Changed"
+        self.officer.save()
+        data = self._changes(since=cursor)
+        self.assertEqual([(membership['user_id'], membership['level']) for membership in data['memberships']],
+            [(self.member.id, '3')])
+        self.assertEqual({user['id'] for user in data['users']}, {self.member.id, self.officer.id})
+        self.assertGreater(data['cursor'], cursor)
+
+    def test_sync_ignores_users_of_other_clubs(self):
+        cursor = self._changes()['cursor']
+        outsider = self.create_user("outsider@example.org", "Out", "Sider")
+        outsider.save()
+        self.assertEqual(self._changes(since=cursor)['users'], [])
+
+    def test_sync_lists_deleted_memberships(self):
+        cursor = self._changes()['cursor']
+        Membership.objects.get(user=self.member, club=self.club).leave_club()
+        data = self._changes(since=cursor)
+        self.assertEqual(data['removed'], [self.member.id])
+
+    def test_members_are_not_sent_applicants(self):
+        data = self._changes(user=self.member)
+        self.assertNotIn(self.applicant.id, [membership['user_id'] for membership in data['memberships']])
+        self.assertNotIn(self.applicant.id, [user['id'] for user in data['users']])
@@ -0,0 +1,223 @@
+"""Tests of the JSON API for clubs, memberships and users."""
+import json
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from clubs.models import Club, Membership, MembershipArchive, MembershipEvent, User
+from clubs.tests.helpers import CreateClubs
+
+class RestApiTestCase(TestCase, CreateClubs):
+    """Tests of the JSON API for clubs, memberships and users."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+        self.memberships_url = reverse('api_membership_list', kwargs={'club_id': self.club.id})
+
+    def _log_in(self, user):
+        self.client.login(username=user.username, password='Password123')
+
+    def _membership_url(self, user):
+        return reverse('api_membership_detail', kwargs={'club_id': self.club.id, 'user_id': user.id})
+
+    def _patch(self, url, data):
+        return self.client.patch(url, json.dumps(data), content_type='application/json')
+
+    def test_api_urls(self):
+        self.assertEqual(reverse('api_club_list'), '/api/clubs')
+        self.assertEqual(self.memberships_url, f'/api/clubs/{self.club.id}/memberships')
+        self.assertEqual(reverse('api_user_detail', kwargs={'user_id': 1}), '/api/users/1')
+
+    def _club_urls(self, club_id):
+        return [
+            reverse('api_membership_list', kwargs={'club_id': club_id}),
+            reverse('api_membership_detail', kwargs={'club_id': club_id, 'user_id': self.member.id}),
+            reverse('club_changes', kwargs={'club_id': club_id}),
+        ]
+
+    def test_api_is_unauthorized_when_not_logged_in(self):
+        for url in self._club_urls(self.club.id):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertIn('error', response.json())
+
+    def test_unknown_club_is_not_found(self):
+        self._log_in(self.member)
+        for url in self._club_urls(self.club.id + 999):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), {'error': "No such club"})
+
+    def test_club_resources_are_forbidden_outside_the_club(self):
+        outsider = self.create_user("outsider@example.org", "Out", "Sider")
+        for user in (outsider, self.applicant):
+            self._log_in(user)
+            for url in self._club_urls(self.club.id):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 403)
+                self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_club_list_returns_only_the_fields_asked_for(self):
+        self._log_in(self.member)
+        response = self.client.get(reverse('api_club_list'), {'fields': 'name,owner.first_name'})
+        self.assertEqual(response.json()['results'], [{'name': "club1", 'owner': {'first_name': "John"}}])
+
+    def test_unknown_field_is_rejected(self):
+        self._log_in(self.member)
+        response = self.client.get(reverse('api_club_list'), {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_club_list_is_paged_by_id(self):
+        for number in range(2, 5):
+            Club.objects.create(name=f"club{number}", location="London", description="", owner=self.owner)
+        self._log_in(self.member)
+        first = self.client.get(reverse('api_club_list'), {'limit': 2, 'fields': 'name'}).json()
+        self.assertEqual([club['name'] for club in first['results']], ["club1", "club2"])
+        second = self.client.get(reverse('api_club_list'), {'limit': 2, 'after': first['next'], 'fields': 'name'}).json()
+        self.assertEqual([club['name'] for club in second['results']], ["club3", "club4"])
+        self.assertIsNone(second['next'])
+
+    def test_unchanged_response_is_not_modified(self):
+        self._log_in(self.member)
+        fields = {'fields': 'level,user.bio'}
+        response = self.client.get(self.memberships_url, fields)
+        etag = response['ETag']
+        response = self.client.get(self.memberships_url, fields, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.member.bio = "Changed"
+        self.member.save()
+        response = self.client.get(self.memberships_url, fields, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match_is_compared_as_a_list_of_etags(self):
+        self._log_in(self.member)
+        etag = self.client.get(self.memberships_url)['ETag']
+        for header in [f'"other", {etag}', f'W/{etag}', '*']:
+            self.assertEqual(self.client.get(self.memberships_url, HTTP_IF_NONE_MATCH=header).status_code, 304)
+        for header in [f'{etag}x', f'"other{etag}"', '"other"']:
+            self.assertEqual(self.client.get(self.memberships_url, HTTP_IF_NONE_MATCH=header).status_code, 200)
+
+    def test_members_do_not_see_applicants_or_private_fields(self):
+        self._log_in(self.member)
+        results = self.client.get(self.memberships_url, {'fields': 'level,user.id,user.username'}).json()['results']
+        self.assertEqual({item['user']['id'] for item in results}, {self.officer.id, self.member.id})
+        officer = next(item for item in results if item['user']['id'] == self.officer.id)
+        self.assertNotIn('username', officer['user'])
+        own = next(item for item in results if item['user']['id'] == self.member.id)
+        self.assertEqual(own['user']['username'], self.member.username)
+
+    def test_owner_sees_applicants_and_private_fields(self):
+        self._log_in(self.owner)
+        results = self.client.get(self.memberships_url, {'fields': 'user.username'}).json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all('username' in item['user'] for item in results))
+        self.assertTrue(all('level' not in item for item in results))
+
+    def test_membership_list_query_count_does_not_grow_with_the_club(self):
+        self._log_in(self.owner)
+        self.client.get(self.memberships_url, {'fields': 'level,user.first_name'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.memberships_url, {'fields': 'level,user.first_name'})
+        for number in range(5):
+            user = self.create_user(f'extra{number}@example.org', "Extra", "User")
+            Membership.objects.create(club=self.club, user=user, level='2')
+        with self.assertNumQueries(len(queries)):
+            self.client.get(self.memberships_url, {'fields': 'level,user.first_name'})
+
+    def test_owner_can_promote_a_member(self):
+        self._log_in(self.owner)
+        response = self._patch(self._membership_url(self.member), {'level': '3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['level'], '3')
+        self.assertTrue(Membership.objects.get(club=self.club, user=self.member).is_officer())
+        event = MembershipEvent.objects.filter(club=self.club, user=self.member).latest('id')
+        self.assertEqual(event.kind, MembershipEvent.PROMOTED)
+        self.assertEqual(event.actor, self.owner)
+
+    def test_writes_without_the_csrf_token_are_forbidden_in_json(self):
+        client = Client(enforce_csrf_checks=True)
+        token = client.get(reverse('log_in')).cookies['csrftoken'].value
+        client.login(username=self.owner.username, password='Password123')
+        response = client.patch(self._membership_url(self.member), json.dumps({'level': '3'}), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('error', response.json())
+        self.assertTrue(Membership.objects.get(club=self.club, user=self.member).is_member())
+
+        response = client.patch(self._membership_url(self.member), json.dumps({'level': '3'}),
+            content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Membership.objects.get(club=self.club, user=self.member).is_officer())
+
+    def test_officer_can_accept_but_not_promote(self):
+        self._log_in(self.officer)
+        response = self._patch(self._membership_url(self.applicant), {'level': '2'})
+        self.assertEqual(response.status_code, 200)
+        response = self._patch(self._membership_url(self.member), {'level': '3'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Membership.objects.get(club=self.club, user=self.member).is_member())
+
+    def test_officer_cannot_reject_an_applicant(self):
+        self._log_in(self.officer)
+        response = self._patch(self._membership_url(self.applicant), {'level': '0'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Membership.objects.get(club=self.club, user=self.applicant).is_applicant())
+
+    def test_impossible_level_change_is_rejected(self):
+        self._log_in(self.owner)
+        response = self._patch(self._membership_url(self.applicant), {'level': '3'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Membership.objects.get(club=self.club, user=self.applicant).is_applicant())
+
+    def test_owner_can_remove_and_reinstate_a_member(self):
+        self._log_in(self.owner)
+        response = self._patch(self._membership_url(self.member), {'level': '0'})
+        self.assertEqual(response.json()['level'], '0')
+        self.assertFalse(Membership.objects.filter(club=self.club, user=self.member).exists())
+        self.assertEqual(self.client.get(self._membership_url(self.member)).json()['level'], '0')
+        response = self._patch(self._membership_url(self.member), {'level': '1'})
+        self.assertEqual(response.json()['level'], '1')
+        self.assertTrue(Membership.objects.get(club=self.club, user=self.member).is_applicant())
+        self.assertFalse(MembershipArchive.objects.exists())
+
+    def test_member_cannot_see_an_applicant_membership(self):
+        self._log_in(self.member)
+        response = self.client.get(self._membership_url(self.applicant))
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_can_change_own_profile(self):
+        self._log_in(self.member)
+        url = reverse('api_user_detail', kwargs={'user_id': self.member.id})
+        response = self._patch(url, {'bio': "New bio"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bio'], "New bio")
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.bio, "New bio")
+
+    def test_user_cannot_change_another_profile(self):
+        self._log_in(self.member)
+        url = reverse('api_user_detail', kwargs={'user_id': self.officer.id})
+        response = self._patch(url, {'bio': "New bio"})
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('username', self.client.get(url).json())
+
+    def test_only_owner_can_change_club(self):
+        url = reverse('api_club_detail', kwargs={'club_id': self.club.id})
+        self._log_in(self.officer)
+        self.assertEqual(self._patch(url, {'location': "Leeds"}).status_code, 403)
+        self._log_in(self.owner)
+        response = self._patch(url, {'location': "Leeds"})
+        self.assertEqual(response.status_code, 200)
+        self.club.refresh_from_db()
+        self.assertEqual(self.club.location, "Leeds")
+
+    def test_other_methods_are_not_allowed(self):
+        self._log_in(self.owner)
+        response = self.client.delete(self.memberships_url)
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,12 @@
+"""URLconf serving the async read views, used by their tests."""
+from django.urls import path
+from clubs import async_views
+from system.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('', async_views.home, name='home'),
+    path('users/club_id_<int:club_id>', async_views.user_list, name='user_list'),
+    path('user/club_id_<int:club_id>/user_id_<int:user_id>', async_views.show_user, name='show_user'),
+    path('show_club/club_id_<int:club_id>', async_views.show_club, name='show_club'),
+    path('roster_stream/club_id_<int:club_id>', async_views.roster_stream, name='roster_stream'),
+] + sync_urlpatterns
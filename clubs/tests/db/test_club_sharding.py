@@ -0,0 +1,162 @@
+"""Tests of the club-sharded database layout."""
+import io
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from clubs.changes import current_change_seq
+from clubs.exports import roster_rows
+from clubs.imports import import_roster_csv
+from clubs.loaders import BatchLoaders
+from clubs.models import Club, ClubShard, Membership, MembershipArchive, MembershipTombstone, User
+from clubs.routers import ShardRouter
+from clubs.sharding import shard_for_club
+from clubs.snapshots import restore_snapshot, write_snapshot
+from clubs.tests.helpers import CreateClubs
+
+@override_settings(CLUB_SHARDS=['shard_0', 'shard_1'])
+class ClubShardingTestCase(TransactionTestCase, CreateClubs):
+    """Tests of the club-sharded database layout."""
+
+    databases = {'default', 'shard_0', 'shard_1'}
+
+    def setUp(self):
+        self.owner = self.create_user("johnsmith@example.org", "John", "Smith")
+        self.member = self.create_user("hillaryunderside@example.org", "Hillary", "Underside")
+        self.first_club = self._create_club("First Club")
+        self.second_club = self._create_club("Second Club")
+        Membership(user=self.member, club=self.first_club, level="2").save()
+        Membership(user=self.member, club=self.second_club, level="0").save()
+
+    def _create_club(self, name):
+        club = Club(owner=self.owner, name=name, location="London", description="A chess club")
+        club.save()
+        return club
+
+    def test_clubs_are_spread_over_shards(self):
+        self.assertEqual(self.first_club._state.db, 'shard_0')
+        self.assertEqual(self.second_club._state.db, 'shard_1')
+        self.assertEqual(ClubShard.objects.get(pk=self.first_club.pk).shard, 'shard_0')
+        self.assertFalse(Club.objects.using('default').exists())
+
+    def test_failed_club_insert_releases_its_shard_entry(self):
+        entries = ClubShard.objects.count()
+        with self.assertRaises(IntegrityError):
+            self._create_club("First Club")
+        self.assertEqual(ClubShard.objects.count(), entries)
+
+    def test_users_stay_on_default(self):
+        self.assertEqual(self.owner._state.db, 'default')
+        self.assertEqual(Club.objects.get(pk=self.first_club.pk).owner, self.owner)
+
+    def test_memberships_live_on_their_club_shard(self):
+        self.assertEqual(Membership.objects.using('shard_0').filter(club_id=self.first_club.pk).count(), 1)
+        self.assertEqual(Membership.objects.using('shard_1').filter(club_id=self.first_club.pk).count(), 0)
+        membership = Membership.objects.filter(club=self.first_club, user=self.member).get()
+        self.assertEqual(membership._state.db, 'shard_0')
+        self.assertEqual(membership.club, self.first_club)
+        self.assertEqual(membership.user, self.member)
+
+    def test_removed_memberships_are_archived_on_default(self):
+        membership = Membership.objects.filter(club=self.first_club, user=self.member).get()
+        archived = membership.remove_user()
+        self.assertEqual(archived._state.db, 'default')
+        self.assertFalse(Membership.objects.using('shard_0').filter(club_id=self.first_club.pk).exists())
+        membership = archived.reinstate_user()
+        self.assertEqual(membership._state.db, 'shard_0')
+        self.assertTrue(Membership.objects.using('shard_0').get(club_id=self.first_club.pk).is_applicant())
+        self.assertFalse(MembershipArchive.objects.exists())
+
+    def test_landing_club_is_found_across_shards(self):
+        self.owner.remember_club(self.second_club)
+        self.assertEqual(self.owner.landing_club(), self.second_club)
+        self.member.remember_club(self.second_club)
+        self.assertEqual(self.member.landing_club(), self.first_club)
+
+    def test_landing_club_is_the_lowest_pk_across_shards(self):
+        third_club = self._create_club("Third Club")
+        self.assertEqual(third_club._state.db, 'shard_0')
+        applicant = self.create_user("pollyanatomato@example.org", "Pollyana", "Tomato")
+        Membership(user=applicant, club=third_club, level="2").save()
+        Membership(user=applicant, club=self.second_club, level="1").save()
+        self.assertEqual(applicant.landing_club(), self.second_club)
+
+    def test_get_by_pk_routes_to_shard(self):
+        club = Club.objects.get(pk=self.second_club.pk)
+        self.assertEqual(club._state.db, 'shard_1')
+        self.assertEqual(club.name, "Second Club")
+
+    def test_unpinned_queries_scatter_gather(self):
+        self.assertEqual({club.name for club in Club.objects.all()}, {"First Club", "Second Club"})
+        self.assertEqual(Club.objects.count(), 2)
+        self.assertTrue(Membership.objects.filter(user=self.member).exists())
+        self.assertEqual(len(list(Membership.objects.filter(user=self.member).iterator())), 2)
+
+    def test_clubs_for_user_gathers_across_shards(self):
+        self.assertEqual(Club.objects.for_user(self.member), [self.first_club])
+        self.assertEqual(set(Club.objects.for_user(self.owner)), {self.first_club, self.second_club})
+
+    def test_club_helpers_work_on_shards(self):
+        self.assertTrue(self.first_club.is_part_of(self.member))
+        self.assertEqual(list(self.first_club.member_users()), [self.member])
+
+    def test_rebalance_club_moves_club_and_memberships(self):
+        call_command('rebalance_club', self.first_club.pk, 'shard_1', stdout=open('/dev/null', 'w'))
+        self.assertEqual(shard_for_club(self.first_club.pk), 'shard_1')
+        self.assertFalse(Club.objects.using('shard_0').filter(pk=self.first_club.pk).exists())
+        club = Club.objects.get(pk=self.first_club.pk)
+        self.assertEqual(club._state.db, 'shard_1')
+        self.assertTrue(club.is_part_of(self.member))
+        self.assertFalse(Membership.objects.using('shard_0').exists())
+
+    def test_rebalance_club_keeps_memberships_live_for_syncing_clients(self):
+        before = current_change_seq()
+        call_command('rebalance_club', self.first_club.pk, 'shard_1', stdout=open('/dev/null', 'w'))
+        self.assertFalse(MembershipTombstone.objects.exists())
+        self.client.login(username=self.member.username, password='Password123')
+        url = reverse('club_changes', kwargs={'club_id': self.first_club.pk})
+        data = self.client.get(url, {'since': before}).json()
+        self.assertEqual(data['removed'], [])
+        self.assertEqual([membership['user_id'] for membership in data['memberships']], [self.member.pk])
+
+    def test_batch_loaders_gather_clubs_from_every_shard(self):
+        loaders = BatchLoaders(self.member, columns={'users': ['first_name'], 'clubs': ['name'], 'memberships': []})
+        club_ids = [self.first_club.pk, self.second_club.pk]
+        loaders['rosters'].want(club_ids)
+        loaders.dispatch()
+        self.assertEqual(loaders['clubs'].get(self.second_club.pk).name, "Second Club")
+        self.assertEqual(loaders['roles'].get(self.first_club.pk).level, "2")
+        self.assertEqual([membership.user_id for membership in loaders['rosters'].get(self.second_club.pk)], [self.member.pk])
+        self.assertEqual(loaders['users'].get(self.owner.pk).first_name, "John")
+
+    def test_roster_export_reads_users_from_default(self):
+        rows = list(roster_rows(self.first_club, chunk_size=1))
+        self.assertEqual([row[3] for row in rows], ['owner', 'member'])
+        self.assertEqual(rows[1][2], self.member.username)
+
+    def test_roster_import_writes_memberships_to_the_club_shard(self):
+        lines = ["first_name,last_name,email,level", "Ada,Lovelace,ada@example.org,officer"]
+        report = import_roster_csv(self.second_club, lines)
+        self.assertEqual(report.added_memberships, 1)
+        ada = User.objects.get(username='ada@example.org')
+        self.assertTrue(Membership.objects.using('shard_1').get(club_id=self.second_club.pk, user_id=ada.pk).is_officer())
+
+    def test_snapshot_restores_clubs_to_their_shards(self):
+        snapshot = io.BytesIO()
+        write_snapshot(snapshot)
+        snapshot.seek(0)
+        Membership.objects.using('shard_0').all().delete()
+        Club.objects.using('shard_1').all().delete()
+        restore_snapshot(snapshot)
+        self.assertEqual(Club.objects.using('shard_1').get(pk=self.second_club.pk).name, "Second Club")
+        self.assertTrue(Membership.objects.using('shard_0').filter(club_id=self.first_club.pk, user=self.member).exists())
+        self.assertFalse(Club.objects.using('default').exists())
+
+    def test_shards_only_migrate_clubs_and_memberships(self):
+        router = ShardRouter()
+        self.assertTrue(router.allow_migrate('shard_0', 'clubs', 'club'))
+        self.assertTrue(router.allow_migrate('shard_0', 'clubs', 'membership'))
+        self.assertFalse(router.allow_migrate('shard_0', 'clubs', 'user'))
+        self.assertFalse(router.allow_migrate('shard_0', 'clubs', 'clubshard'))
+        self.assertFalse(router.allow_migrate('shard_0', 'sessions', 'session'))
+        self.assertIsNone(router.allow_migrate('default', 'clubs', 'club'))
@@ -0,0 +1,100 @@
+"""Tests of the read replica router and its middleware."""
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+from clubs.middleware import ReplicaRoutingMiddleware, STICKY_PRIMARY_COOKIE
+from clubs.models import Membership
+from clubs.routers import ReplicaRouter, RequestRouting, current_routing, reset_routing, set_routing
+from django.contrib.sessions.models import Session
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRouterTestCase(TestCase):
+    """Tests of the read replica router."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.routing = RequestRouting()
+        self.token = set_routing(self.routing)
+
+    def tearDown(self):
+        reset_routing(self.token)
+
+    def test_reads_stay_on_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Membership))
+
+    def test_read_only_request_reads_from_replica(self):
+        self.routing.use_replica = True
+        self.assertEqual(self.router.db_for_read(Membership), 'replica')
+
+    def test_sessions_are_never_read_from_replica(self):
+        self.routing.use_replica = True
+        self.assertIsNone(self.router.db_for_read(Session))
+
+    def test_reads_after_a_write_go_to_primary(self):
+        self.routing.use_replica = True
+        self.assertIsNone(self.router.db_for_write(Membership))
+        self.assertTrue(self.routing.wrote)
+        self.assertIsNone(self.router.db_for_read(Membership))
+
+    def test_instances_read_from_replica_are_written_to_primary(self):
+        membership = Membership()
+        membership._state.db = 'replica'
+        self.assertEqual(self.router.db_for_write(Membership, instance=membership), 'default')
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'clubs'))
+        self.assertIsNone(self.router.allow_migrate('default', 'clubs'))
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_no_replica_configured(self):
+        self.routing.use_replica = True
+        self.assertIsNone(self.router.db_for_read(Membership))
+
+
+@override_settings(REPLICA_DATABASE='replica', REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingMiddlewareTestCase(TestCase):
+    """Tests of the read replica middleware."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def _handle(self, request, write=False):
+        request.resolver_match = resolve(request.path)
+        seen = {}
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            seen['read_db'] = self.router.db_for_read(Membership)
+            if write:
+                self.router.db_for_write(Membership)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        self.assertIsNone(current_routing())
+        return seen['read_db'], response
+
+    def test_get_read_view_uses_replica(self):
+        read_db, response = self._handle(self.factory.get(reverse('show_club', kwargs={'club_id': 1})))
+        self.assertEqual(read_db, 'replica')
+        self.assertNotIn(STICKY_PRIMARY_COOKIE, response.cookies)
+
+    def test_post_read_view_uses_primary(self):
+        read_db, response = self._handle(self.factory.post(reverse('show_club', kwargs={'club_id': 1})))
+        self.assertIsNone(read_db)
+
+    def test_other_views_use_primary(self):
+        read_db, response = self._handle(self.factory.get(reverse('profile')))
+        self.assertIsNone(read_db)
+
+    def test_write_sets_sticky_primary_cookie(self):
+        read_db, response = self._handle(self.factory.get(reverse('profile')), write=True)
+        self.assertIn(STICKY_PRIMARY_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[STICKY_PRIMARY_COOKIE]['max-age'], 10)
+
+    def test_sticky_cookie_keeps_read_view_on_primary(self):
+        request = self.factory.get(reverse('show_club', kwargs={'club_id': 1}))
+        request.COOKIES[STICKY_PRIMARY_COOKIE] = '1'
+        read_db, response = self._handle(request)
+        self.assertIsNone(read_db)
@@ -0,0 +1,36 @@
+"""Tests of the batched deletion of expired sessions."""
+from datetime import timedelta
+from io import StringIO
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from clubs.session_cleanup import delete_expired_sessions
+
+class SessionCleanupTestCase(TestCase):
+    """Tests of the batched deletion of expired sessions."""
+
+    def setUp(self):
+        for _ in range(5):
+            SessionStore().create()
+        self.expired = list(Session.objects.values_list('session_key', flat=True)[:3])
+        Session.objects.filter(session_key__in=self.expired).update(expire_date=timezone.now() - timedelta(days=1))
+
+    def test_deletes_only_expired_sessions_in_batches(self):
+        totals = []
+        with self.assertNumQueries(2 * 2):
+            deleted = delete_expired_sessions(batch_size=2, pause=0, progress=totals.append)
+        self.assertEqual(deleted, 3)
+        self.assertEqual(totals, [2, 3])
+        self.assertFalse(Session.objects.filter(session_key__in=self.expired).exists())
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_command_reports_progress(self):
+        out = StringIO()
+        call_command('clear_expired_sessions', '--batch-size', '2', '--pause', '0', stdout=out)
+        self.assertIn("Deleted 2 expired sessions so far...", out.getvalue())
+        self.assertIn("Deleted 3 expired sessions.", out.getvalue())
+        out = StringIO()
+        call_command('clear_expired_sessions', verbosity=0, stdout=out)
+        self.assertEqual(out.getvalue(), '')
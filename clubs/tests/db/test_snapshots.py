@@ -0,0 +1,97 @@
+"""Tests of database snapshots and their restore."""
+import gzip
+import io
+import os
+import tempfile
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TestCase
+from clubs.jobs import enqueue
+from clubs.models import Club, Job, Membership, MembershipEvent, User
+from clubs.snapshots import SnapshotError, restore_snapshot, write_snapshot
+from clubs.tests.helpers import CreateClubs
+
+class SnapshotTestCase(TestCase, CreateClubs):
+    """Tests of database snapshots and their restore."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.event = MembershipEvent.objects.create(club_id=self.club.id, user_id=self.member.id, kind=MembershipEvent.APPLIED)
+        self.job = enqueue('clubs.tests.jobs.test_job_queue.record_call', club_id=self.club.id, names=["a", "b"])
+
+    def _snapshot(self, chunk_size=2):
+        snapshot = io.BytesIO()
+        counts = write_snapshot(snapshot, chunk_size=chunk_size)
+        snapshot.seek(0)
+        return snapshot, counts
+
+    def test_snapshot_counts_rows_per_model(self):
+        _, counts = self._snapshot()
+        self.assertEqual(counts['clubs.user'], 4)
+        self.assertEqual(counts['clubs.club'], 1)
+        self.assertEqual(counts['clubs.membership'], 3)
+
+    def test_restore_brings_back_the_snapshot(self):
+        snapshot, _ = self._snapshot()
+        member = User.objects.get(pk=self.member.pk)
+        Membership.objects.filter(user=member).delete()
+        member.delete()
+        User.objects.create_user('new@example.org', first_name="New", last_name="User", password='Password123')
+        self.club.name = "Renamed"
+        self.club.save()
+
+        counts = restore_snapshot(snapshot)
+
+        self.assertEqual(counts['clubs.membership'], 3)
+        self.assertFalse(User.objects.filter(username='new@example.org').exists())
+        restored = User.objects.get(pk=self.member.pk)
+        self.assertEqual(restored.username, self.member.username)
+        self.assertEqual(restored.change_seq, self.member.change_seq)
+        self.assertEqual(restored.updated_at, self.member.updated_at)
+        self.assertTrue(restored.check_password('Password123'))
+        self.assertEqual(Club.objects.get(pk=self.club.pk).name, "club1")
+        self.assertTrue(Membership.objects.get(club=self.club, user=restored).is_member())
+        self.assertEqual(MembershipEvent.objects.get(pk=self.event.pk).created_at, self.event.created_at)
+        self.assertEqual(Job.objects.get(pk=self.job.pk).payload, {'club_id': self.club.id, 'names': ["a", "b"]})
+
+    def test_snapshot_leaves_out_auth_groups_and_permissions(self):
+        _, counts = self._snapshot()
+        self.assertNotIn('clubs.user_groups', counts)
+        self.assertNotIn('clubs.user_user_permissions', counts)
+
+    def test_restore_clears_group_assignments(self):
+        self.member.groups.add(Group.objects.create(name="Snapshot group"))
+        snapshot, _ = self._snapshot()
+        restore_snapshot(snapshot)
+        self.assertFalse(User.objects.get(pk=self.member.pk).groups.exists())
+        self.assertTrue(Group.objects.filter(name="Snapshot group").exists())
+
+    def test_restored_tables_keep_handing_out_new_ids(self):
+        snapshot, _ = self._snapshot()
+        restore_snapshot(snapshot)
+        user = User.objects.create_user('new@example.org', first_name="New", last_name="User", password='Password123')
+        self.assertGreater(user.pk, self.member.pk)
+
+    def test_snapshot_is_compressed(self):
+        snapshot, _ = self._snapshot(chunk_size=1000)
+        self.assertEqual(snapshot.read(2), b'\x1f\x8b')
+
+    def test_restore_rejects_other_files(self):
+        with self.assertRaises(SnapshotError):
+            restore_snapshot(io.BytesIO(gzip.compress(b'[{"model": "clubs.user"}]')))
+        self.assertTrue(User.objects.filter(pk=self.member.pk).exists())
+
+    def test_restore_rejects_truncated_snapshots(self):
+        snapshot, _ = self._snapshot()
+        data = gzip.decompress(snapshot.read())
+        with self.assertRaises(SnapshotError):
+            restore_snapshot(io.BytesIO(gzip.compress(data[:-10])))
+
+    def test_snapshot_and_restore_commands(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'clubs.snapshot')
+            call_command('snapshot', path, stdout=io.StringIO())
+            Membership.objects.all().delete()
+            call_command('restore', path, interactive=False, stdout=io.StringIO())
+        self.assertEqual(Membership.objects.filter(club=self.club).count(), 3)
@@ -0,0 +1,25 @@
+"""Tests of the SQLite connection tuning."""
+from django.db import connections
+from django.test import TestCase, override_settings
+
+class SQLitePragmasTestCase(TestCase):
+    """Tests of the SQLite connection tuning."""
+
+    def _pragma_on_new_connection(self, pragma):
+        new_connection = connections.create_connection('default')
+        try:
+            new_connection.ensure_connection()
+            return new_connection.connection.execute(f'PRAGMA {pragma}').fetchone()[0]
+        finally:
+            new_connection.close()
+
+    @override_settings(SQLITE_TUNING=True)
+    def test_tuning_applies_pragmas_on_connection_open(self):
+        self.assertEqual(self._pragma_on_new_connection('synchronous'), 1)
+        self.assertEqual(self._pragma_on_new_connection('busy_timeout'), 5000)
+        self.assertEqual(self._pragma_on_new_connection('cache_size'), -64 * 1024)
+
+    @override_settings(SQLITE_TUNING=False)
+    def test_pragmas_are_left_alone_without_tuning(self):
+        self.assertEqual(self._pragma_on_new_connection('synchronous'), 2)
+        self.assertNotEqual(self._pragma_on_new_connection('cache_size'), -64 * 1024)
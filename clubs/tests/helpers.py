@@ -1,5 +1,5 @@
 from django.urls import reverse
-from clubs.models import User, Club, Membership
+from clubs.models import User, Club, Membership, MembershipArchive
 from django.contrib.auth.models import Group
 from with_asserts.mixin import AssertHTMLMixin
 
@@ -134,13 +134,11 @@ class CreateClubs(CreateUsers):
         membership.save()
         club_object.members.add(applicant)
 
-        membership = Membership(
+        MembershipArchive.objects.create(
                user = removed,
                club = club_object,
-                level = "0"
+               previous_level = "2"
             )
-        membership.save()
-        club_object.members.add(removed)
 
         return club_object
 
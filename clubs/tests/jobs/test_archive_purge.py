@@ -0,0 +1,50 @@
+"""Tests of the purge of archived memberships."""
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from clubs.archive import PURGE_TASK, purge_archived_memberships, purge_expired_archive
+from clubs.models import Job, MembershipArchive, User
+from clubs.tests.helpers import CreateClubs
+
+@override_settings(MEMBERSHIP_ARCHIVE_RETENTION_DAYS=30)
+class ArchivePurgeTestCase(TestCase, CreateClubs):
+    """Tests of the purge of archived memberships."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        for number in range(5):
+            user = self.create_user(f"removed{number}@example.org", "Removed", "User")
+            MembershipArchive.objects.create(club=self.club, user=user, previous_level='2')
+        self.expired = MembershipArchive.objects.order_by('pk')[:3]
+        MembershipArchive.objects.filter(pk__in=list(self.expired.values_list('pk', flat=True))).update(
+            updated_at=timezone.now() - timedelta(days=31)
+        )
+
+    def test_purge_deletes_only_expired_rows_in_batches(self):
+        with self.assertNumQueries(2 * 2 + 1):
+            deleted = purge_expired_archive(batch_size=2)
+        self.assertEqual(deleted, 3)
+        self.assertEqual(MembershipArchive.objects.count(), 2)
+
+    def test_purge_job_queues_its_next_run(self):
+        purge_archived_memberships()
+        purge_archived_memberships()
+        self.assertEqual(Job.objects.filter(task=PURGE_TASK, status=Job.QUEUED).count(), 1)
+        self.assertEqual(MembershipArchive.objects.count(), 2)
+
+    def test_removing_a_user_schedules_the_purge(self):
+        member = User.objects.get(username='hillaryunderside@example.org')
+        self.client.login(username=self.owner.username, password='Password123')
+        self.client.get(reverse('delete_user', kwargs={'user_id': member.id, 'club_id': self.club.id}))
+        self.assertTrue(MembershipArchive.objects.filter(club=self.club, user=member).exists())
+        self.assertTrue(Job.objects.filter(task=PURGE_TASK, status=Job.QUEUED).exists())
+
+    def test_purge_archive_command(self):
+        out = StringIO()
+        call_command('purge_archive', '--days', '0', stdout=out)
+        self.assertIn("Deleted 5 archived memberships.", out.getvalue())
+        self.assertFalse(MembershipArchive.objects.exists())
@@ -0,0 +1,105 @@
+"""Tests of the background job queue."""
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from clubs.jobs import claim_job, enqueue, purge_done_jobs, retry_delay, run_job
+from clubs.models import Job
+
+calls = []
+
+def record_call(**payload):
+    calls.append(payload)
+
+def always_fail(**payload):
+    raise ValueError("Something went wrong")
+
+class JobQueueTestCase(TestCase):
+    """Tests of the background job queue."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_stores_the_task_path_and_payload(self):
+        job = enqueue(record_call, club_id=1)
+        self.assertEqual(job.task, 'clubs.tests.jobs.test_job_queue.record_call')
+        self.assertEqual(job.payload, {'club_id': 1})
+        self.assertEqual(job.status, Job.QUEUED)
+
+    def test_claim_job_locks_the_due_job(self):
+        job = enqueue(record_call)
+        claimed = claim_job('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        self.assertEqual(claimed.locked_by, 'worker-1')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(claim_job('worker-2'))
+
+    def test_claim_job_skips_jobs_not_yet_due(self):
+        enqueue(record_call, delay=60)
+        self.assertIsNone(claim_job('worker-1'))
+
+    def test_claim_job_takes_over_abandoned_jobs(self):
+        job = enqueue(record_call)
+        claim_job('worker-1')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        claimed = claim_job('worker-2')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.locked_by, 'worker-2')
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_run_job_calls_the_task_with_its_payload(self):
+        job = enqueue(record_call, club_id=1)
+        self.assertEqual(run_job(claim_job('worker-1')), Job.DONE)
+        self.assertEqual(calls, [{'club_id': 1}])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue(always_fail)
+        before = timezone.now()
+        self.assertEqual(run_job(claim_job('worker-1')), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn("Something went wrong", job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=retry_delay(1)))
+        self.assertIsNone(claim_job('worker-1'))
+
+    def test_job_fails_after_its_last_attempt(self):
+        job = enqueue(always_fail, max_attempts=1)
+        self.assertEqual(run_job(claim_job('worker-1')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_retry_delay_doubles_up_to_the_maximum(self):
+        self.assertEqual(retry_delay(2), 2 * retry_delay(1))
+        self.assertEqual(retry_delay(50), retry_delay(60))
+
+    def test_run_worker_runs_due_jobs_in_burst_mode(self):
+        enqueue(record_call, number=1)
+        enqueue(record_call, number=2)
+        enqueue(record_call, delay=60, number=3)
+        call_command('run_worker', burst=True, concurrency=1, stdout=StringIO())
+        self.assertEqual(calls, [{'number': 1}, {'number': 2}])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def _finished_job(self, status, days_ago):
+        return Job.objects.create(task='clubs.tests.jobs.test_job_queue.record_call', status=status,
+            run_at=timezone.now() - timedelta(days=days_ago))
+
+    @override_settings(JOB_RETENTION=24 * 60 * 60)
+    def test_purge_done_jobs_only_deletes_expired_done_jobs(self):
+        expired = [self._finished_job(Job.DONE, 2) for _ in range(3)]
+        recent = self._finished_job(Job.DONE, 0)
+        failed = self._finished_job(Job.FAILED, 2)
+        queued = self._finished_job(Job.QUEUED, 2)
+        self.assertEqual(purge_done_jobs(batch_size=2), len(expired))
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, failed.pk, queued.pk})
+
+    @override_settings(JOB_RETENTION=24 * 60 * 60)
+    def test_run_worker_deletes_expired_done_jobs_when_idle(self):
+        self._finished_job(Job.DONE, 2)
+        enqueue(record_call, number=1)
+        call_command('run_worker', burst=True, concurrency=1, stdout=StringIO())
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), [Job.DONE])
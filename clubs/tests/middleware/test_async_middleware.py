@@ -0,0 +1,61 @@
+"""Tests of the clubs middleware under ASGI."""
+import asyncio
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+from clubs.asgi import StreamingASGIHandler
+from clubs.identity import _identity_map
+from clubs.middleware import IdentityMapMiddleware, ReplicaRoutingMiddleware, RequestProfilerMiddleware
+from clubs.routers import current_routing
+
+CONCURRENT_REQUESTS = 4
+
+_rendezvous = {}
+
+
+async def wait_for_every_request(request):
+    """Respond once CONCURRENT_REQUESTS requests are inside a view at the same time."""
+    assert _identity_map.get() is not None and current_routing() is not None
+    _rendezvous['arrived'] += 1
+    if _rendezvous['arrived'] == CONCURRENT_REQUESTS:
+        _rendezvous['everyone'].set()
+    await asyncio.wait_for(_rendezvous['everyone'].wait(), 2)
+    return HttpResponse()
+
+urlpatterns = [
+    path('rendezvous', wait_for_every_request),
+]
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncMiddlewareTestCase(SimpleTestCase):
+    """Tests of the clubs middleware under ASGI."""
+
+    async def _get(self, handler, path):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': b'', 'root_path': '', 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 1234), 'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+        await handler(scope, receive, send)
+        return messages[0]['status']
+
+    def test_middleware_is_not_adapted_around_async_views(self):
+        async def view(request):
+            return HttpResponse()
+        for middleware in (RequestProfilerMiddleware, IdentityMapMiddleware, ReplicaRoutingMiddleware):
+            self.assertTrue(asyncio.iscoroutinefunction(middleware(view)))
+            self.assertFalse(asyncio.iscoroutinefunction(middleware(lambda request: HttpResponse())))
+
+    async def test_concurrent_requests_reach_async_views_together(self):
+        _rendezvous.update(arrived=0, everyone=asyncio.Event())
+        handler = StreamingASGIHandler()
+        statuses = await asyncio.gather(*(self._get(handler, '/rendezvous') for _ in range(CONCURRENT_REQUESTS)))
+        self.assertEqual(statuses, [200] * CONCURRENT_REQUESTS)
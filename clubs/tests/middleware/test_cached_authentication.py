@@ -0,0 +1,115 @@
+"""Tests of the cached session and user loading."""
+import tempfile
+from unittest import mock
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from clubs.auth import CachedUserBackend, check_cache_is_shared
+from clubs.models import User
+from clubs.notifications import mark_notifications_read
+from clubs.tests.helpers import CreateClubs
+
+CACHED_AUTH = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['clubs.auth.CachedUserBackend'],
+}
+
+@override_settings(CACHED_AUTH=True)
+class CachedAuthenticationTestCase(TestCase, CreateClubs):
+    """Tests of the cached session and user loading."""
+
+    def setUp(self):
+        cache.clear()
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.user = User.objects.get(username='jamesmoth@example.org')
+        self.backend = CachedUserBackend()
+
+    def _page_queries(self):
+        client = Client()
+        client.login(username=self.user.username, password='Password123')
+        url = reverse('user_list', kwargs={'club_id': self.club.id})
+        # The first visit remembers the club, which saves the user
+        client.get(url)
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_logged_in_pages_skip_the_session_and_user_queries(self):
+        uncached = self._page_queries()
+        with override_settings(**CACHED_AUTH):
+            self.assertEqual(self._page_queries(), uncached - 2)
+
+    def test_user_is_loaded_once(self):
+        self.backend.get_user(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.user.id), self.user)
+
+    @override_settings(**CACHED_AUTH)
+    def test_profile_update_reloads_the_user(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.backend.get_user(self.user.id)
+        self.client.post(reverse('profile'), {
+            'first_name': 'Jim', 'last_name': self.user.last_name, 'username': self.user.username,
+            'bio': self.user.bio, 'chess_level': self.user.chess_level,
+            'personal_statement': self.user.personal_statement,
+        })
+        self.assertEqual(User.objects.get(pk=self.user.id).first_name, 'Jim')
+        self.assertEqual(self.backend.get_user(self.user.id).first_name, 'Jim')
+
+    @override_settings(**CACHED_AUTH)
+    def test_password_change_reloads_the_user(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.backend.get_user(self.user.id)
+        self.client.post(reverse('password'), {
+            'password': 'Password123', 'new_password': 'NewPassword123', 'password_confirmation': 'NewPassword123',
+        })
+        self.assertTrue(self.backend.get_user(self.user.id).check_password('NewPassword123'))
+
+    def test_password_change_reaches_other_processes_through_a_shared_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}}
+            with self.settings(CACHES=shared, **CACHED_AUTH):
+                # Another process reaches the same cache through its own client
+                other_process = FileBasedCache(directory, {})
+                self.client.login(username=self.user.username, password='Password123')
+                with mock.patch('clubs.auth.cache', other_process):
+                    self.backend.get_user(self.user.id)
+                self.client.post(reverse('password'), {
+                    'password': 'Password123', 'new_password': 'NewPassword123', 'password_confirmation': 'NewPassword123',
+                })
+                with mock.patch('clubs.auth.cache', other_process):
+                    self.assertTrue(self.backend.get_user(self.user.id).check_password('NewPassword123'))
+
+    def test_cached_auth_refuses_per_process_caches(self):
+        for backend in ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache'):
+            with self.settings(CACHES={'default': {'BACKEND': backend}}):
+                with self.assertRaises(ImproperlyConfigured):
+                    check_cache_is_shared()
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache'}}):
+            check_cache_is_shared()
+
+    def test_saving_the_user_elsewhere_reloads_them(self):
+        self.backend.get_user(self.user.id)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.id))
+
+    @override_settings(CACHED_AUTH=False)
+    def test_user_saves_leave_the_cache_alone_without_cached_auth(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+            mark_notifications_read(self.user)
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(cache.get(f'clubs:user-version:{self.user.id}'))
+
+    def test_queryset_updates_reload_the_user(self):
+        User.objects.filter(pk=self.user.pk).update(unread_notifications=3)
+        self.assertEqual(self.backend.get_user(self.user.id).unread_notifications, 3)
+        mark_notifications_read(self.user)
+        self.assertEqual(self.backend.get_user(self.user.id).unread_notifications, 0)
@@ -0,0 +1,80 @@
+"""Tests of the request-scoped identity map of clubs and users."""
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from clubs.identity import remember
+from clubs.middleware import IdentityMapMiddleware
+from clubs.models import Club, Membership, User
+from clubs.tests.helpers import CreateClubs
+
+class IdentityMapMiddlewareTestCase(TestCase, CreateClubs):
+    """Tests of the request-scoped identity map of clubs and users."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+
+    def _in_request(self, function):
+        results = []
+        def view(request):
+            results.append(function())
+            return HttpResponse()
+        IdentityMapMiddleware(view)(RequestFactory().get('/'))
+        return results[0]
+
+    def test_repeated_pk_lookups_return_the_loaded_instance(self):
+        def lookups():
+            club = Club.objects.get(pk=self.club.id)
+            with self.assertNumQueries(0):
+                self.assertIs(Club.objects.get(id=self.club.id), club)
+                self.assertIs(Club.objects.get(pk=str(self.club.id)), club)
+        self._in_request(lookups)
+
+    def test_foreign_keys_use_the_identity_map(self):
+        def lookups():
+            owner = User.objects.get(pk=self.club.owner_id)
+            member = User.objects.get(pk=self.member.id)
+            membership = Membership.objects.get(club=self.club, user=self.member)
+            club = Club.objects.get(pk=self.club.id)
+            with self.assertNumQueries(0):
+                self.assertIs(membership.user, member)
+                self.assertIs(membership.club, club)
+                self.assertIs(club.owner, owner)
+        self._in_request(lookups)
+
+    def test_filtered_or_partial_lookups_are_not_remembered(self):
+        def lookups():
+            Club.objects.get(pk=self.club.id)
+            with self.assertNumQueries(3):
+                Club.objects.filter(location="London").get(pk=self.club.id)
+                Club.objects.only('name').get(pk=self.club.id)
+                Club.objects.get(name="club1")
+        self._in_request(lookups)
+
+    def test_saving_another_instance_forgets_the_remembered_one(self):
+        def lookups():
+            club = Club.objects.get(pk=self.club.id)
+            Club.objects.filter(pk=self.club.id).update(location="Leeds")
+            self.assertEqual(Club.objects.get(pk=self.club.id).location, "Leeds")
+            other = Club.objects.filter(pk=self.club.id).first()
+            other.location = "York"
+            other.save()
+            reloaded = Club.objects.get(pk=self.club.id)
+            self.assertIsNot(reloaded, club)
+            self.assertEqual(reloaded.location, "York")
+        self._in_request(lookups)
+
+    def test_instances_from_another_database_are_not_returned(self):
+        def lookups():
+            elsewhere = User(pk=self.member.id, username=self.member.username)
+            elsewhere._state.db = 'replica'
+            remember(elsewhere)
+            member = User.objects.get(pk=self.member.id)
+            self.assertIsNot(member, elsewhere)
+            self.assertEqual(member._state.db, 'default')
+            with self.assertNumQueries(0):
+                self.assertIs(User.objects.get(pk=self.member.id), member)
+        self._in_request(lookups)
+
+    def test_lookups_outside_a_request_are_not_remembered(self):
+        club = Club.objects.get(pk=self.club.id)
+        self.assertIsNot(Club.objects.get(pk=self.club.id), club)
@@ -0,0 +1,29 @@
+"""Tests of where flash messages are kept between an action and the page it redirects to."""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from clubs.models import User
+from clubs.tests.helpers import CreateClubs
+
+class MessageStorageTestCase(TestCase, CreateClubs):
+    """Tests of where flash messages are kept between an action and the page it redirects to."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.client.login(username=self.club.owner.username, password='Password123')
+
+    def _session_writes(self, queries):
+        return [
+            query['sql'] for query in queries.captured_queries
+            if 'django_session' in query['sql'] and not query['sql'].startswith('SELECT')
+        ]
+
+    def test_action_and_redirect_do_not_write_the_session(self):
+        url = reverse('promote_club_member', kwargs={'club_id': self.club.id, 'user_id': self.member.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, follow=True)
+        self.assertEqual(len(response.context['messages']), 1)
+        self.assertIn('messages', response.cookies)
+        self.assertEqual(self._session_writes(queries), [])
@@ -0,0 +1,76 @@
+"""Tests of the request profiler middleware."""
+from django.template.base import Template
+from django.test import TestCase
+from django.urls import reverse
+from clubs.profiling import _original_render
+from clubs.tests.helpers import CreateClubs
+
+class RequestProfilerMiddlewareTestCase(TestCase, CreateClubs):
+    """Tests of the request profiler middleware."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.url = reverse('user_list', kwargs={'club_id': self.club.id})
+
+    def _make_staff(self):
+        self.owner.is_staff = True
+        self.owner.save()
+
+    def test_staff_get_sql_profile(self):
+        self._make_staff()
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, {'__profile': 'sql'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'profile_report.html')
+        self.assertTemplateUsed(response, 'user_list.html')
+        profile = response.context['profile']
+        self.assertGreater(len(profile.queries), 0)
+        self.assertTrue(any('clubs/views.py' in frame for query in profile.queries for frame in query['origin']))
+        self.assertIn('user_list.html', [template['name'] for template in profile.templates])
+        self.assertEqual(profile.stats, '')
+        self.assertContains(response, 'SELECT')
+
+    def test_template_rendering_is_only_patched_during_a_profile(self):
+        self._make_staff()
+        self.client.login(username=self.owner.username, password='Password123')
+        self.client.get(self.url)
+        self.assertIs(Template.render, _original_render)
+        response = self.client.get(self.url, {'__profile': 'sql'})
+        self.assertTrue(response.context['profile'].templates)
+        self.assertIs(Template.render, _original_render)
+
+    def test_staff_get_cprofile_profile(self):
+        self._make_staff()
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, {'__profile': 'cprofile'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'profile_report.html')
+        self.assertIn('cumulative', response.context['profile'].stats)
+        self.assertContains(response, 'Call tree')
+
+    def test_profile_of_redirect_reports_status(self):
+        self._make_staff()
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(reverse('home'), {'__profile': 'sql'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['profiled_status'], 302)
+
+    def test_non_staff_cannot_profile(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, {'__profile': 'cprofile'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateNotUsed(response, 'profile_report.html')
+        self.assertTemplateUsed(response, 'user_list.html')
+
+    def test_anonymous_cannot_profile(self):
+        response = self.client.get(reverse('home'), {'__profile': 'sql'})
+        self.assertTemplateNotUsed(response, 'profile_report.html')
+        self.assertTemplateUsed(response, 'home.html')
+
+    def test_unknown_mode_is_ignored(self):
+        self._make_staff()
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, {'__profile': 'memory'})
+        self.assertTemplateNotUsed(response, 'profile_report.html')
+        self.assertTemplateUsed(response, 'user_list.html')
@@ -11,6 +11,11 @@ class ClubModelTestCase(TestCase, CreateClubs):
     def setUp(self):
         self.club = self.create_one_club("John's Club", "Strand", "This is a club")
 
+    def test_member_users_joins_memberships_in_one_query(self):
+        with self.assertNumQueries(1):
+            users = list(self.club.member_users())
+        self.assertEqual(len(users), 3)
+
     def test_valid_club(self):
         self._assert_club_is_valid()
 
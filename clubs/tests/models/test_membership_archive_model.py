@@ -0,0 +1,42 @@
+"""Unit tests for the MembershipArchive model."""
+from django.test import TestCase
+from clubs.models import Membership, MembershipArchive, MembershipTombstone, User
+from clubs.tests.helpers import CreateClubs
+
+
+class MembershipArchiveModelTestCase(TestCase, CreateClubs):
+    """Unit tests for the MembershipArchive model."""
+
+    def setUp(self):
+        self.club = self.create_one_club("John's Club", "Strand", "This is a club")
+        self.user = User.objects.get(username="hillaryunderside@example.org")
+        self.membership = Membership.objects.get(user=self.user, club=self.club)
+
+    def test_remove_user_moves_the_membership_to_the_archive(self):
+        archived = self.membership.remove_user()
+        self.assertFalse(Membership.objects.filter(user=self.user, club=self.club).exists())
+        self.assertEqual(MembershipArchive.objects.get(user=self.user, club=self.club), archived)
+        self.assertEqual(archived.previous_level, '2')
+        self.assertTrue(archived.is_removed_user())
+        self.assertEqual(archived.level, '0')
+
+    def test_removing_leaves_a_tombstone_for_syncing_clients(self):
+        self.membership.remove_user()
+        self.assertTrue(MembershipTombstone.objects.filter(club=self.club, user=self.user).exists())
+
+    def test_removed_user_is_no_longer_part_of_the_club(self):
+        self.membership.remove_user()
+        self.assertFalse(self.club.is_part_of(self.user))
+        self.assertNotIn(self.user, self.club.member_users())
+
+    def test_reinstate_user_moves_the_membership_back_as_an_applicant(self):
+        archived = self.membership.remove_user()
+        membership = archived.reinstate_user()
+        self.assertEqual(Membership.objects.get(user=self.user, club=self.club), membership)
+        self.assertTrue(membership.is_applicant())
+        self.assertFalse(MembershipArchive.objects.exists())
+
+    def test_removing_again_after_reinstating_replaces_the_archived_row(self):
+        self.membership.remove_user().reinstate_user().remove_user()
+        archived = MembershipArchive.objects.get(user=self.user, club=self.club)
+        self.assertEqual(archived.previous_level, '1')
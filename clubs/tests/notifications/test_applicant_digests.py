@@ -0,0 +1,59 @@
+"""Tests of the applicant notification digests."""
+from django.test import TestCase
+from django.urls import reverse
+from clubs.models import Job, MembershipEvent, Notification, User
+from clubs.notifications import DIGEST_TASK, mark_notifications_read, send_applicant_digest
+from clubs.tests.helpers import CreateClubs
+
+class ApplicantDigestTestCase(TestCase, CreateClubs):
+    """Tests of the applicant notification digests."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.first_applicant = self.create_user("first@example.org", "First", "Applicant")
+        self.second_applicant = self.create_user("second@example.org", "Second", "Applicant")
+
+    def _apply(self, user):
+        self.client.login(username=user.username, password='Password123')
+        self.client.get(reverse('apply', kwargs={'club_id': self.club.id}))
+        self.client.logout()
+
+    def test_applying_logs_an_event_and_queues_one_digest_per_window(self):
+        self._apply(self.first_applicant)
+        self._apply(self.second_applicant)
+        events = MembershipEvent.objects.filter(club_id=self.club.id, kind=MembershipEvent.APPLIED)
+        self.assertEqual(events.count(), 2)
+        self.assertEqual(Job.objects.filter(task=DIGEST_TASK).count(), 1)
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_digest_notifies_owner_and_officers_once_for_all_applications(self):
+        self._apply(self.first_applicant)
+        self._apply(self.second_applicant)
+        self.assertEqual(send_applicant_digest(self.club.id), 2)
+        recipients = set(Notification.objects.values_list('recipient_id', flat=True))
+        self.assertEqual(recipients, {self.owner.id, self.officer.id})
+        self.assertEqual(set(Notification.objects.values_list('applicant_count', flat=True)), {2})
+        self.officer.refresh_from_db()
+        self.member.refresh_from_db()
+        self.assertEqual(self.officer.unread_notifications, 1)
+        self.assertEqual(self.member.unread_notifications, 0)
+
+    def test_digest_only_covers_applications_since_the_last_one(self):
+        self._apply(self.first_applicant)
+        send_applicant_digest(self.club.id)
+        self.assertEqual(send_applicant_digest(self.club.id), 0)
+        self._apply(self.second_applicant)
+        self.assertEqual(send_applicant_digest(self.club.id), 1)
+        self.officer.refresh_from_db()
+        self.assertEqual(self.officer.unread_notifications, 2)
+
+    def test_mark_notifications_read_clears_the_badge(self):
+        self._apply(self.first_applicant)
+        send_applicant_digest(self.club.id)
+        mark_notifications_read(self.officer)
+        self.officer.refresh_from_db()
+        self.assertEqual(self.officer.unread_notifications, 0)
+        self.assertFalse(Notification.objects.filter(recipient=self.officer, read=False).exists())
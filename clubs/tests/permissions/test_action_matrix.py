@@ -0,0 +1,56 @@
+"""Tests of the roster action permissions."""
+from django.template.loader import render_to_string
+from django.test import TestCase
+from clubs.models import Membership, User
+from clubs.permissions import (
+    ACCEPT, DEMOTE, OWNER, PROMOTE, REINSTATE, REJECT, REMOVE, ROLES, LEVELS, ROSTER_ACTIONS, TRANSFER,
+    actions_for, can, role_of, viewer_role,
+)
+from clubs.tests.helpers import CreateClubs
+
+class ActionMatrixTestCase(TestCase, CreateClubs):
+    """Tests of the roster action permissions."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+
+    def test_matrix_covers_every_role_and_level(self):
+        self.assertEqual(set(ROSTER_ACTIONS), {(role, level) for role in ROLES for level in LEVELS})
+
+    def test_owner_actions(self):
+        self.assertEqual(actions_for(OWNER, '1'), {ACCEPT, REJECT})
+        self.assertEqual(actions_for(OWNER, '2'), {PROMOTE, REMOVE})
+        self.assertEqual(actions_for(OWNER, '3'), {TRANSFER, DEMOTE, REMOVE})
+        self.assertEqual(actions_for(OWNER, '0'), {REINSTATE})
+
+    def test_officers_may_only_accept_applicants(self):
+        self.assertEqual(actions_for('3', '1'), {ACCEPT})
+        for level in ('0', '2', '3'):
+            self.assertEqual(actions_for('3', level), set())
+
+    def test_members_applicants_and_outsiders_may_do_nothing(self):
+        for role in ('2', '1', '0', None):
+            for level in LEVELS:
+                self.assertFalse(actions_for(role, level))
+        self.assertFalse(can(ACCEPT, None, '1'))
+
+    def test_viewer_role(self):
+        self.assertEqual(viewer_role(self.club, self.club.owner), OWNER)
+        self.assertEqual(viewer_role(self.club, self.officer), '3')
+        self.assertEqual(role_of(False, None), None)
+
+    def test_roster_row_shows_only_allowed_buttons(self):
+        membership = Membership.objects.get(club=self.club, user=self.applicant)
+        context = {'membership': membership, 'current_club': self.club}
+        officer_row = render_to_string('partials/roster_row.html', {
+            **context, 'is_owner': False, 'user_membership': Membership.objects.get(club=self.club, user=self.officer),
+        })
+        self.assertIn('Accept', officer_row)
+        self.assertNotIn('Reject', officer_row)
+        owner_row = render_to_string('partials/roster_row.html', {**context, 'is_owner': True, 'user_membership': None})
+        self.assertIn('Accept', owner_row)
+        self.assertIn('Reject', owner_row)
+        self.assertNotIn('Promote', owner_row)
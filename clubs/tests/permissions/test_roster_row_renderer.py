@@ -0,0 +1,44 @@
+"""Tests of the compiled roster row renderer."""
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.urls import reverse
+from clubs.models import Membership, MembershipArchive, User
+from clubs.rendering import RosterRowRenderer
+from clubs.tests.helpers import CreateClubs
+
+class RosterRowRendererTestCase(TestCase, CreateClubs):
+    """Tests of the compiled roster row renderer."""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        removed = User.objects.create_user(
+            username='removed@example.org', first_name='Re<b>moved', last_name='{user_id} & co', password='Password123',
+        )
+        MembershipArchive.objects.create(user=removed, club=self.club, previous_level='2')
+        self.memberships = list(Membership.objects.filter(club=self.club).select_related('user').order_by('pk'))
+        self.memberships += list(MembershipArchive.objects.filter(club=self.club).select_related('user'))
+        self.viewers = [(True, None)] + [(False, membership) for membership in self.memberships[:3]]
+
+    def test_rows_match_the_row_template(self):
+        for is_owner, user_membership in self.viewers:
+            renderer = RosterRowRenderer(self.club, is_owner, user_membership)
+            for membership in self.memberships:
+                with self.subTest(viewer=user_membership and user_membership.level, level=membership.level):
+                    expected = render_to_string('partials/roster_row.html', {
+                        'membership': membership,
+                        'current_club': self.club,
+                        'is_owner': is_owner,
+                        'user_membership': user_membership,
+                    })
+                    self.assertHTMLEqual(renderer.render_row(membership), expected)
+
+    def test_names_are_escaped(self):
+        html = RosterRowRenderer(self.club, True, None).render_row(self.memberships[-1])
+        self.assertIn('Re&lt;b&gt;moved {user_id} &amp; co', html)
+        self.assertNotIn('<b>', html)
+
+    def test_user_list_renders_every_row(self):
+        self.client.login(username=self.club.owner.username, password='Password123')
+        response = self.client.get(reverse('user_list', kwargs={'club_id': self.club.id}))
+        for membership in self.memberships:
+            self.assertContains(response, f'data-user-id="{membership.user.id}"')
@@ -45,6 +45,14 @@ class AcceptApplicantViewTestCase(TestCase, CreateClubs):
         self.assertFalse(self.target_membership.is_member())
         self.assertTrue(self.target_membership.is_applicant())
 
+    def test_removed_user_cannot_accept_an_applicant(self):
+        self.membership.remove_user()
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url, follow=True)
+        self.target_membership.refresh_from_db()
+        self.assertRedirects(response, reverse('profile'), status_code=302, target_status_code=200)
+        self.assertTrue(self.target_membership.is_applicant())
+
     def test_officer_can_accept_an_applicant(self):
         self.assertTrue(self.membership.is_officer())
         self.assertTrue(self.target_membership.is_applicant())
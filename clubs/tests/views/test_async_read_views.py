@@ -0,0 +1,138 @@
+"""Tests of the async versions of the read views."""
+import asyncio
+import threading
+from asgiref.sync import async_to_sync
+from django.contrib import messages
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+from clubs import async_views
+from clubs.models import Club, User
+from clubs.tests.helpers import CreateClubs, reverse_with_next
+
+@override_settings(ROOT_URLCONF='clubs.tests.async_urls')
+class AsyncReadViewsTestCase(TestCase, CreateClubs):
+    """Tests of the async versions of the read views."""
+
+    def setUp(self):
+        self.club = self.create_one_club("Super Club", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+        self.user_list_url = reverse('user_list', kwargs={'club_id': self.club.id})
+        self.show_club_url = reverse('show_club', kwargs={'club_id': self.club.id})
+
+    def test_async_views_are_served(self):
+        for url in [reverse('home'), self.user_list_url, self.show_club_url]:
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+    def test_home_shows_clubs_when_logged_out(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'home.html')
+        self.assertContains(response, self.club.name)
+
+    def test_home_redirects_when_logged_in(self):
+        self.client.login(username=self.member.username, password='Password123')
+        response = self.client.get(reverse('home'))
+        self.assertRedirects(response, self.user_list_url, status_code=302, target_status_code=200)
+
+    def test_show_club_when_logged_out(self):
+        response = self.client.get(self.show_club_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'show_club.html')
+        self.assertTrue(response.context['user_can_apply'])
+        self.assertEqual(len(response.context['members']), 3)
+        self.assertEqual(response.context['applicants'], [self.applicant])
+
+    def test_show_club_for_member(self):
+        self.client.login(username=self.member.username, password='Password123')
+        response = self.client.get(self.show_club_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.club.description)
+        self.assertContains(response, self.owner.full_name())
+        self.assertFalse(response.context['user_can_apply'])
+        self.assertEqual(response.context['user_membership'].user, self.member)
+        self.assertEqual(response.context['your_clubs'], [self.club])
+        self.assertEqual(len(response.context['masters']), 3)
+
+    def test_show_club_with_invalid_id_redirects(self):
+        self.client.login(username=self.member.username, password='Password123')
+        response = self.client.get(reverse('show_club', kwargs={'club_id': self.club.id + 9999}))
+        self.assertRedirects(response, self.user_list_url, status_code=302, target_status_code=200)
+
+    def test_show_user_redirects_when_not_logged_in(self):
+        url = reverse('show_user', kwargs={'club_id': self.club.id, 'user_id': self.member.id})
+        response = self.client.get(url)
+        self.assertRedirects(response, reverse_with_next('log_in', url), status_code=302, target_status_code=200)
+
+    def test_officer_show_user(self):
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(reverse('show_user', kwargs={'club_id': self.club.id, 'user_id': self.applicant.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'show_user.html')
+        self.assertContains(response, self.applicant.full_name())
+        self.assertTrue(response.context['viewee_membership'].is_applicant())
+
+    def test_member_cannot_show_applicant(self):
+        self.client.login(username=self.member.username, password='Password123')
+        url = reverse('show_user', kwargs={'club_id': self.club.id, 'user_id': self.applicant.id})
+        response = self.client.get(url, follow=True)
+        self.assertRedirects(response, self.user_list_url, status_code=302, target_status_code=200)
+        messages_list = list(response.context['messages'])
+        self.assertEqual(messages_list[0].level, messages.ERROR)
+
+    def test_user_list_for_officer_shows_applicants(self):
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(self.user_list_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'user_list.html')
+        self.assertEqual([membership.user for membership in response.context['applicants']], [self.applicant])
+        self.assertEqual(len(response.context['users']), 2)
+        self.assertContains(response, self.applicant.first_name)
+
+    def test_user_list_for_member_hides_applicants(self):
+        self.client.login(username=self.member.username, password='Password123')
+        response = self.client.get(self.user_list_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['applicants'], [])
+        self.assertNotContains(response, self.applicant.first_name)
+
+    def test_user_list_only_shows_active_users(self):
+        self.member.is_active = False
+        self.member.save()
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.user_list_url)
+        self.assertEqual(response.context['members'], [])
+        self.assertNotContains(response, self.member.username)
+
+    def test_user_list_redirects_applicant(self):
+        self.client.login(username=self.applicant.username, password='Password123')
+        response = self.client.get(self.user_list_url)
+        self.assertRedirects(response, self.show_club_url, status_code=302, target_status_code=200)
+
+
+@override_settings(ROOT_URLCONF='clubs.tests.async_urls')
+class ConcurrentQueriesTestCase(TransactionTestCase, CreateClubs):
+    """Tests of the async read views outside a transaction, where query groups run on worker threads."""
+
+    def setUp(self):
+        self.club = self.create_one_club("Super Club", "London", "A chess club")
+        self.owner = self.club.owner
+        self.user_list_url = reverse('user_list', kwargs={'club_id': self.club.id})
+
+    def test_query_groups_run_on_their_own_threads(self):
+        def query():
+            return threading.get_ident(), Club.objects.get(pk=self.club.id).name
+        results = async_to_sync(async_views.gather_queries)(query, query)
+        self.assertEqual([name for _, name in results], [self.club.name] * 2)
+        self.assertNotIn(threading.get_ident(), [thread for thread, _ in results])
+
+    def test_user_list_gathers_concurrently(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.user_list_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['current_club'], self.club)
+        self.assertEqual(len(response.context['users']), 2)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.last_club_id, self.club.id)
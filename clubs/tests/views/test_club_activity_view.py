@@ -0,0 +1,62 @@
+"""Tests of the club activity view"""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from clubs.models import Membership, MembershipEvent, User
+from clubs.tests.helpers import reverse_with_next, CreateClubs
+
+@override_settings(ACTIVITY_PAGE_SIZE=2)
+class ClubActivityViewTestCase(TestCase, CreateClubs):
+    """Tests of the club activity view"""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.events = [
+            MembershipEvent.objects.create(club_id=self.club.id, user_id=self.member.id, kind=kind, actor_id=self.owner.id)
+            for kind in [MembershipEvent.PROMOTED, MembershipEvent.DEMOTED, MembershipEvent.REMOVED]
+        ]
+        self.url = reverse('club_activity', kwargs={'club_id': self.club.id})
+
+    def test_club_activity_url(self):
+        self.assertEqual(self.url, f'/activity/club_id_{self.club.id}')
+
+    def test_club_activity_redirects_when_not_logged_in(self):
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_member_cannot_see_club_activity(self):
+        self.client.login(username=self.member.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('profile'), status_code=302, target_status_code=200)
+
+    def test_removed_user_cannot_see_club_activity(self):
+        Membership.objects.get(user=self.officer, club=self.club).remove_user()
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('profile'), status_code=302, target_status_code=200)
+
+    def test_club_activity_pages_newest_first(self):
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'club_activity.html')
+        self.assertEqual([event.id for event in response.context['events']], [self.events[2].id, self.events[1].id])
+        self.assertEqual(response.context['next_cursor'], self.events[1].id)
+        self.assertContains(response, "Hillary Underside</a>")
+        self.assertContains(response, "removed")
+        self.assertContains(response, "by John Smith")
+        response = self.client.get(self.url, {'before': response.context['next_cursor']})
+        self.assertEqual([event.id for event in response.context['events']], [self.events[0].id])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_club_activity_only_shows_its_own_club(self):
+        other_club = self.create_club("club2", "Paris", "Another club", self.officer, self.owner,
+            self.create_user("a@example.org", "A", "A"), self.create_user("b@example.org", "B", "B"))
+        MembershipEvent.objects.create(club_id=other_club.id, user_id=self.member.id, kind=MembershipEvent.LEFT)
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, {'before': self.events[0].id + 100})
+        self.assertEqual(len(response.context['events']), 2)
+        self.assertTrue(all(event.club_id == self.club.id for event in response.context['events']))
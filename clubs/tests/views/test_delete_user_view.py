@@ -1,7 +1,7 @@
 """Tests of the delete user view"""
 from django.test import TestCase
 from django.urls import reverse
-from clubs.models import Membership, User
+from clubs.models import Membership, MembershipArchive, User
 from clubs.tests.helpers import reverse_with_next, CreateClubs
 
 
@@ -78,8 +78,7 @@ class DeleteUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':self.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        applicant_membership.refresh_from_db()
-        self.assertTrue(applicant_membership.is_removed_user())
+        self._assert_archived(applicant)
 
     def test_owner_can_delete_a_member(self):
         member = User.objects.get(username='hillaryunderside@example.org')
@@ -92,8 +91,7 @@ class DeleteUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':self.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        member_membership.refresh_from_db()
-        self.assertTrue(member_membership.is_removed_user())
+        self._assert_archived(member)
 
     def test_owner_can_delete_an_officer(self):
         officer = User.objects.get(username='jamesmoth@example.org')
@@ -107,8 +105,7 @@ class DeleteUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':officer_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        officer_membership.refresh_from_db()
-        self.assertTrue(officer_membership.is_removed_user())
+        self._assert_archived(officer)
 
     def test_officer_delete_user_with_invalid_id(self):
         applicant = User.objects.get(username='pollyanatomato@example.org')
@@ -228,3 +225,7 @@ class DeleteUserViewTestCase(TestCase, CreateClubs):
         self.assertTemplateUsed(response, 'user_list.html')
         self.owner.refresh_from_db()
         self.assertTrue(self.club.is_owner(self.owner))
+
+    def _assert_archived(self, user):
+        self.assertFalse(Membership.objects.filter(user=user, club=self.club).exists())
+        self.assertTrue(MembershipArchive.objects.filter(user=user, club=self.club).exists())
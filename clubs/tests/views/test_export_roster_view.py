@@ -0,0 +1,77 @@
+"""Tests of the roster export view"""
+import csv
+import io
+import json
+from django.test import TestCase
+from django.urls import reverse
+from clubs.exports import roster_rows
+from clubs.models import Membership, User
+from clubs.tests.helpers import reverse_with_next, CreateClubs
+
+class ExportRosterViewTestCase(TestCase, CreateClubs):
+    """Tests of the roster export view"""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.url = reverse('export_roster', kwargs={'club_id': self.club.id})
+
+    def _export(self, **params):
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_export_roster_url(self):
+        self.assertEqual(self.url, f'/export_roster/club_id_{self.club.id}')
+
+    def test_export_roster_redirects_when_not_logged_in(self):
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_officer_cannot_export_roster(self):
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('user_list', kwargs={'club_id': self.club.id}), status_code=302, target_status_code=200)
+
+    def test_export_roster_as_csv(self):
+        response, content = self._export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'club_{self.club.id}_roster.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ['first_name', 'last_name', 'email', 'level', 'chess_level'])
+        self.assertEqual(rows[1][2:4], [self.owner.username, 'owner'])
+        self.assertEqual(len(rows), 5)
+        self.assertIn(['James', 'Moth', self.officer.username, 'officer', self.officer.get_chess_level_display()], rows)
+
+    def test_csv_export_escapes_formulas(self):
+        User.objects.filter(pk=self.officer.pk).update(first_name='=HYPERLINK("http://x")', last_name='@SUM(A1)')
+        _, content = self._export()
+        row = next(row for row in csv.reader(io.StringIO(content)) if row[2] == self.officer.username)
+        self.assertEqual(row[:2], ['\'=HYPERLINK("http://x")', "'@SUM(A1)"])
+        _, content = self._export(format='ndjson')
+        self.assertIn('"first_name": "=HYPERLINK', content)
+
+    def test_export_roster_as_ndjson(self):
+        response, content = self._export(format='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['level'] for row in rows}, {'owner', 'officer', 'member', 'applicant'})
+
+    def test_unknown_format_redirects_to_user_list(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, {'format': 'xml'})
+        self.assertRedirects(response, reverse('user_list', kwargs={'club_id': self.club.id}), status_code=302, target_status_code=200)
+
+    def test_roster_is_read_in_chunks(self):
+        for number in range(5):
+            user = self.create_user(f'extra{number}@example.org', "Extra", "User")
+            Membership.objects.create(club=self.club, user=user, level='2')
+        rows = roster_rows(self.club, chunk_size=2)
+        # The owner, then one joined query streamed a chunk at a time
+        with self.assertNumQueries(2):
+            self.assertEqual(len(list(rows)), 9)
@@ -0,0 +1,116 @@
+"""Tests of the roster import view"""
+import os
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from clubs.models import Club, Membership, MembershipEvent, User
+from clubs.tests.helpers import reverse_with_next, CreateClubs
+
+ROSTER = (
+    "first_name,last_name,email,chess_level,level\n"
+    "Ada,Lovelace,ada@example.org,Master,officer\n"
+    "Alan,Turing,alan@example.org,2,\n"
+    ",Nameless,nameless@example.org,1,member\n"
+    "Bad,Email,not-an-email,1,member\n"
+    "Ada,Again,ada@example.org,1,member\n"
+    "James,Moth,jamesmoth@example.org,1,member\n"
+    "Grace,Hopper,grace@example.org,1,owner\n"
+)
+
+@override_settings(IMPORT_BATCH_SIZE=3)
+class ImportRosterViewTestCase(TestCase, CreateClubs):
+    """Tests of the roster import view"""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.other = Club.objects.create(name="club2", location="Leeds", description="", owner=self.officer)
+        self.url = reverse('import_roster', kwargs={'club_id': self.club.id})
+
+    def _upload(self, content, password=''):
+        self.client.login(username=self.owner.username, password='Password123')
+        upload = SimpleUploadedFile('roster.csv', content.encode(), content_type='text/csv')
+        return self.client.post(self.url, {'file': upload, 'password': password})
+
+    def test_import_roster_url(self):
+        self.assertEqual(self.url, f'/import_roster/club_id_{self.club.id}')
+
+    def test_import_roster_redirects_when_not_logged_in(self):
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_officer_cannot_import_roster(self):
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('user_list', kwargs={'club_id': self.club.id}), status_code=302, target_status_code=200)
+
+    def test_get_import_roster(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'import_roster.html')
+
+    def test_import_roster_adds_valid_rows_and_reports_the_rest(self):
+        response = self._upload(ROSTER, password='Import123')
+        self.assertEqual(response.status_code, 200)
+        report = response.context['report']
+        self.assertEqual(report.created_users, 2)
+        self.assertEqual(report.added_memberships, 2)
+        self.assertEqual([line for line, _ in report.errors], [4, 5, 6, 7, 8])
+        ada = User.objects.get(username='ada@example.org')
+        self.assertEqual(ada.chess_level, '3')
+        self.assertTrue(ada.check_password('Import123'))
+        self.assertTrue(Membership.objects.get(club=self.club, user=ada).is_officer())
+        alan = User.objects.get(username='alan@example.org')
+        self.assertTrue(Membership.objects.get(club=self.club, user=alan).is_member())
+        self.assertGreater(alan.change_seq, 0)
+        self.assertEqual(MembershipEvent.objects.filter(club=self.club, kind=MembershipEvent.IMPORTED).count(), 2)
+
+    def test_import_skips_users_with_an_account(self):
+        outsider = User.objects.get(username='johnsmith@example.org')
+        content = "first_name,last_name,email,level\nJohn,Smith,johnsmith@example.org,officer\n"
+        self.client.login(username=self.officer.username, password='Password123')
+        upload = SimpleUploadedFile('roster.csv', content.encode(), content_type='text/csv')
+        url = reverse('import_roster', kwargs={'club_id': self.other.id})
+        report = self.client.post(url, {'file': upload}).context['report']
+        self.assertEqual((report.created_users, report.added_memberships), (0, 0))
+        [(line, message)] = report.errors
+        self.assertEqual(line, 2)
+        self.assertIn("apply to the club themselves", message)
+        self.assertFalse(Membership.objects.filter(club=self.other, user=outsider).exists())
+
+    def test_new_users_without_a_password_cannot_log_in(self):
+        self._upload("first_name,last_name,email\nAda,Lovelace,ada@example.org\n")
+        self.assertFalse(User.objects.get(username='ada@example.org').has_usable_password())
+
+    def test_csv_without_required_columns_is_rejected(self):
+        response = self._upload("name,email\nAda,ada@example.org\n")
+        self.assertIsNone(response.context['report'])
+        self.assertFalse(User.objects.filter(username='ada@example.org').exists())
+        self.assertIn('first_name', str(response.context['form'].errors))
+
+    def test_import_queries_do_not_grow_with_the_rows(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        query_counts = []
+        for first, last in [(0, 10), (10, 60)]:
+            rows = "".join(f"Extra,User,extra{number}@example.org\n" for number in range(first, last))
+            upload = SimpleUploadedFile('roster.csv', ("first_name,last_name,email\n" + rows).encode())
+            with self.settings(IMPORT_BATCH_SIZE=1000), CaptureQueriesContext(connection) as queries:
+                self.client.post(self.url, {'file': upload})
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertEqual(Membership.objects.filter(club=self.club).count(), 63)
+
+    def test_import_roster_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'roster.csv')
+            with open(path, 'w') as roster:
+                roster.write(ROSTER)
+            call_command('import_roster', self.club.id, path, password='Import123', stdout=open(os.devnull, 'w'), stderr=open(os.devnull, 'w'))
+        self.assertTrue(Membership.objects.filter(club=self.club, user__username='alan@example.org').exists())
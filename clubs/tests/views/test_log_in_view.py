@@ -1,9 +1,11 @@
 """Tests of the log in view."""
 from django.contrib import messages
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from clubs.forms import LogInForm
-from clubs.models import User, Membership
+from clubs.models import User, Club, Membership
 from clubs.tests.helpers import CreateClubs, LogInTester, MenuTesterMixin, reverse_with_next
 
 class LogInViewTestCase(TestCase, LogInTester, CreateClubs, MenuTesterMixin):
@@ -182,6 +184,35 @@ class LogInViewTestCase(TestCase, LogInTester, CreateClubs, MenuTesterMixin):
         self.assertEqual(len(messages_list), 0)
         self.assert_restricted_menu(response)
 
+    def test_log_in_lands_on_the_club_last_opened(self):
+        other_club = self._create_other_club("club2")
+        Membership.objects.create(user=self.user, club=other_club, level="2")
+        self.user.remember_club(other_club)
+        form_input = { 'username': self.user.username, 'password': 'Password123' }
+        response = self.client.post(self.url, form_input)
+        response_url = reverse('user_list', kwargs={'club_id': other_club.id})
+        self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
+
+    def test_log_in_skips_a_last_club_the_user_no_longer_belongs_to(self):
+        self.user.remember_club(self._create_other_club("club2"))
+        form_input = { 'username': self.user.username, 'password': 'Password123' }
+        response = self.client.post(self.url, form_input)
+        response_url = reverse('user_list', kwargs={'club_id': self.club.id})
+        self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
+
+    def test_log_in_query_count_does_not_grow_with_the_number_of_clubs(self):
+        form_input = { 'username': self.user.username, 'password': 'Password123' }
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, form_input)
+        self.client.logout()
+        for number in range(2, 12):
+            self._create_other_club(f"club{number}")
+        with self.assertNumQueries(len(queries)):
+            self.client.post(self.url, form_input)
+
+    def _create_other_club(self, name):
+        return Club.objects.create(name=name, location="Leeds", description="A chess club", owner=self.club.owner)
+
     def test_applicant_post_log_in_redirects_when_logged_in(self):
         self.membership.level = "1"
         self.membership.save()
@@ -0,0 +1,64 @@
+"""Tests of the membership events logged by the role change views"""
+from unittest import mock
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+from clubs.models import Membership, MembershipEvent, User
+from clubs.tests.helpers import CreateClubs
+
+class MembershipEventLogTestCase(TestCase, CreateClubs):
+    """Tests of the membership events logged by the role change views"""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+
+    def _change(self, url_name, user, by=None):
+        by = by or self.owner
+        self.client.login(username=by.username, password='Password123')
+        self.client.get(reverse(url_name, kwargs={'user_id': user.id, 'club_id': self.club.id}))
+
+    def _last_event(self):
+        return MembershipEvent.objects.filter(club_id=self.club.id).latest('id')
+
+    def test_accepting_an_applicant_logs_an_event(self):
+        self._change('accept_club_applicant', self.applicant, by=self.officer)
+        event = self._last_event()
+        self.assertEqual(event.kind, MembershipEvent.ACCEPTED)
+        self.assertEqual(event.user_id, self.applicant.id)
+        self.assertEqual(event.actor_id, self.officer.id)
+
+    def test_promoting_and_demoting_log_events(self):
+        self._change('promote_club_member', self.member)
+        self.assertEqual(self._last_event().kind, MembershipEvent.PROMOTED)
+        self._change('demote_club_officer', self.member)
+        self.assertEqual(self._last_event().kind, MembershipEvent.DEMOTED)
+
+    def test_removing_and_reinstating_log_events(self):
+        self._change('delete_user', self.member)
+        self.assertEqual(self._last_event().kind, MembershipEvent.REMOVED)
+        self._change('reinstate_deleted_user', self.member)
+        self.assertEqual(self._last_event().kind, MembershipEvent.REINSTATED)
+
+    def test_owner_transfer_logs_an_event(self):
+        self._change('owner_transfer', self.officer)
+        event = self._last_event()
+        self.assertEqual(event.kind, MembershipEvent.OWNERSHIP_TRANSFERRED)
+        self.assertEqual(event.user_id, self.officer.id)
+        self.assertEqual(event.actor_id, self.owner.id)
+
+    def test_leaving_a_club_logs_an_event_without_actor(self):
+        self.client.login(username=self.member.username, password='Password123')
+        self.client.get(reverse('leave_club', kwargs={'club_id': self.club.id}))
+        event = self._last_event()
+        self.assertEqual(event.kind, MembershipEvent.LEFT)
+        self.assertIsNone(event.actor_id)
+
+    def test_role_change_is_rolled_back_when_its_event_cannot_be_logged(self):
+        with mock.patch('clubs.views.log_membership_event', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self._change('promote_club_member', self.member)
+        self.assertTrue(Membership.objects.get(user=self.member, club=self.club).is_member())
@@ -0,0 +1,41 @@
+"""Tests of the notifications view"""
+from django.test import TestCase
+from django.urls import reverse
+from clubs.models import MembershipEvent, User
+from clubs.notifications import send_applicant_digest
+from clubs.tests.helpers import reverse_with_next, CreateClubs
+
+class NotificationsViewTestCase(TestCase, CreateClubs):
+    """Tests of the notifications view"""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+        MembershipEvent.objects.create(club_id=self.club.id, user_id=self.applicant.id, kind=MembershipEvent.APPLIED)
+        send_applicant_digest(self.club.id)
+        self.url = reverse('notifications')
+
+    def test_notifications_url(self):
+        self.assertEqual(self.url, '/notifications/')
+
+    def test_notifications_redirects_when_not_logged_in(self):
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_menu_shows_unread_badge(self):
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(reverse('user_list', kwargs={'club_id': self.club.id}))
+        self.assertContains(response, '<span class="badge rounded-pill bg-danger">1</span>', html=True)
+
+    def test_get_notifications_lists_digests_and_marks_them_read(self):
+        self.client.login(username=self.officer.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'notifications.html')
+        self.assertEqual(len(response.context['notifications']), 1)
+        self.assertContains(response, "1 new applicant to club1")
+        self.assertNotContains(response, 'bg-danger')
+        self.officer.refresh_from_db()
+        self.assertEqual(self.officer.unread_notifications, 0)
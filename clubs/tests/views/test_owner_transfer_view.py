@@ -42,6 +42,15 @@ class OwnerTransferViewTestCase(TestCase, CreateClubs):
         self.assertTrue(self.membership.is_officer())
         self.assertTrue(self.club.is_owner(self.target_user))
 
+    def test_owner_cannot_transfer_ownership_to_a_removed_user(self):
+        self.membership.remove_user()
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url, follow=True)
+        self.club.refresh_from_db()
+        self.assertRedirects(response, reverse('user_list', kwargs={'club_id': self.club.id}), status_code=302, target_status_code=200)
+        self.assertTrue(self.club.is_owner(self.user))
+        self.assertFalse(Membership.objects.filter(user=self.user, club=self.club).exists())
+
     def test_owner_transfer_ownership_with_invalid_id(self):
         self.assertTrue(self.club.is_owner(self.user))
         self.client.login(username=self.user.username, password='Password123')
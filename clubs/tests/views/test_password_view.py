@@ -91,6 +91,12 @@ class PasswordViewTestCase(TestCase, CreateClubs):
         is_password_correct = check_password('NewPassword123', self.owner.password)
         self.assertTrue(is_password_correct)
 
+    def test_password_change_without_a_club_redirects_to_profile(self):
+        user = self.create_user("newuser@example.org", "New", "User")
+        self.client.login(username=user.username, password='Password123')
+        response = self.client.post(self.url, self.form_input)
+        self.assertRedirects(response, reverse('profile'), status_code=302, target_status_code=200)
+
     def test_password_change_unsuccessful_without_correct_old_password(self):
         self.client.login(username=self.user.username, password='Password123')
         self.form_input['password'] = 'WrongPassword123'
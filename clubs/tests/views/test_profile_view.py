@@ -3,7 +3,7 @@ from django.contrib import messages
 from django.test import TestCase
 from django.urls import reverse
 from clubs.forms import UserForm
-from clubs.models import User, Membership
+from clubs.models import User, Club, Membership
 from clubs.tests.helpers import reverse_with_next, CreateClubs
 
 class ProfileViewTestCase(TestCase, CreateClubs):
@@ -46,6 +46,16 @@ class ProfileViewTestCase(TestCase, CreateClubs):
         response = self.client.get(self.url)
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
     
+    def test_profile_update_returns_to_the_last_opened_club(self):
+        other_club = Club(owner=self.owner, name="club2", location="Leeds", description="Another chess club")
+        other_club.save()
+        Membership(user=self.user, club=other_club, level="2").save()
+        self.client.login(username=self.user.username, password='Password123')
+        self.client.get(reverse('user_list', kwargs={'club_id': other_club.id}))
+        response = self.client.post(self.url, self.form_input)
+        response_url = reverse('user_list', kwargs={'club_id': other_club.id})
+        self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
+
     def test_applicant_successful_profile_update(self):
         self.membership.level = "1"
         self.membership.save()
@@ -1,7 +1,7 @@
 """Tests of the reinstate deleted user view"""
 from django.test import TestCase
 from django.urls import reverse
-from clubs.models import Membership, User
+from clubs.models import Membership, MembershipArchive, User
 from clubs.tests.helpers import CreateClubs, reverse_with_next
 
 class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
@@ -16,7 +16,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.user = User.objects.get(username='jamesmoth@example.org')
         self.membership = Membership.objects.all().filter(user=self.user, club=self.club)[0]
         self.target_user = User.objects.get(username='removed@example.org')
-        self.target_membership = Membership.objects.all().filter(user=self.target_user, club=self.club)[0]
+        self.target_membership = MembershipArchive.objects.get(user=self.target_user, club=self.club)
         self.owner = self.club.owner
         self.url = reverse('reinstate_deleted_user', kwargs={'user_id': self.target_user.id, 'club_id' : self.club.id})
 
@@ -38,9 +38,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(applicant_membership.club, officer_membership.club)
         self.assertTrue(applicant_membership.is_applicant())
         self.assertTrue(officer_membership.is_officer())
-        applicant_membership.level = '0'
-        applicant_membership.save()
-        applicant.refresh_from_db()
+        applicant_membership.remove_user()
         self.assertTrue(applicant_membership.is_removed_user())
         self.client.login(username=officer.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': applicant.id,'club_id':applicant_membership.club.id})
@@ -48,8 +46,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':applicant_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        applicant_membership.refresh_from_db()
-        self.assertFalse(applicant_membership.is_applicant())
+        self._assert_still_removed(applicant)
 
     def test_officer_cannot_reinstate_a_member(self):
         member = User.objects.get(username='hillaryunderside@example.org')
@@ -59,9 +56,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(member_membership.club, officer_membership.club)
         self.assertTrue(member_membership.is_member())
         self.assertTrue(officer_membership.is_officer())
-        member_membership.level = '0'
-        member_membership.save()
-        member_membership.refresh_from_db()
+        member_membership.remove_user()
         self.assertTrue(member_membership.is_removed_user())
         self.client.login(username=officer.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': member.id,'club_id':member_membership.club.id})
@@ -69,8 +64,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':member_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        member_membership.refresh_from_db()
-        self.assertFalse(member_membership.is_applicant())
+        self._assert_still_removed(member)
 
     def test_owner_can_reinstate_an_applicant(self):
         applicant = User.objects.get(username='pollyanatomato@example.org')
@@ -78,9 +72,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(applicant_membership.club, self.club)
         self.assertTrue(applicant_membership.is_applicant())
         self.assertTrue(self.club.is_owner(self.owner))
-        applicant_membership.level = '0'
-        applicant_membership.save()
-        applicant.refresh_from_db()
+        applicant_membership.remove_user()
         self.assertTrue(applicant_membership.is_removed_user())
         self.client.login(username=self.owner.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': applicant.id,'club_id':applicant_membership.club.id})
@@ -88,8 +80,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':applicant_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        applicant_membership.refresh_from_db()
-        self.assertTrue(applicant_membership.is_applicant())
+        self._assert_reinstated(applicant)
 
     def test_owner_can_reinstate_a_member(self):
         member = User.objects.get(username='hillaryunderside@example.org')
@@ -97,9 +88,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(member_membership.club, self.club)
         self.assertTrue(member_membership.is_member())
         self.assertTrue(self.club.is_owner(self.owner))
-        member_membership.level = '0'
-        member_membership.save()
-        member.refresh_from_db()
+        member_membership.remove_user()
         self.assertTrue(member_membership.is_removed_user())
         self.client.login(username=self.owner.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': member.id,'club_id':member_membership.club.id})
@@ -107,8 +96,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':member_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        member_membership.refresh_from_db()
-        self.assertTrue(member_membership.is_applicant())
+        self._assert_reinstated(member)
 
     def test_owner_can_reinstate_an_officer(self):
         officer = User.objects.get(username='jamesmoth@example.org')
@@ -116,9 +104,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(officer_membership.club, self.club)
         self.assertTrue(officer_membership.is_officer())
         self.assertTrue(self.club.is_owner(self.owner))
-        officer_membership.level = '0'
-        officer_membership.save()
-        officer.refresh_from_db()
+        officer_membership.remove_user()
         self.assertTrue(officer_membership.is_removed_user())
         self.client.login(username=self.owner.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': officer.id,'club_id':officer_membership.club.id})
@@ -126,8 +112,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':officer_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        officer_membership.refresh_from_db()
-        self.assertTrue(officer_membership.is_applicant())
+        self._assert_reinstated(officer)
 
     def test_officer_reinstate_user_with_invalid_id(self):
         member = User.objects.get(username='hillaryunderside@example.org')
@@ -137,9 +122,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(member_membership.club, officer_membership.club)
         self.assertTrue(member_membership.is_member())
         self.assertTrue(officer_membership.is_officer())
-        member_membership.level = '0'
-        member_membership.save()
-        member_membership.refresh_from_db()
+        member_membership.remove_user()
         self.assertTrue(member_membership.is_removed_user())
         self.client.login(username=officer.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': member.id+99999,'club_id':member_membership.club.id})
@@ -147,8 +130,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':member_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        member_membership.refresh_from_db()
-        self.assertTrue(member_membership.is_removed_user())
+        self._assert_still_removed(member)
 
     def test_member_cannot_reinstate_an_applicant(self):
         member = User.objects.get(username='hillaryunderside@example.org')
@@ -158,9 +140,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(member_membership.club, applicant_membership.club)
         self.assertTrue(member_membership.is_member())
         self.assertTrue(applicant_membership.is_applicant())
-        applicant_membership.level = '0'
-        applicant_membership.save()
-        applicant_membership.refresh_from_db()
+        applicant_membership.remove_user()
         self.assertTrue(applicant_membership.is_removed_user())
         self.client.login(username=member.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': applicant.id,'club_id':applicant_membership.club.id})
@@ -168,8 +148,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':applicant_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        applicant_membership.refresh_from_db()
-        self.assertTrue(applicant_membership.is_removed_user())
+        self._assert_still_removed(applicant)
 
     def test_member_cannot_reinstate_another_member(self):
         member = User.objects.get(username='hillaryunderside@example.org')
@@ -179,9 +158,7 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         self.assertEqual(member_membership.club, member2_membership.club)
         self.assertTrue(member_membership.is_member())
         self.assertTrue(member2_membership.is_member())
-        member2_membership.level = '0'
-        member2_membership.save()
-        member2_membership.refresh_from_db()
+        member2_membership.remove_user()
         self.assertTrue(member2_membership.is_removed_user())
         self.client.login(username=member.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': member2.id,'club_id':member2_membership.club.id})
@@ -189,16 +166,13 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('user_list', kwargs={'club_id':member2_membership.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'user_list.html')
-        member2_membership.refresh_from_db()
-        self.assertTrue(member2_membership.is_removed_user())
+        self._assert_still_removed(member2)
 
     def test_member_cannot_reinstate_themselves(self):
         member = User.objects.get(username='hillaryunderside@example.org')
         member_membership = Membership.objects.all().filter(user=member, club=self.club)[0]
         self.assertTrue(member_membership.is_member())
-        member_membership.level = '0'
-        member_membership.save()
-        member_membership.refresh_from_db()
+        member_membership.remove_user()
         self.assertTrue(member_membership.is_removed_user())
         self.client.login(username=member.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': member.id,'club_id':member_membership.club.id})
@@ -206,16 +180,13 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('show_club', kwargs={'club_id': self.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'show_club.html')
-        member_membership.refresh_from_db()
-        self.assertTrue(member_membership.is_removed_user())
+        self._assert_still_removed(member)
 
     def test_officer_cannot_reinstate_themselves(self):
         officer = User.objects.get(username='jamesmoth@example.org')
         officer_membership = Membership.objects.all().filter(user=officer, club=self.club)[0]
         self.assertTrue(officer_membership.is_officer())
-        officer_membership.level = '0'
-        officer_membership.save()
-        officer_membership.refresh_from_db()
+        officer_membership.remove_user()
         self.assertTrue(officer_membership.is_removed_user())
         self.client.login(username=officer.username, password='Password123')
         url = reverse('reinstate_deleted_user', kwargs={'user_id': officer.id,'club_id':officer_membership.club.id})
@@ -223,5 +194,27 @@ class ReinstateDeletedUserViewTestCase(TestCase, CreateClubs):
         response_url = reverse('show_club', kwargs={'club_id': self.club.id})
         self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
         self.assertTemplateUsed(response, 'show_club.html')
-        officer_membership.refresh_from_db()
-        self.assertTrue(officer_membership.is_removed_user())
+        self._assert_still_removed(officer)
+
+    def test_owner_can_reinstate_an_archived_user(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(self.url, follow=True)
+        response_url = reverse('user_list', kwargs={'club_id': self.club.id})
+        self.assertRedirects(response, response_url, status_code=302, target_status_code=200)
+        self._assert_reinstated(self.target_user)
+
+    def test_owner_cannot_reinstate_a_user_who_was_not_removed(self):
+        member = User.objects.get(username='hillaryunderside@example.org')
+        self.client.login(username=self.owner.username, password='Password123')
+        url = reverse('reinstate_deleted_user', kwargs={'user_id': member.id, 'club_id': self.club.id})
+        response = self.client.get(url, follow=True)
+        self.assertContains(response, "Cannot reinstate this user")
+        self.assertTrue(Membership.objects.get(user=member, club=self.club).is_member())
+
+    def _assert_reinstated(self, user):
+        self.assertTrue(Membership.objects.get(user=user, club=self.club).is_applicant())
+        self.assertFalse(MembershipArchive.objects.filter(user=user, club=self.club).exists())
+
+    def _assert_still_removed(self, user):
+        self.assertFalse(Membership.objects.filter(user=user, club=self.club).exists())
+        self.assertTrue(MembershipArchive.objects.filter(user=user, club=self.club).exists())
@@ -0,0 +1,224 @@
+"""Tests of the roster stream and roster changes views"""
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from clubs import async_views, events
+from clubs.activity import log_membership_event
+from clubs.asgi import EventStreamResponse
+from clubs.models import Membership, MembershipEvent, User
+from clubs.tests.helpers import reverse_with_next, CreateClubs
+
+@override_settings(
+    ROOT_URLCONF='clubs.tests.async_urls',
+    ROSTER_STREAM_HEARTBEAT=60, ROSTER_STREAM_MAX_SECONDS=5, ROSTER_STREAM_POLL_SECONDS=60,
+)
+class RosterStreamViewTestCase(TestCase, CreateClubs):
+    """Tests of the roster stream view"""
+
+    fixtures = [
+        'clubs/tests/fixtures/default_user.json',
+        'clubs/tests/fixtures/other_users.json'
+    ]
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.officer = User.objects.get(username='jamesmoth@example.org')
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+        self.url = reverse('roster_stream', kwargs={'club_id': self.club.id})
+
+    async def _open_stream(self, user, last_event_id=None):
+        headers = {'Last-Event-ID': str(last_event_id)} if last_event_id is not None else {}
+        request = AsyncRequestFactory().get(self.url, **headers)
+        request.user = user
+        return await async_views.roster_stream(request, club_id=self.club.id)
+
+    async def _next_event(self, stream):
+        async for chunk in stream:
+            if chunk.startswith('id:'):
+                lines = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+                return lines['id'], lines['event'], json.loads(lines['data'])
+        self.fail("The stream ended without an event")
+
+    def _promote_member(self):
+        Membership.objects.filter(user=self.member, club=self.club).update(level='3')
+        return log_membership_event(self.club, self.member, MembershipEvent.PROMOTED, actor=self.owner)
+
+    def test_roster_stream_url(self):
+        self.assertEqual(self.url, f'/roster_stream/club_id_{self.club.id}')
+
+    def test_roster_stream_redirects_when_not_logged_in(self):
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_applicant_cannot_open_roster_stream(self):
+        self.client.login(username=self.applicant.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    async def test_roster_stream_sends_membership_deltas_when_woken(self):
+        response = await self._open_stream(self.owner)
+        self.assertIsInstance(response, EventStreamResponse)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        stream = response.streaming_content
+        self.assertEqual(await stream.__anext__(), "retry: 3000\n\n")
+        event = await sync_to_async(self._promote_member)()
+        events.streams.wake(self.club.id)
+        event_id, name, delta = await self._next_event(stream)
+        self.assertEqual(event_id, str(event.id))
+        self.assertEqual(name, 'membership')
+        self.assertEqual(delta['change'], 'promoted')
+        self.assertEqual(delta['user_id'], self.member.id)
+        self.assertEqual(delta['level'], '3')
+        self.assertIn(f'data-user-id="{self.member.id}"', delta['html'])
+        self.assertIn('Demote', delta['html'])
+        await stream.aclose()
+
+    @override_settings(ROSTER_STREAM_POLL_SECONDS=0.05)
+    async def test_roster_stream_reads_changes_made_by_other_processes(self):
+        stream = (await self._open_stream(self.owner)).streaming_content
+        await stream.__anext__()
+        await sync_to_async(self._promote_member)()
+        _, _, delta = await self._next_event(stream)
+        self.assertEqual(delta['change'], 'promoted')
+        await stream.aclose()
+
+    @override_settings(ROSTER_STREAM_HEARTBEAT=0.05)
+    async def test_roster_stream_sends_keep_alive_when_idle(self):
+        stream = (await self._open_stream(self.owner)).streaming_content
+        await stream.__anext__()
+        self.assertEqual(await stream.__anext__(), ": keep-alive\n\n")
+        await stream.aclose()
+
+    async def test_roster_stream_hides_applicants_from_members(self):
+        stream = (await self._open_stream(self.member, last_event_id=0)).streaming_content
+        await sync_to_async(log_membership_event)(self.club, self.applicant, MembershipEvent.APPLIED)
+        _, _, delta = await self._next_event(stream)
+        self.assertEqual(delta['change'], 'applied')
+        self.assertEqual(delta['level'], '1')
+        self.assertEqual(delta['html'], '')
+        await stream.aclose()
+
+    def _remove(self, user):
+        Membership.objects.get(user=user, club=self.club).remove_user()
+        return log_membership_event(self.club, user, MembershipEvent.REMOVED, actor=self.owner)
+
+    async def test_roster_stream_sends_removed_members_from_the_archive(self):
+        stream = (await self._open_stream(self.owner)).streaming_content
+        await stream.__anext__()
+        await sync_to_async(self._remove)(self.member)
+        events.streams.wake(self.club.id)
+        _, _, delta = await self._next_event(stream)
+        self.assertEqual(delta['change'], 'removed')
+        self.assertEqual(delta['level'], '0')
+        self.assertIn('Reinstate', delta['html'])
+        await stream.aclose()
+
+    async def test_roster_stream_follows_the_viewers_role(self):
+        stream = (await self._open_stream(self.officer)).streaming_content
+        await stream.__anext__()
+        await sync_to_async(Membership.objects.filter(user=self.officer, club=self.club).update)(level='2')
+        await sync_to_async(log_membership_event)(self.club, self.applicant, MembershipEvent.APPLIED)
+        events.streams.wake(self.club.id)
+        _, _, delta = await self._next_event(stream)
+        self.assertEqual(delta['level'], '1')
+        self.assertEqual(delta['html'], '')
+        await sync_to_async(self._remove)(self.officer)
+        events.streams.wake(self.club.id)
+        self.assertEqual([chunk async for chunk in stream], [])
+        self.assertEqual(len(events.streams), 0)
+
+    async def test_roster_stream_replays_events_after_last_event_id(self):
+        first = await sync_to_async(self._promote_member)()
+        await sync_to_async(log_membership_event)(self.club, self.member, MembershipEvent.DEMOTED, actor=self.owner)
+        stream = (await self._open_stream(self.owner, last_event_id=first.id)).streaming_content
+        _, _, delta = await self._next_event(stream)
+        self.assertEqual(delta['change'], 'demoted')
+        await stream.aclose()
+
+    @override_settings(ROSTER_STREAM_MAX_OPEN=1)
+    async def test_roster_streams_are_capped(self):
+        stream = (await self._open_stream(self.owner)).streaming_content
+        await stream.__anext__()
+        self.assertEqual((await self._open_stream(self.officer)).status_code, 204)
+        await stream.aclose()
+        self.assertEqual(len(events.streams), 0)
+        response = await self._open_stream(self.officer)
+        self.assertIsInstance(response, EventStreamResponse)
+        del response
+        self.assertEqual(len(events.streams), 0)
+
+    async def test_role_change_wakes_streams_on_commit(self):
+        queue = events.streams.open(self.club.id)
+
+        def promote():
+            self.client.login(username=self.owner.username, password='Password123')
+            url = reverse('promote_club_member', kwargs={'user_id': self.member.id, 'club_id': self.club.id})
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(url)
+        await sync_to_async(promote)()
+        self.assertIsNone(await asyncio.wait_for(queue.get(), 5))
+        events.streams.close(self.club.id, queue)
+
+
+class RosterChangesViewTestCase(TestCase, CreateClubs):
+    """Tests of the roster stream under WSGI and the roster changes view polled instead"""
+
+    def setUp(self):
+        self.club = self.create_one_club("club1", "London", "A chess club")
+        self.owner = self.club.owner
+        self.member = User.objects.get(username='hillaryunderside@example.org')
+        self.applicant = User.objects.get(username='pollyanatomato@example.org')
+        self.url = reverse('roster_changes', kwargs={'club_id': self.club.id})
+
+    def test_roster_changes_url(self):
+        self.assertEqual(self.url, f'/roster_changes/club_id_{self.club.id}')
+
+    def test_roster_stream_is_not_served_under_wsgi(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        response = self.client.get(reverse('roster_stream', kwargs={'club_id': self.club.id}))
+        self.assertEqual(response.status_code, 204)
+
+    def test_roster_changes_redirects_when_not_logged_in(self):
+        redirect_url = reverse_with_next('log_in', self.url)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
+
+    def test_roster_changes_starts_from_the_latest_event(self):
+        event = log_membership_event(self.club, self.applicant, MembershipEvent.APPLIED)
+        self.client.login(username=self.owner.username, password='Password123')
+        changes = self.client.get(self.url).json()
+        self.assertEqual(changes, {'events': [], 'last_event_id': event.id, 'retry': 5000})
+
+    def test_roster_changes_returns_deltas_after_the_cursor(self):
+        first = log_membership_event(self.club, self.applicant, MembershipEvent.APPLIED)
+        Membership.objects.filter(user=self.member, club=self.club).update(level='3')
+        last = log_membership_event(self.club, self.member, MembershipEvent.PROMOTED, actor=self.owner)
+        self.client.login(username=self.owner.username, password='Password123')
+        changes = self.client.get(self.url, {'after': first.id}).json()
+        self.assertEqual(changes['last_event_id'], last.id)
+        [delta] = changes['events']
+        self.assertEqual(delta['change'], 'promoted')
+        self.assertEqual(delta['level'], '3')
+        self.assertIn(f'data-user-id="{self.member.id}"', delta['html'])
+        self.assertEqual(self.client.get(self.url, {'after': last.id}).json()['events'], [])
+
+    def test_roster_changes_include_removed_members(self):
+        Membership.objects.get(user=self.member, club=self.club).remove_user()
+        log_membership_event(self.club, self.member, MembershipEvent.REMOVED, actor=self.owner)
+        self.client.login(username=self.owner.username, password='Password123')
+        [delta] = self.client.get(self.url, {'after': 0}).json()['events']
+        self.assertEqual(delta['level'], '0')
+        self.assertIn(f'data-user-id="{self.member.id}"', delta['html'])
+
+    def test_roster_changes_hides_applicants_from_members(self):
+        log_membership_event(self.club, self.applicant, MembershipEvent.APPLIED)
+        self.client.login(username=self.member.username, password='Password123')
+        [delta] = self.client.get(self.url, {'after': 0}).json()['events']
+        self.assertEqual(delta['level'], '1')
+        self.assertEqual(delta['html'], '')
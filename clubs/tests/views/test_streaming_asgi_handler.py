@@ -0,0 +1,41 @@
+"""Tests of the ASGI handler sending event stream responses."""
+import asyncio
+from django.test import SimpleTestCase
+from clubs.asgi import EventStreamResponse, StreamingASGIHandler, _receive
+
+class StreamingASGIHandlerTestCase(SimpleTestCase):
+    """Tests of the ASGI handler sending event stream responses."""
+
+    def setUp(self):
+        self.closed = False
+        self.sent = []
+
+    async def _events(self, count=None):
+        try:
+            for number in range(count) if count is not None else iter(int, 1):
+                yield f"data: {number}\n\n"
+                await asyncio.sleep(0.001)
+        finally:
+            self.closed = True
+
+    async def _send(self, message):
+        self.sent.append(message)
+
+    async def test_events_are_sent_as_body_parts(self):
+        connected = asyncio.Event()
+        _receive.set(connected.wait)
+        await StreamingASGIHandler().send_response(EventStreamResponse(self._events(2)), self._send)
+        self.assertEqual(self.sent[0]['type'], 'http.response.start')
+        self.assertIn((b'Content-Type', b'text/event-stream'), self.sent[0]['headers'])
+        self.assertEqual([message.get('body') for message in self.sent[1:]], [b'data: 0\n\n', b'data: 1\n\n', None])
+        self.assertTrue(self.closed)
+
+    async def test_stream_is_closed_when_the_client_disconnects(self):
+        async def receive():
+            await asyncio.sleep(0.05)
+            return {'type': 'http.disconnect'}
+        _receive.set(receive)
+        await asyncio.wait_for(
+            StreamingASGIHandler().send_response(EventStreamResponse(self._events()), self._send), 5
+        )
+        self.assertTrue(self.closed)
@@ -1,7 +1,10 @@
 """Tests of the user list view."""
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from clubs.models import User,Membership
+from clubs.routers import RequestRouting, reset_routing, set_routing
 from clubs.tests.helpers import reverse_with_next, CreateClubs
 
 class UserListViewTestCase(TestCase, CreateClubs):
@@ -25,6 +28,40 @@ class UserListViewTestCase(TestCase, CreateClubs):
         response = self.client.get(self.url)
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
 
+    def test_user_list_remembers_the_club_for_the_next_log_in(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.client.get(self.url)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_club_id, self.club.id)
+        change_seq = self.user.change_seq
+        self.client.get(self.url)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.change_seq, change_seq)
+
+    def test_user_list_queries_do_not_grow_with_the_roster(self):
+        self.client.login(username=self.owner.username, password='Password123')
+        self.client.get(self.url)
+        query_counts = []
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(self.url).status_code, 200)
+            query_counts.append(len(queries))
+            self._create_test_users(self.test_user_num)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    @override_settings(REPLICA_DATABASE='replica')
+    def test_remembering_the_club_keeps_the_request_on_the_replica(self):
+        routing = RequestRouting()
+        routing.use_replica = True
+        token = set_routing(routing)
+        try:
+            self.user.remember_club(self.club)
+        finally:
+            reset_routing(token)
+        self.assertFalse(routing.wrote)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_club_id, self.club.id)
+
     def test_applicant_get_user_list(self):
         self.membership.level = "1"
         self.membership.save()
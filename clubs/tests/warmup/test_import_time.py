@@ -0,0 +1,26 @@
+"""Tests of the start-up import profiling."""
+from django.test import SimpleTestCase
+from clubs.importtime import DEFERRED_IMPORTS, parse_importtime, profile_imports, total_us
+
+REPORT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:       300 |        420 |   io
+import time:       500 |        920 | site
+import time:        80 |         80 | django_heroku
+"""
+
+class ImportTimeTestCase(SimpleTestCase):
+    """Tests of the start-up import profiling."""
+
+    def test_parse_importtime(self):
+        imports = parse_importtime(REPORT.splitlines())
+        self.assertEqual([entry.module for entry in imports], ['_io', 'io', 'site', 'django_heroku'])
+        self.assertEqual([entry.depth for entry in imports], [2, 1, 0, 0])
+        self.assertEqual(imports[1].self_us, 300)
+        self.assertEqual(imports[1].cumulative_us, 420)
+        self.assertEqual(total_us(imports), 1000)
+
+    def test_start_up_does_not_import_deferred_modules(self):
+        modules = {entry.module for entry in profile_imports('setup')}
+        self.assertIn('clubs.sharding', modules)
+        self.assertFalse(modules & set(DEFERRED_IMPORTS))
@@ -0,0 +1,31 @@
+"""Tests of the worker warm-up."""
+from django.conf import settings
+from django.template import engines
+from django.test import TestCase, override_settings
+from clubs.warmup import app_templates, warm_up
+
+CACHED_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [('django.template.loaders.cached.Loader', ['django.template.loaders.app_directories.Loader'])],
+    },
+}]
+
+class WarmUpTestCase(TestCase):
+    """Tests of the worker warm-up."""
+
+    def test_app_templates_lists_every_template(self):
+        templates = app_templates()
+        self.assertIn('user_list.html', templates)
+        self.assertIn('partials/roster_row.html', templates)
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_warm_up_compiles_every_template(self):
+        warmed = warm_up()
+        self.assertEqual(warmed['templates'], len(app_templates()))
+        self.assertTrue(warmed['content_types'])
+        cached_loader = engines['django'].engine.template_loaders[0]
+        for name in app_templates():
+            self.assertIn(name, cached_loader.get_template_cache)
@@ -1,14 +1,26 @@
+import io
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import check_password
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
-from .forms import LogInForm, UserForm, SignUpForm, PasswordForm, CreateClubForm
-from .models import User, Club, Membership
+from .activity import activity_page, log_membership_event, membership_change
+from .archive import schedule_archive_purge
+from .events import events_after, latest_event_id, publish_membership_change, roster_deltas
+from .exports import EXPORT_FORMATS, roster_rows
+from .forms import LogInForm, UserForm, SignUpForm, PasswordForm, CreateClubForm, ImportRosterForm
+from .imports import RosterImportError, import_roster_csv
+from .models import User, Club, Membership, MembershipArchive, MembershipEvent
+from .notifications import mark_notifications_read, record_application
+from .permissions import ACCEPT, DEMOTE, OWNER, PROMOTE, REJECT, REMOVE, TRANSFER, can, viewer_role
 from .helpers import login_prohibited, member_or_above_required, officer_or_above_required, owner_prohibited, owner_required
 
-current_club = None
+def _own_pages_club(user):
+    """Return the club the user's own pages (profile, password, ...) are shown in, or None."""
+    return user.last_opened_club() or user.landing_club()
 
 @login_prohibited
 def home(request):
@@ -23,27 +35,11 @@ def log_in(request):
         if form.is_valid():
             user = form.get_user()
             if user is not None:
-                clubs=Club.objects.all()
                 login(request, user)
-                try:
-                    # Gets a club the user is part of
-                    club=[club for club in clubs if club.is_part_of(user)][0]
-                except:
-                    # In case the user is not part of any clubs
-                    club=[club for club in clubs][0]
+                club = user.landing_club()
+                # In case the user is not part of any clubs
+                if club is None:
                     return redirect('profile')
-                
-                membership = Membership.objects.all().filter(user=user,club=club)
-                # Check if the current user has no membership
-                if (len(membership) == 0):
-                    if club.is_owner(user):
-                        redirect_url = next or 'user_list'
-                        return redirect(redirect_url, club_id=club.id)
-
-                if membership[0].is_removed_user():
-                    club=[club for club in clubs][0]
-                    return redirect('profile')
-
                 redirect_url = next or 'user_list'
                 return redirect(redirect_url, club_id=club.id)
         messages.add_message(request, messages.ERROR, "The credentials provided were invalid!")
@@ -54,7 +50,6 @@ def log_in(request):
 
 @login_prohibited
 def sign_up(request):
-    global current_club
     if request.method == 'POST':
         form = SignUpForm(request.POST)
         if form.is_valid():
@@ -62,7 +57,6 @@ def sign_up(request):
             club = Club.objects.all().filter(pk=user.club)[0]
             login(request, user)
             apply(request,club.id)
-            current_club=club
             return redirect('user_list',club.pk)
     else:
         form = SignUpForm()
@@ -71,39 +65,33 @@ def sign_up(request):
 @login_required
 @member_or_above_required
 def user_list(request, club_id):
-    global current_club
     clubs = Club.objects.all()
     current_club=clubs.get(pk=club_id)
     current_user = request.user
+    current_user.remember_club(current_club)
     is_owner=current_club.is_owner(current_user)
-    users=current_club.members.all()
+    roster = Membership.objects.roster(current_club.id)
     if(current_club.is_owner(current_user)):
         user_membership=None
     else:
-        user_membership = Membership.objects.all().filter(user=current_user, club=current_club)[0]
+        user_membership = next(membership for membership in roster if membership.user_id == current_user.id)
 
     # Gets the clubs you're a part of
-    your_clubs=[   
-        club for club in clubs 
-            if club.is_part_of(current_user) or club.is_owner(current_user) 
-                and not Membership.objects.all().filter(user=current_user, club=club)[0].is_removed_user()
-    ]
+    your_clubs=Club.objects.for_user(current_user)
 
     other_clubs=list(set(clubs)-set(your_clubs))
     # Get each role's groups
-    active_users=[active_user for active_user in users if active_user.is_active]
-    non_applicants=[Membership.objects.all().filter(user=non_applicant, club=current_club)[0] for non_applicant in active_users
-    if Membership.objects.all().filter(user=non_applicant, club=current_club)[0].level!='1' and not Membership.objects.all().filter(user=non_applicant, club=current_club)[0].is_removed_user() ]
-    officers = [Membership.objects.all().filter(user=officer, club=current_club)[0] for officer in active_users if Membership.objects.all().filter(user=officer, club=current_club)[0].is_officer()]
-    members = [Membership.objects.all().filter(user=member, club=current_club)[0] for member in active_users if Membership.objects.all().filter(user=member, club=current_club)[0].is_member()]
+    active=[membership for membership in roster if membership.user.is_active]
+    non_applicants=[membership for membership in active if membership.is_member() or membership.is_officer()]
+    officers = [membership for membership in active if membership.is_officer()]
+    members = [membership for membership in active if membership.is_member()]
     applicants = []
     # Prevent hackers from seeing the information in the website tools
-    if not current_club.is_owner(current_user):
-        if not user_membership.is_member():
-            applicants = [Membership.objects.all().filter(user=applicants, club=current_club)[0] for applicants in active_users if Membership.objects.all().filter(user=applicants, club=current_club)[0].is_applicant()]
-    else:
-        applicants = [Membership.objects.all().filter(user=applicants, club=current_club)[0] for applicants in active_users if Membership.objects.all().filter(user=applicants, club=current_club)[0].is_applicant()]
-    removed_members = [Membership.objects.all().filter(user=applicants, club=current_club)[0] for applicants in active_users if Membership.objects.all().filter(user=applicants, club=current_club)[0].is_removed_user()]
+    if is_owner or not user_membership.is_member():
+        applicants = [membership for membership in active if membership.is_applicant()]
+    removed_members = list(
+        MembershipArchive.objects.filter(club=current_club, user__is_active=True).select_related('user').order_by('pk')
+    )
     context = {
         'user_membership':user_membership,
         'users':non_applicants,
@@ -118,6 +106,94 @@ def user_list(request, club_id):
     }
     return render(request, 'user_list.html', context)
 
+@login_required
+@member_or_above_required
+def roster_stream(request, club_id):
+    # Under WSGI a stream would hold a worker thread for minutes. No Content
+    # stops the browser's EventSource, and the roster page polls roster_changes instead.
+    return HttpResponse(status=204)
+
+@login_required
+@member_or_above_required
+def roster_changes(request, club_id):
+    current_club = Club.objects.get(pk=club_id)
+    current_user = request.user
+    try:
+        after = int(request.GET['after'])
+    except (KeyError, ValueError):
+        return JsonResponse({'events': [], 'last_event_id': latest_event_id(current_club.id), 'retry': settings.ROSTER_POLL_MS})
+    is_owner = current_club.is_owner(current_user)
+    user_membership = None
+    if not is_owner:
+        user_membership = Membership.objects.filter(user_id=current_user.id, club=current_club).order_by('pk').first()
+    events = events_after(current_club.id, after)
+    return JsonResponse({
+        'events': roster_deltas(current_club, is_owner, user_membership, events),
+        'last_event_id': events[-1].id if events else after,
+        'retry': settings.ROSTER_POLL_MS,
+    })
+
+@login_required
+@owner_required
+def export_roster(request, club_id):
+    current_club = Club.objects.get(pk=club_id)
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        messages.error(request, "Unknown export format")
+        return redirect('user_list', club_id)
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(roster_rows(current_club)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="club_{current_club.id}_roster.{export_format}"'
+    return response
+
+@login_required
+@owner_required
+def import_roster(request, club_id):
+    current_club = Club.objects.get(pk=club_id)
+    report = None
+    if request.method == 'POST':
+        form = ImportRosterForm(request.POST, request.FILES)
+        if form.is_valid():
+            lines = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                report = import_roster_csv(current_club, lines, password=form.cleaned_data['password'] or None, actor=request.user)
+            except (RosterImportError, UnicodeDecodeError) as error:
+                form.add_error('file', str(error))
+            else:
+                messages.add_message(request, messages.SUCCESS, f"Imported {report.added_memberships} members!")
+    else:
+        form = ImportRosterForm()
+    return render(request, 'import_roster.html', {'form': form, 'report': report, 'current_club': current_club})
+
+@login_required
+@officer_or_above_required
+def club_activity(request, club_id):
+    current_club = Club.objects.get(pk=club_id)
+    current_user = request.user
+    is_owner = current_club.is_owner(current_user)
+    user_membership = None
+    if not is_owner:
+        user_membership = Membership.objects.filter(user_id=current_user.id, club=current_club).order_by('pk').first()
+    try:
+        before = int(request.GET['before'])
+    except (KeyError, ValueError):
+        before = None
+    events, next_cursor = activity_page(current_club.id, before, settings.ACTIVITY_PAGE_SIZE)
+    clubs = Club.objects.all()
+    your_clubs = Club.objects.for_user(current_user)
+    other_clubs = list(set(clubs) - set(your_clubs))
+    context = {
+        'events': events,
+        'next_cursor': next_cursor,
+        'user_membership': user_membership,
+        'is_owner': is_owner,
+        'your_clubs': your_clubs,
+        'other_clubs': other_clubs,
+        'current_club': current_club,
+        'current_user': current_user
+    }
+    return render(request, 'club_activity.html', context)
+
 def log_out(request):
     logout(request)
     return redirect('home')
@@ -129,7 +205,10 @@ def leave_club(request,club_id):
     current_user = request.user
     user_membership = Membership.objects.all().filter(user=current_user,club=current_club)
     if len(user_membership) >= 1:
-        user_membership[0].leave_club()
+        with membership_change(current_club):
+            user_membership[0].leave_club()
+            log_membership_event(current_club, current_user, MembershipEvent.LEFT)
+        publish_membership_change(current_club.id)
     else:
         messages.error(request,"Cannot leave a club with no membership")
         return redirect('user_list',current_club.id)
@@ -137,7 +216,7 @@ def leave_club(request,club_id):
 
 @login_required
 def profile(request):
-    global current_club
+    current_club = _own_pages_club(request.user)
     if (current_club is None):
       current_club = Club.objects.all()[0]
     current_user = request.user
@@ -159,7 +238,7 @@ def profile(request):
         if current_club:
             is_owner=current_club.is_owner(current_user)
         if user_membership.count() == 0:
-            user_membership=None
+            user_membership = MembershipArchive.objects.filter(user=current_user, club=current_club).first()
         else:
             clubs=Club.objects.all()
             your_clubs=[
@@ -210,11 +289,10 @@ def profile(request):
 @login_required
 @member_or_above_required
 def show_user(request,user_id, club_id):
-    global current_club
+    current_club=Club.objects.get(id=club_id)
     try:
         user = User.objects.get(id=user_id)
         clubs = Club.objects.all()
-        current_club=Club.objects.get(id=club_id)
         viewee_membership = Membership.objects.all().filter(user=user, club=current_club)
         current_user = request.user
         your_clubs=[club for club in clubs if club.is_part_of(current_user)]
@@ -227,7 +305,7 @@ def show_user(request,user_id, club_id):
         if viewee_membership:
             viewee_membership = viewee_membership[0]
         else:
-            viewee_membership=None
+            viewee_membership = MembershipArchive.objects.filter(user=user, club=current_club).first()
         if user_membership:
             user_membership = user_membership[0]
         else:
@@ -262,17 +340,15 @@ def delete_user(request, user_id, club_id):
             messages.error(request, "Cannot delete this user")
             return redirect('user_list', current_club.pk)
 
-        if current_club.is_owner(user) or request.user == user:
-            if not (delete_membership[0].is_officer() and not current_club.is_owner(user)):
-                messages.error(request, "Cannot delete the owner, yourself, or another officer")
-                return redirect('user_list', current_club.pk)
-            else:
-                delete_membership[0].remove_user()
-        elif request.user == user:
-            messages.error(request,"Cannot delete yourself")
-            return redirect('user_list',current_club.pk)
-        else:
+        action = REJECT if delete_membership[0].is_applicant() else REMOVE
+        if request.user == user or not can(action, viewer_role(current_club, request.user), delete_membership[0].level):
+            messages.error(request, "Cannot delete this user")
+            return redirect('user_list', current_club.pk)
+        with membership_change(current_club):
             delete_membership[0].remove_user()
+            log_membership_event(current_club, user, MembershipEvent.REMOVED, actor=request.user)
+            schedule_archive_purge()
+        publish_membership_change(current_club.id)
     except ObjectDoesNotExist:
         return redirect('user_list', current_club.pk)
     else:
@@ -285,8 +361,14 @@ def reinstate_deleted_user(request, user_id, club_id):
     current_club=Club.objects.get(id=club_id)
     try:
         user = User.objects.get(id=user_id)
-        reinstate_membership =  Membership.objects.all().filter(user=user, club=current_club)
-        reinstate_membership[0].reinstate_user()
+        reinstate_membership = MembershipArchive.objects.filter(user=user, club=current_club).first()
+        if reinstate_membership is None:
+            messages.error(request, "Cannot reinstate this user")
+            return redirect('user_list', current_club.pk)
+        with membership_change(current_club):
+            reinstate_membership.reinstate_user()
+            log_membership_event(current_club, user, MembershipEvent.REINSTATED, actor=request.user)
+        publish_membership_change(current_club.id)
     except ObjectDoesNotExist:
         return redirect('user_list', current_club.pk)
     else:
@@ -295,7 +377,7 @@ def reinstate_deleted_user(request, user_id, club_id):
 
 @login_required
 def password(request):
-    global current_club
+    current_club = _own_pages_club(request.user)
     user_membership=None
     is_owner=False
     current_user = request.user
@@ -312,6 +394,9 @@ def password(request):
                 current_user.save()
                 login(request, current_user)
                 messages.add_message(request, messages.SUCCESS, "Password updated!")
+                # In case the user is not part of any clubs
+                if current_club is None:
+                    return redirect('profile')
                 return redirect('user_list', current_club.pk)
             else:
                 messages.add_message(request, messages.ERROR, "Invalid current password!")
@@ -319,13 +404,7 @@ def password(request):
                 messages.add_message(request, messages.ERROR, "Invalid new password!")
     else:
         form = PasswordForm()
-    your_clubs=[club for club in clubs if club.is_part_of(current_user)]
-    for club in your_clubs:
-        membership = Membership.objects.all().filter(user=current_user, club=club)
-        # Checking if they have a membership
-        if len(membership) > 0:
-            if membership[0].is_removed_user():
-                your_clubs.remove(club)
+    your_clubs=Club.objects.for_user(current_user)
     other_clubs=list(set(clubs)-set(your_clubs))
     if current_club:
         is_owner=current_club.is_owner(current_user)
@@ -346,6 +425,34 @@ def password(request):
         }
     )
 
+@login_required
+def notifications(request):
+    current_user = request.user
+    current_club = _own_pages_club(current_user)
+    is_owner = False
+    user_membership = None
+    if current_club:
+        is_owner = current_club.is_owner(current_user)
+        user_membership = Membership.objects.filter(user_id=current_user.id, club=current_club).order_by('pk').first()
+    clubs = Club.objects.all()
+    your_clubs = Club.objects.for_user(current_user)
+    other_clubs = list(set(clubs) - set(your_clubs))
+    user_notifications = list(current_user.notifications.order_by('-id')[:settings.NOTIFICATIONS_SHOWN])
+    notified_clubs = Club.objects.in_bulk({notification.club_id for notification in user_notifications})
+    for notification in user_notifications:
+        notification.notified_club = notified_clubs.get(notification.club_id)
+    mark_notifications_read(current_user)
+    context = {
+        'notifications': [notification for notification in user_notifications if notification.notified_club],
+        'is_owner': is_owner,
+        'your_clubs': your_clubs,
+        'other_clubs': other_clubs,
+        'user_membership': user_membership,
+        'current_user': current_user,
+        'current_club': current_club
+    }
+    return render(request, 'notifications.html', context)
+
 @login_required
 @owner_required
 def owner_transfer(request, user_id, club_id):
@@ -358,17 +465,20 @@ def owner_transfer(request, user_id, club_id):
         return redirect('log_in')
     else:
         if(current_user != user and user.is_active):
-            user_membership = Membership.objects.all().filter(user=user, club=current_club)[0]
-            if(not user_membership.is_applicant() and not user_membership.is_member()):
-                # Remove former owner from owner group and add chosen officers to owner group
-                current_membership = Membership(user=current_user, club=current_club, level='3')
-                current_membership.save()
-                current_club.members.add(current_user)
-                # Remove chosen officer from officer group and add former owner to officer group
-                current_club.members.remove(user)
-                user_membership.delete()
-                current_club.owner=user
-                current_club.save()
+            user_membership = Membership.objects.filter(user=user, club=current_club).first()
+            if user_membership is not None and can(TRANSFER, OWNER, user_membership.level):
+                with membership_change(current_club):
+                    # Remove former owner from owner group and add chosen officers to owner group
+                    current_membership = Membership(user=current_user, club=current_club, level='3')
+                    current_membership.save()
+                    current_club.members.add(current_user)
+                    # Remove chosen officer from officer group and add former owner to officer group
+                    current_club.members.remove(user)
+                    user_membership.delete()
+                    current_club.owner=user
+                    current_club.save()
+                    log_membership_event(current_club, user, MembershipEvent.OWNERSHIP_TRANSFERRED, actor=current_user)
+                publish_membership_change(current_club.id)
                 messages.add_message(request, messages.SUCCESS, "Owner transfer successful!")
             else:
                 messages.add_message(request, messages.ERROR, "You can not transfer ownership to applicants or members!")
@@ -383,18 +493,20 @@ def promote_club_member(request, user_id, club_id):
         current_club=Club.objects.get(id=club_id)
         current_user = request.user
         user = User.objects.get(id=user_id)
-        is_part_of = current_club.is_part_of(user)
-        is_owner = current_club.is_owner(request.user)
+        role = viewer_role(current_club, current_user)
     except ObjectDoesNotExist:
         messages.add_message(request, messages.ERROR, "The user does not exist")
         return redirect('user_list', club_id)
     else:
         if(current_user != user and user.is_active):
-            if(is_part_of and is_owner):
-                user_memberships = Membership.objects.all().filter(user=user, club=current_club)
+            user_memberships = Membership.objects.all().filter(user=user, club=current_club)
+            if can(PROMOTE, role, user_memberships.values_list('level', flat=True).first()):
                 if user_memberships.count() == 1:
-                    user_memberships.update(level = '3')
-                    user_memberships[0].save()
+                    with membership_change(current_club):
+                        user_memberships.update(level = '3')
+                        user_memberships[0].save()
+                        log_membership_event(current_club, user, MembershipEvent.PROMOTED, actor=current_user)
+                    publish_membership_change(club_id)
                     messages.add_message(request, messages.SUCCESS, "Member promoted successfully!")
                     return redirect('user_list', club_id)
                 else:
@@ -412,18 +524,20 @@ def demote_club_officer(request, user_id, club_id):
         current_club=Club.objects.get(id=club_id)
         current_user = request.user
         user = User.objects.get(id=user_id)
-        is_part_of = current_club.is_part_of(user)
-        is_owner = current_club.is_owner(request.user)
+        role = viewer_role(current_club, current_user)
     except ObjectDoesNotExist:
         messages.add_message(request, messages.ERROR, "The user does not exist")
         return redirect('user_list', club_id)
     else:
         if(current_user != user and user.is_active):
-            if(is_part_of and is_owner):
-                user_memberships = Membership.objects.all().filter(user=user,club=current_club)
+            user_memberships = Membership.objects.all().filter(user=user,club=current_club)
+            if can(DEMOTE, role, user_memberships.values_list('level', flat=True).first()):
                 if user_memberships.count() == 1:
-                    user_memberships.update(level = '2')
-                    user_memberships[0].save()
+                    with membership_change(current_club):
+                        user_memberships.update(level = '2')
+                        user_memberships[0].save()
+                        log_membership_event(current_club, user, MembershipEvent.DEMOTED, actor=current_user)
+                    publish_membership_change(club_id)
                     messages.add_message(request, messages.SUCCESS, "Successfully demoted officer!")
                     return redirect('user_list',club_id)
                 else:
@@ -449,14 +563,17 @@ def accept_club_applicant(request, user_id, club_id):
             user_memberships = Membership.objects.all().filter(user=user, club=current_club)
 
             if(len(user_memberships) > 0):
-                is_applicant = user_memberships[0].is_applicant()
+                may_accept = can(ACCEPT, viewer_role(current_club, current_user), user_memberships[0].level)
             else:
                 messages.add_message(request, messages.ERROR, "Cannot accept this user")
                 return redirect('user_list', club_id)
 
-            if is_applicant:
+            if may_accept:
                 if user_memberships.count() == 1:
-                    user_memberships.update(level='2')
+                    with membership_change(current_club):
+                        user_memberships.update(level='2')
+                        log_membership_event(current_club, user, MembershipEvent.ACCEPTED, actor=current_user)
+                    publish_membership_change(club_id)
                     messages.add_message(request, messages.SUCCESS, "Accepted applicant successfully!")
                     return redirect('user_list', club_id)
             else:
@@ -468,7 +585,6 @@ def accept_club_applicant(request, user_id, club_id):
 
 
 def show_club(request, club_id):
-    global current_club
     try:
         current_club=Club.objects.get(id=club_id)
         user = request.user
@@ -486,7 +602,7 @@ def show_club(request, club_id):
                     can_apply = False
                 if(user != current_club.owner):
                     user_membership=user_membership[0]
-        users=current_club.members.all()
+        users=current_club.member_users()
         # How applicants will be displayed e.g. 10 people are currently in the waiting list!
         applicants=[
             applicant
@@ -508,13 +624,7 @@ def show_club(request, club_id):
         if user != None and user.is_authenticated:
             clubs=Club.objects.all()
 
-            your_clubs=[club for club in clubs if club.is_part_of(user)]
-            for club in your_clubs:
-                membership = Membership.objects.all().filter(user=user, club=club)
-                if len(membership) > 0:
-                    if membership[0].is_removed_user():
-                        your_clubs.remove(club)
-
+            your_clubs=Club.objects.for_user(user)
             other_clubs=list(set(clubs)-set(your_clubs))
 
             context = {
@@ -551,15 +661,19 @@ def apply(request, club_id):
         user = request.user
         if(not user.is_authenticated):
             return redirect('sign_up')
-        if club.is_part_of(user):
+        # Removed users cannot apply again while their membership is archived
+        if club.is_part_of(user) or MembershipArchive.objects.filter(user=user, club=club).exists():
             return render(request, 'show_club.html', {'club': club})
         membership = Membership(
             user = user,
             club = club,
             level = "1"
         )
-        membership.save()
-        club.members.add(user)
+        with membership_change(club):
+            membership.save()
+            club.members.add(user)
+            record_application(club, user)
+        publish_membership_change(club.id)
         messages.add_message(request, messages.SUCCESS, "You have applied to this club successfully!")
         return redirect('user_list',club_id)
     except Exception:
@@ -567,8 +681,8 @@ def apply(request, club_id):
 
 @login_required
 def create_club(request):
-    global current_club
     current_user = request.user
+    current_club = _own_pages_club(current_user)
     clubs = Club.objects.all()
     your_clubs=[club for club in clubs if club.is_part_of(current_user)]
     other_clubs=[club for club in clubs if not club.is_part_of(current_user)]
@@ -587,7 +701,6 @@ def create_club(request):
             club.save()
             club.owner = owner
             club.save()
-            current_club=club
             messages.add_message(request, messages.SUCCESS, "Congratulations! Created a club successfully!")
             return redirect('user_list', club.pk)
         else:
@@ -0,0 +1,51 @@
+"""Warm-up of a freshly booted web worker.
+
+The first request a worker serves otherwise pays for compiling the
+templates it renders, building the URL resolver and filling Django's lazily
+built caches. warm_up() does all of that up front; gunicorn.conf.py calls it
+once each worker has loaded the application and before it accepts
+connections. Compiled templates are only kept when TEMPLATE_CACHING is on,
+as it always is on Heroku.
+
+Database connections are not opened ahead: they belong to the thread that
+opens them, and under ASGI the queries run on sync_to_async's threads
+rather than the thread warming up.
+"""
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError
+from django.template.loader import get_template
+from django.urls import get_resolver
+from django.utils import translation
+
+
+def app_templates():
+    """The names of the templates in clubs/templates."""
+    directory = Path(apps.get_app_config('clubs').path) / 'templates'
+    return sorted(path.relative_to(directory).as_posix() for path in directory.rglob('*.html'))
+
+
+def warm_up():
+    """Prepare this process to serve requests and return what was warmed up.
+
+    Filling the content type cache reads the database; when it cannot be
+    reached, 'content_types' is False rather than an error raised, so the
+    worker still boots and fills the cache on its first request.
+    """
+    templates = app_templates()
+    for name in templates:
+        get_template(name)
+    # Reading reverse_dict imports the URLconf and builds the resolver's lookup tables
+    get_resolver().reverse_dict
+    try:
+        # The cache is shared by every thread of the process
+        ContentType.objects.get_for_models(*apps.get_app_config('clubs').get_models())
+        content_types = True
+    except DatabaseError:
+        content_types = False
+    get_hashers()
+    translation.activate(settings.LANGUAGE_CODE)
+    return {'templates': len(templates), 'content_types': content_types}
@@ -0,0 +1,10 @@
+"""Gunicorn settings, read from the working directory when the Procfile starts the web dyno."""
+
+
+def post_worker_init(worker):
+    """Warm up each worker once it has loaded the application, before it accepts connections."""
+    from clubs.warmup import warm_up
+    warmed = warm_up()
+    worker.log.info("Warmed up %d templates", warmed['templates'])
+    if not warmed['content_types']:
+        worker.log.warning("Could not read the content types from the database")
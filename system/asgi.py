@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'system.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Also streams the live roster updates from async generators (see clubs/asgi.py)
+from clubs.asgi import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
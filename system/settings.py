@@ -14,7 +14,6 @@ from pathlib import Path
 import os
 from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.contrib.messages import constants as message_constants
-import django_heroku
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,6 +28,9 @@ SECRET_KEY = 'django-insecure-2@dv!r%*_^tovdo*cf0=9hxgl=xq=eer%8am&f)5ah8sz(q&^9
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# The app runs in production on Heroku, whose dynos keep it under /app
+ON_HEROKU = '/app' in os.environ['HOME']
+
 ALLOWED_HOSTS = []
 
 
@@ -48,11 +50,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'clubs.middleware.ReplicaRoutingMiddleware',
+    'clubs.middleware.IdentityMapMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'clubs.middleware.RequestProfilerMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -74,8 +79,26 @@ TEMPLATES = [
     },
 ]
 
+# Template caching
+# Set TEMPLATE_CACHING=1 (always on on Heroku) to keep compiled templates in
+# memory instead of reading and parsing them again on every render.
+# Template changes then need a restart.
+TEMPLATE_CACHING = os.environ.get('TEMPLATE_CACHING') == '1' or ON_HEROKU
+
+if TEMPLATE_CACHING:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'system.wsgi.application'
 
+# Serve the async versions of the read-heavy views (set by system/asgi.py)
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -87,6 +110,156 @@ DATABASES = {
     }
 }
 
+# SQLite production tuning
+# Set SQLITE_TUNING=1 to open every SQLite connection with the pragmas below
+# (WAL lets readers proceed while a writer commits) and to keep connections
+# alive across requests instead of reconnecting on every request.
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING') == '1'
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
+# Read replica
+# Set DATABASE_REPLICA to the path of a replica SQLite file (kept up to date
+# locally with `manage.py sync_replica`) to serve the read-only views from it.
+REPLICA_DATABASE = None
+
+if os.environ.get('DATABASE_REPLICA'):
+    REPLICA_DATABASE = 'replica'
+    DATABASES[REPLICA_DATABASE] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DATABASE_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Club shards
+# Clubs and their memberships can be spread over several databases while
+# users stay on the default one. CLUB_SHARD_COUNT local SQLite shards are
+# defined below, each migrated with `manage.py migrate --database shard_<n>`.
+# Set CLUB_SHARDING=1 to place clubs on them.
+CLUB_SHARD_COUNT = int(os.environ.get('CLUB_SHARD_COUNT', 2))
+
+SHARD_DATABASES = [f'shard_{index}' for index in range(CLUB_SHARD_COUNT)]
+
+for shard in SHARD_DATABASES:
+    DATABASES[shard] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{shard}.sqlite3',
+    }
+
+CLUB_SHARDS = SHARD_DATABASES if os.environ.get('CLUB_SHARDING') == '1' else []
+
+# Keep the connections to every database above alive when tuning SQLite:
+# the replica and the shards serve most of the reads
+if SQLITE_TUNING:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = int(os.environ.get('CONN_MAX_AGE', 600))
+
+# Query shards in parallel threads for cross-shard reads
+CLUB_SHARD_PARALLEL = True
+
+DATABASE_ROUTERS = ['clubs.routers.ShardRouter', 'clubs.routers.ReplicaRouter']
+
+# Views whose GET requests read from the replica
+REPLICA_READ_VIEWS = ['home', 'show_club', 'show_user', 'user_list']
+
+# Seconds a user's requests stay on the primary after they write
+REPLICA_STICKY_SECONDS = 10
+
+# Cached sessions and users
+# Set CACHED_AUTH=1 to read sessions through the cache (writing them through
+# to the database) and to load logged-in users from the cache until their
+# profile changes (see clubs/auth.py). Switching it on or off logs everyone out.
+# It needs a cache every web process and worker shares, so that a profile or
+# password change one of them makes reaches the others: set CACHE_BACKEND and
+# CACHE_LOCATION, e.g. django.core.cache.backends.memcached.PyMemcacheCache at
+# 127.0.0.1:11211 (with pymemcache installed) or django_redis.cache.RedisCache
+# at redis://127.0.0.1:6379/1 (with django-redis installed).
+CACHED_AUTH = os.environ.get('CACHED_AUTH') == '1'
+
+if os.environ.get('CACHE_BACKEND'):
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ['CACHE_BACKEND'],
+            'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        }
+    }
+
+if CACHED_AUTH:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['clubs.auth.CachedUserBackend']
+
+# Seconds a logged-in user stays cached
+USER_CACHE_TIMEOUT = 300
+
+# Live roster updates (clubs/events.py), streamed under ASGI and polled under WSGI
+# Seconds between keep-alive comments on an idle roster stream
+ROSTER_STREAM_HEARTBEAT = 15
+# Seconds before a roster stream is closed; the browser then reconnects
+ROSTER_STREAM_MAX_SECONDS = 300
+# Milliseconds the browser waits before reconnecting
+ROSTER_STREAM_RETRY_MS = 3000
+# Seconds between reads of the event log, for changes made by other processes
+ROSTER_STREAM_POLL_SECONDS = 2
+# Roster streams one process serves at most; further roster pages poll instead
+ROSTER_STREAM_MAX_OPEN = 200
+# Milliseconds between polls of a roster page that has no stream
+ROSTER_POLL_MS = 5000
+
+# Background jobs (clubs/jobs.py), run by `manage.py run_worker`
+JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', '4'))
+# Seconds an idle worker waits before looking for due jobs again
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 5
+# Seconds before the first retry of a failed job, doubled on each further retry
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_BACKOFF_MAX = 3600
+# Seconds after which a running job is assumed abandoned by its worker and run again
+JOB_LOCK_TIMEOUT = 600
+# Due jobs a worker tries to claim in turn on databases without row locks
+JOB_CLAIM_CANDIDATES = 10
+# Seconds a done job is kept before an idle worker deletes it
+JOB_RETENTION = 7 * 24 * 60 * 60
+# Seconds between an idle worker's deletions of expired done jobs
+JOB_PURGE_INTERVAL = 60 * 60
+JOB_PURGE_BATCH_SIZE = 1000
+
+# Seconds of applications batched into one digest for a club's officers
+NOTIFICATION_DIGEST_WINDOW = 15 * 60
+# Most recent notifications listed on the notifications page
+NOTIFICATIONS_SHOWN = 50
+
+# Membership events shown per page of a club's activity feed
+ACTIVITY_PAGE_SIZE = 50
+
+# Memberships read per query while streaming a roster export
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows validated and inserted together by a roster import
+IMPORT_BATCH_SIZE = 1000
+
+# Rows per frame of a database snapshot
+SNAPSHOT_CHUNK_SIZE = 5000
+
+# Days a removed membership stays in the archive, where it can still be reinstated
+MEMBERSHIP_ARCHIVE_RETENTION_DAYS = 365
+# Archived memberships deleted per transaction, and seconds between runs, of the purge job
+MEMBERSHIP_ARCHIVE_PURGE_BATCH_SIZE = 1000
+MEMBERSHIP_ARCHIVE_PURGE_INTERVAL = 24 * 60 * 60
+
+# Expired sessions deleted per transaction, and seconds between batches, by clear_expired_sessions
+SESSION_CLEANUP_BATCH_SIZE = 500
+SESSION_CLEANUP_PAUSE = 0.1
+
+# Default and largest ?limit= of a page of the JSON API
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -145,6 +318,11 @@ LOGIN_URL = 'log_in'
 #URL where @login_prohibited redirects to
 REDIRECT_URL_WHEN_LOGGED_IN = 'user_list'
 
+# Flash messages travel in a signed cookie, so the redirect after an action
+# does not write the session; only messages too large for the cookie are
+# kept in the session instead.
+MESSAGE_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
 # Message level tags shoudl use Bootsatrp terms
 MESSAGE_TAGS = {
     message_constants.DEBUG:"dark",
@@ -152,6 +330,6 @@ MESSAGE_TAGS = {
 }
 
 # Activate django_heroku
-if '/app' in os.environ['HOME']:
+if ON_HEROKU:
     import django_heroku
     django_heroku.settings(locals())
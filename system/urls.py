@@ -13,28 +13,45 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
-from clubs import views
+from clubs import api, async_views, views
+
+# The read-heavy views have async versions for serving under ASGI
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('',views.home, name='home'),
+    path('',read_views.home, name='home'),
     path('profile/',views.profile, name='profile'),
-    path('users/club_id_<int:club_id>',views.user_list, name='user_list'),
-    path('user/club_id_<int:club_id>/user_id_<int:user_id>',views.show_user, name='show_user'),
+    path('users/club_id_<int:club_id>',read_views.user_list, name='user_list'),
+    path('roster_stream/club_id_<int:club_id>',read_views.roster_stream, name='roster_stream'),
+    path('roster_changes/club_id_<int:club_id>',views.roster_changes, name='roster_changes'),
+    path('activity/club_id_<int:club_id>',views.club_activity, name='club_activity'),
+    path('export_roster/club_id_<int:club_id>',views.export_roster, name='export_roster'),
+    path('import_roster/club_id_<int:club_id>',views.import_roster, name='import_roster'),
+    path('user/club_id_<int:club_id>/user_id_<int:user_id>',read_views.show_user, name='show_user'),
     path('sign_up/', views.sign_up, name='sign_up'),
     path('log_in/', views.log_in, name='log_in'),
     path('log_out/',views.log_out, name = 'log_out'),
     path('password/',views.password, name = 'password'),
+    path('notifications/',views.notifications, name = 'notifications'),
     path('leave_club/club_id_<int:club_id>',views.leave_club, name = 'leave_club'),
     path('delete_user/club_id_<int:club_id>/user_id_<int:user_id>',views.delete_user, name = 'delete_user'),
     path('owner_transfer/club_id_<int:club_id>/user_id_<int:user_id>', views.owner_transfer, name='owner_transfer'),
-    path('show_club/club_id_<int:club_id>',views.show_club, name = 'show_club'),
+    path('show_club/club_id_<int:club_id>',read_views.show_club, name = 'show_club'),
     path('apply/club_id_<int:club_id>',views.apply, name = 'apply'),
     path('promote_club_member/club_id_<int:club_id>/user_id_<int:user_id>',views.promote_club_member, name = 'promote_club_member'),
     path('demote_club_officer/club_id_<int:club_id>/user_id_<int:user_id>',views.demote_club_officer, name = 'demote_club_officer'),
     path('accept_club_applicant/club_id_<int:club_id>/user_id_<int:user_id>',views.accept_club_applicant, name = 'accept_club_applicant'),
     path('create_club/', views.create_club, name='create_club'),
     path('reinstate_deleted_user/club_id_<int:club_id>/user_id_<int:user_id>', views.reinstate_deleted_user, name='reinstate_deleted_user'),
+    path('api/batch', api.batch, name='api_batch'),
+    path('api/clubs', api.club_list, name='api_club_list'),
+    path('api/clubs/<int:club_id>', api.club_detail, name='api_club_detail'),
+    path('api/clubs/<int:club_id>/memberships', api.membership_list, name='api_membership_list'),
+    path('api/clubs/<int:club_id>/memberships/<int:user_id>', api.membership_detail, name='api_membership_detail'),
+    path('api/clubs/<int:club_id>/changes', api.club_changes, name='club_changes'),
+    path('api/users/<int:user_id>', api.user_detail, name='api_user_detail'),
 ]